@@ -0,0 +1,273 @@
+# 파일 경로: intersection-backend/app/ai_precompute.py
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, update, or_
+from sqlmodel import Session, select
+
+from .azure_ai import agenerate_batch, candidate_cache_keys, remember_candidate_result
+from .config import settings
+from .db import engine
+from .models import User, FriendRecommendation, AIRecommendationText, get_kst_now
+
+# =====================================================
+# 🌙 AI 추천 이유 배치 생성 (scripts/precompute_ai_recommendations.py)
+#
+# 피크 시간에 /friends/recommendations/ai 가 모델을 부르지 않도록,
+# 저장된 규칙 기반 추천 목록(FriendRecommendation, kind="rule")이 바뀐 사용자를 골라
+# 추천 이유 / 첫 메시지를 미리 만들어 AIRecommendationText 에 저장한다.
+# - 여러 사용자의 후보를 한 번의 호출로 묶음 (AI_PRECOMPUTE_BATCH_CANDIDATES)
+# - 동시 호출 수 제한 (AI_PRECOMPUTE_CONCURRENCY)
+# - 분당 토큰 한도 (AI_PRECOMPUTE_TOKENS_PER_MINUTE, 토큰 버킷)
+# - 이미 같은 프로필로 만든 후보는 건너뜀 (cache_key 비교)
+# 요청 시에는 load_precomputed 가 저장된 결과를 메모리 캐시에 올린다.
+# =====================================================
+
+# 토큰 추정치 (호출 전 한도 확인용, 응답의 usage 로 보정)
+_BASE_PROMPT_TOKENS = 300
+_PROMPT_TOKENS_PER_CANDIDATE = 60
+_OUTPUT_TOKENS_PER_CANDIDATE = 120
+
+
+class TokenRateLimiter:
+    """분당 토큰 한도 (토큰 버킷: 1분에 tokens_per_minute 만큼 다시 채워짐)"""
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = float(tokens_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.capacity / 60)
+        self._updated = now
+
+    async def acquire(self, tokens: int) -> None:
+        # 한도보다 큰 요청은 버킷이 가득 찼을 때 통과
+        tokens = min(float(tokens), self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) * 60 / self.capacity)
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """실제 사용량으로 보정 (usage 가 없으면 추정치 그대로)"""
+        if actual:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + estimated - actual)
+
+
+@dataclass
+class _Work:
+    user: User
+    missing: List[User]
+    keys: Dict[int, str]
+    computed_at: datetime
+
+
+# -----------------------------------------------------
+# DB 작업 (스레드에서 실행)
+# -----------------------------------------------------
+def _due_user_ids(max_users: Optional[int]) -> List[int]:
+    """AI 추천 이유를 만든 이후 목록이 다시 계산된 사용자 (오래된 목록부터)"""
+    with Session(engine) as session:
+        stmt = (
+            select(FriendRecommendation.user_id)
+            .where(
+                FriendRecommendation.kind == "rule",
+                FriendRecommendation.is_stale == False,
+                or_(
+                    FriendRecommendation.ai_generated_at == None,
+                    FriendRecommendation.ai_generated_at < FriendRecommendation.computed_at,
+                ),
+            )
+            .order_by(FriendRecommendation.computed_at)
+        )
+        if max_users:
+            stmt = stmt.limit(max_users)
+        return list(session.exec(stmt).all())
+
+
+def _load_work(user_ids: List[int]) -> List[_Work]:
+    if not user_ids:
+        return []
+    with Session(engine, expire_on_commit=False) as session:
+        rows = session.exec(
+            select(FriendRecommendation).where(
+                FriendRecommendation.kind == "rule",
+                FriendRecommendation.user_id.in_(user_ids),
+            )
+        ).all()
+        wanted = set(user_ids) | {c for row in rows for c in row.candidate_ids or []}
+        users = {u.id: u for u in session.exec(select(User).where(User.id.in_(wanted))).all()}
+        existing = {
+            (text.user_id, text.candidate_id): text.cache_key
+            for text in session.exec(
+                select(AIRecommendationText).where(AIRecommendationText.user_id.in_(user_ids))
+            ).all()
+        }
+
+    works: List[_Work] = []
+    for row in rows:
+        me = users.get(row.user_id)
+        if me is None:
+            continue
+        candidates = [users[c] for c in row.candidate_ids or [] if c in users]
+        keys = candidate_cache_keys(me, candidates)
+        missing = [c for c in candidates if existing.get((me.id, c.id)) != keys[c.id]]
+        works.append(_Work(user=me, missing=missing, keys=keys, computed_at=row.computed_at))
+    return works
+
+
+def _mark_generated(session: Session, work: _Work) -> None:
+    # 그 사이 목록이 다시 계산됐으면(computed_at 변경) 다음 실행에서 다시 처리
+    session.exec(
+        update(FriendRecommendation)
+        .where(
+            FriendRecommendation.user_id == work.user.id,
+            FriendRecommendation.kind == "rule",
+            FriendRecommendation.computed_at == work.computed_at,
+        )
+        .values(ai_generated_at=get_kst_now())
+    )
+
+
+def _store_results(works: List[_Work], results: Dict[int, List[dict]]) -> int:
+    stored = 0
+    with Session(engine) as session:
+        for work in works:
+            items = {item["user_id"]: item for item in results.get(work.user.id, [])}
+            for candidate in work.missing:
+                item = items.get(candidate.id)
+                if item is None:
+                    continue
+                session.merge(AIRecommendationText(
+                    user_id=work.user.id,
+                    candidate_id=candidate.id,
+                    cache_key=work.keys[candidate.id],
+                    reason=item["reason"],
+                    first_messages=item["first_messages"],
+                    created_at=get_kst_now(),
+                ))
+                remember_candidate_result(work.keys[candidate.id], item)
+                stored += 1
+            if all(c.id in items for c in work.missing):
+                _mark_generated(session, work)
+        session.commit()
+    return stored
+
+
+def _mark_all_generated(works: List[_Work]) -> None:
+    with Session(engine) as session:
+        for work in works:
+            _mark_generated(session, work)
+        session.commit()
+
+
+# -----------------------------------------------------
+# 배치 실행
+# -----------------------------------------------------
+def _pack(works: List[_Work], max_candidates: int) -> List[List[_Work]]:
+    """후보 수 합이 max_candidates 를 넘지 않게 사용자들을 묶음 (한 사용자는 나누지 않음)"""
+    batches: List[List[_Work]] = []
+    current: List[_Work] = []
+    size = 0
+    for work in works:
+        if current and size + len(work.missing) > max_candidates:
+            batches.append(current)
+            current, size = [], 0
+        current.append(work)
+        size += len(work.missing)
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def precompute_ai_recommendations(max_users: Optional[int] = None) -> Dict[str, int]:
+    """
+    대상 사용자들의 AI 추천 이유 생성 후 저장.
+    반환: {"users", "up_to_date", "calls", "stored", "failed_users"}
+    """
+    user_ids = await asyncio.to_thread(_due_user_ids, max_users)
+    works = await asyncio.to_thread(_load_work, user_ids)
+
+    up_to_date = [w for w in works if not w.missing]
+    pending = [w for w in works if w.missing]
+    if up_to_date:
+        await asyncio.to_thread(_mark_all_generated, up_to_date)
+
+    stats = {"users": len(works), "up_to_date": len(up_to_date), "calls": 0, "stored": 0, "failed_users": 0}
+    semaphore = asyncio.Semaphore(settings.AI_PRECOMPUTE_CONCURRENCY)
+    limiter = TokenRateLimiter(settings.AI_PRECOMPUTE_TOKENS_PER_MINUTE)
+
+    async def _run(batch: List[_Work]) -> None:
+        n_candidates = sum(len(w.missing) for w in batch)
+        max_tokens = _OUTPUT_TOKENS_PER_CANDIDATE * n_candidates
+        estimated = _BASE_PROMPT_TOKENS + _PROMPT_TOKENS_PER_CANDIDATE * n_candidates + max_tokens
+
+        async with semaphore:
+            await limiter.acquire(estimated)
+            stats["calls"] += 1
+            try:
+                results, used = await agenerate_batch([(w.user, w.missing) for w in batch], max_tokens)
+            except Exception as e:
+                print(f"[ai_precompute] batch of {len(batch)} users failed: {e!r}")
+                stats["failed_users"] += len(batch)
+                return
+            limiter.settle(estimated, used)
+
+        stats["stored"] += await asyncio.to_thread(_store_results, batch, results)
+        stats["failed_users"] += sum(1 for w in batch if w.user.id not in results)
+
+    await asyncio.gather(*(
+        _run(batch) for batch in _pack(pending, settings.AI_PRECOMPUTE_BATCH_CANDIDATES)
+    ))
+    return stats
+
+
+# -----------------------------------------------------
+# 요청 시 사용 / 정리
+# -----------------------------------------------------
+def load_precomputed(session: Session, current_user: User, candidates: List[User]) -> int:
+    """
+    미리 생성된 추천 이유 중 프로필이 그대로인 것만 메모리 캐시에 올림 (쿼리 1번).
+    올린 후보 수 반환
+    """
+    if not candidates:
+        return 0
+    keys = candidate_cache_keys(current_user, candidates)
+    texts = session.exec(
+        select(AIRecommendationText).where(
+            AIRecommendationText.user_id == current_user.id,
+            AIRecommendationText.candidate_id.in_(list(keys)),
+        )
+    ).all()
+
+    loaded = 0
+    for text in texts:
+        if keys.get(text.candidate_id) != text.cache_key:
+            continue
+        remember_candidate_result(text.cache_key, {
+            "user_id": text.candidate_id,
+            "reason": text.reason,
+            "first_messages": list(text.first_messages or []),
+        })
+        loaded += 1
+    return loaded
+
+
+def delete_user_texts(session: Session, user_id: int) -> None:
+    """탈퇴 시 내 / 나에 대한 추천 이유 삭제 (호출한 쪽에서 commit)"""
+    session.exec(delete(AIRecommendationText).where(
+        or_(AIRecommendationText.user_id == user_id, AIRecommendationText.candidate_id == user_id)
+    ))
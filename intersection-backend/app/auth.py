@@ -1,13 +1,18 @@
 # 파일 경로: intersection-backend/app/auth.py
 
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Optional, Tuple, TypeVar
 
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 
 from .config import settings
 
+T = TypeVar("T")
+
 # =========================
 # JWT 기본 설정
 # =========================
@@ -28,38 +33,18 @@ if not SECRET_KEY:
 # 비밀번호 해시/검증 설정
 # =========================
 
+# Argon2 비용은 설정값으로 조절 (바꾸면 기존 해시는 다음 로그인 때 새 비용으로 다시 해시됨)
 pwd_context = CryptContext(
     schemes=["argon2", "bcrypt_sha256", "bcrypt"],
     deprecated="auto",
+    argon2__time_cost=settings.ARGON2_TIME_COST,
+    argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+    argon2__parallelism=settings.ARGON2_PARALLELISM,
 )
 
 
-def verify_password(plain_password, hashed_password):
-    if hashed_password is None:
-        return False
-
-    # bcrypt는 입력 최대 72바이트 제한 → 동일하게 맞춰주기
-    try:
-        if isinstance(plain_password, str):
-            plain_bytes = plain_password.encode("utf-8")
-        else:
-            plain_bytes = bytes(plain_password)
-    except Exception:
-        plain_bytes = str(plain_password).encode("utf-8")
-
-    if len(plain_bytes) > 72:
-        # 디버깅에 도움이 되도록 서버 로그에 경고 출력
-        print(
-            "[auth.verify_password] plain_password length >72 bytes, "
-            "truncating for verification"
-        )
-        plain_password = plain_bytes[:72].decode("utf-8", errors="ignore")
-
-    return pwd_context.verify(plain_password, hashed_password)
-
-
-def get_password_hash(password: str) -> str:
-    # bcrypt backend는 비밀번호 최대 72바이트까지 지원 → 초과분은 잘라서 사용
+def _truncate_72(password, where: str) -> str:
+    """bcrypt는 입력 최대 72바이트 제한 → 해시/검증 모두 같은 규칙으로 잘라서 사용"""
     try:
         if isinstance(password, str):
             password_bytes = password.encode("utf-8")
@@ -69,15 +54,119 @@ def get_password_hash(password: str) -> str:
         password_bytes = str(password).encode("utf-8")
 
     if len(password_bytes) > 72:
-        print(
-            "[auth.get_password_hash] password length >72 bytes, "
-            "truncating before hashing"
-        )
+        # 디버깅에 도움이 되도록 서버 로그에 경고 출력
+        print(f"[auth.{where}] password length >72 bytes, truncating")
         password_bytes = password_bytes[:72]
 
     # passlib은 str 입력을 기대하므로 안전하게 디코딩
-    safe_password = password_bytes.decode("utf-8", errors="ignore")
-    return pwd_context.hash(safe_password)
+    return password_bytes.decode("utf-8", errors="ignore")
+
+
+def verify_password(plain_password, hashed_password):
+    if hashed_password is None:
+        return False
+    return pwd_context.verify(_truncate_72(plain_password, "verify_password"), hashed_password)
+
+
+def verify_and_update_password(plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+    """
+    비밀번호 검증 + 필요하면 새 해시 반환
+    - 해시 방식/Argon2 비용이 현재 설정과 다르면 (True, 새 해시), 같으면 (True, None)
+    """
+    if hashed_password is None:
+        return False, None
+    return pwd_context.verify_and_update(
+        _truncate_72(plain_password, "verify_and_update_password"), hashed_password
+    )
+
+
+def get_password_hash(password: str) -> str:
+    return pwd_context.hash(_truncate_72(password, "get_password_hash"))
+
+
+# =========================
+# 비밀번호 해시 전용 스레드 풀
+# =========================
+
+class PasswordHashingBusy(RuntimeError):
+    """해시 대기열이 가득 참 → 503 으로 바로 응답 (main.py 예외 핸들러)"""
+
+
+class PasswordHasher:
+    """
+    Argon2 계산을 요청 스레드 풀과 분리된 전용 풀에서 실행
+    - 동시에 계산하는 수는 PASSWORD_HASH_WORKERS (보통 CPU 코어 수)
+    - 대기열이 PASSWORD_HASH_QUEUE_SIZE 를 넘으면 기다리지 않고 PasswordHashingBusy
+      → 로그인/가입이 몰려도 대기 요청이 쌓여 다른 API 까지 느려지지 않음
+    - 라우터는 *_async 로 결과를 기다림 (기다리는 동안 FastAPI 스레드 풀 스레드를 쓰지 않음)
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        # 작업 스레드(done callback)와 이벤트 루프에서 함께 올리므로 별도 lock
+        self._stats_lock = threading.Lock()
+        self.stats = {"completed": 0, "rejected": 0, "rehashed": 0}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="password-hash"
+                    )
+        return self._executor
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _release(self, _future: Future) -> None:
+        self._slots.release()
+        self._count("completed")
+
+    def submit(self, fn: Callable[..., T], *args) -> "Future[T]":
+        if not self._slots.acquire(blocking=False):
+            self._count("rejected")
+            raise PasswordHashingBusy("비밀번호 처리 요청이 많습니다. 잠시 후 다시 시도해주세요.")
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    # ----- async 라우터용 (기다리는 동안 요청 스레드도, 이벤트 루프도 잡지 않음) -----
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self.submit(get_password_hash, password))
+
+    async def verify_and_update_async(self, plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+        verified, new_hash = await asyncio.wrap_future(
+            self.submit(verify_and_update_password, plain_password, hashed_password)
+        )
+        if new_hash:
+            self._count("rehashed")
+        return verified, new_hash
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {**stats, "workers": self.workers, "queue_size": self.queue_size}
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    queue_size=settings.PASSWORD_HASH_QUEUE_SIZE,
+)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
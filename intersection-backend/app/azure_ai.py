@@ -2,16 +2,126 @@
 
 from __future__ import annotations
 
+import asyncio
+import copy
+import hashlib
 import json
-from typing import List, Dict, Any
+import threading
+import time
+from collections import OrderedDict
+import re
+from typing import List, Dict, Any, Optional, AsyncIterator
 
-from openai import AzureOpenAI  # pip 패키지: openai
+from openai import AzureOpenAI, AsyncAzureOpenAI  # pip 패키지: openai
 from .config import settings
 from .models import User
 
 _client: AzureOpenAI | None = None
 
 
+# =====================================================
+# 🗃️ AI 추천 응답 캐시
+#
+# 같은 (나, 후보들) 프로필로 다시 요청하면 Azure 를 호출하지 않는다.
+# - 전체 응답: 정규화한 payload 해시 → 결과 목록
+# - 후보별: (내 프로필, 후보 프로필) 해시 → reason / first_messages
+#   → 후보 일부만 바뀐 경우 새 후보만 LLM 에 보냄
+# - TTL(AI_CACHE_TTL_SECONDS) 지나면 만료, AI_CACHE_MAX_ENTRIES 넘으면 오래 안 쓴 것부터 제거(LRU)
+# - JSON 파싱 실패로 만든 fallback 결과는 캐시하지 않음
+# =====================================================
+class _TTLCache:
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._items: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._items[key]
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(item[1])
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(value))
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+_response_cache = _TTLCache(settings.AI_CACHE_MAX_ENTRIES, settings.AI_CACHE_TTL_SECONDS)
+_candidate_cache = _TTLCache(settings.AI_CACHE_MAX_ENTRIES, settings.AI_CACHE_TTL_SECONDS)
+# 전체 캐시는 없지만 후보 일부를 재사용한 호출 수 / 실제 Azure 호출 수
+_partial_hits = 0
+_llm_calls = 0
+
+
+def _hash(value: Any) -> str:
+    normalized = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def _response_key(payload: Dict[str, Any]) -> str:
+    # 후보 순서가 달라도 같은 요청으로 취급
+    return _hash({
+        "me": payload["me"],
+        "candidates": sorted(payload["candidates"], key=lambda c: c["id"]),
+    })
+
+
+def _candidate_key(me: Dict[str, Any], candidate: Dict[str, Any]) -> str:
+    return _hash({"me": me, "candidate": candidate})
+
+
+def get_ai_cache_stats() -> Dict[str, int]:
+    """AI 추천 캐시 적중/미스 통계"""
+    return {
+        "response_hits": _response_cache.hits,
+        "response_misses": _response_cache.misses,
+        "response_entries": len(_response_cache),
+        "candidate_hits": _candidate_cache.hits,
+        "candidate_misses": _candidate_cache.misses,
+        "candidate_entries": len(_candidate_cache),
+        "partial_hits": _partial_hits,
+        "llm_calls": _llm_calls,
+    }
+
+
+def clear_ai_cache() -> None:
+    global _partial_hits, _llm_calls
+    _response_cache.clear()
+    _candidate_cache.clear()
+    _partial_hits = _llm_calls = 0
+
+
+def candidate_cache_keys(current_user: User, candidates: List[User]) -> Dict[int, str]:
+    """{후보 id: 후보별 캐시 키} (미리 계산된 결과를 저장/조회할 때 사용)"""
+    payload = _build_friend_reco_payload(current_user, candidates)
+    return {c["id"]: _candidate_key(payload["me"], c) for c in payload["candidates"]}
+
+
+def remember_candidate_result(cache_key: str, item: Dict[str, Any]) -> None:
+    """미리 계산된 후보별 결과를 메모리 캐시에 올림"""
+    _candidate_cache.set(cache_key, item)
+
+
 def get_azure_client() -> AzureOpenAI:
     """
     Azure OpenAI 클라이언트 싱글톤 생성.
@@ -25,13 +135,13 @@ def get_azure_client() -> AzureOpenAI:
     if not settings.AZURE_OPENAI_ENDPOINT or not settings.AZURE_OPENAI_API_KEY:
         raise RuntimeError("Azure OpenAI 설정이 없습니다. ENDPOINT / API_KEY 를 확인하세요.")
 
-    if not settings.AZURE_OPENAI_CHAT_DEPLOYMENT:
-        raise RuntimeError("AZURE_OPENAI_CHAT_DEPLOYMENT 가 설정되지 않았습니다.")
-
+    # 기본값(10분 타임아웃)이면 느린 엔드포인트가 호출한 스레드를 오래 붙잡으므로 명시
     _client = AzureOpenAI(
         api_key=settings.AZURE_OPENAI_API_KEY,
         api_version=settings.AZURE_OPENAI_API_VERSION,
         azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
+        timeout=settings.AI_REQUEST_TIMEOUT_SECONDS,
+        max_retries=1,
     )
     return _client
 
@@ -68,6 +178,61 @@ def _build_friend_reco_payload(current_user: User, candidates: List[User]) -> Di
     return {"me": me, "candidates": cands}
 
 
+def _lookup_cache(current_user: User, candidates: List[User]):
+    """
+    캐시 조회.
+    반환: (payload, 전체 응답 키, 후보별 결과 {user_id: item}, 캐시에 없는 후보 목록)
+    전체 응답이 캐시에 있으면 missing 은 빈 목록.
+    """
+    global _partial_hits
+
+    payload = _build_friend_reco_payload(current_user, candidates)
+    response_key = _response_key(payload)
+    cached = _response_cache.get(response_key)
+    if cached is not None:
+        return payload, response_key, {item["user_id"]: item for item in cached}, []
+
+    me = payload["me"]
+    found: Dict[int, Dict[str, Any]] = {}
+    missing: List[User] = []
+    for user, candidate in zip(candidates, payload["candidates"]):
+        item = _candidate_cache.get(_candidate_key(me, candidate))
+        if item is not None:
+            found[user.id] = item
+        else:
+            missing.append(user)
+    if missing and found:
+        _partial_hits += 1
+    return payload, response_key, found, missing
+
+
+def _store_generated(
+    payload: Dict[str, Any],
+    found: Dict[int, Dict[str, Any]],
+    generated: List[Dict[str, Any]],
+) -> None:
+    """LLM 결과를 후보별 캐시에 저장하고 found 에 합침"""
+    me = payload["me"]
+    profiles = {c["id"]: c for c in payload["candidates"]}
+    for item in generated:
+        user_id = item["user_id"]
+        if user_id in profiles and user_id not in found:
+            found[user_id] = item
+            _candidate_cache.set(_candidate_key(me, profiles[user_id]), item)
+
+
+def _ordered_results(
+    response_key: str,
+    candidates: List[User],
+    found: Dict[int, Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    results = [found[u.id] for u in candidates if u.id in found]
+    # 모든 후보에 대한 결과가 있을 때만 전체 응답 캐시
+    if len(results) == len(candidates):
+        _response_cache.set(response_key, results)
+    return results
+
+
 def generate_friend_recommendations_ai(
     current_user: User,
     candidates: List[User],
@@ -77,6 +242,7 @@ def generate_friend_recommendations_ai(
     - 추천 이유(reason)
     - 첫 메시지 후보(first_messages)
     를 생성한다.
+    캐시에 있는 후보는 재사용하고, 없는 후보만 LLM 에 보낸다. (결과는 candidates 순서)
 
     반환 형식:
     [
@@ -88,9 +254,319 @@ def generate_friend_recommendations_ai(
       ...
     ]
     """
-    payload = _build_friend_reco_payload(current_user, candidates)
+    global _llm_calls
+
+    payload, response_key, found, missing = _lookup_cache(current_user, candidates)
+    if missing:
+        request = _chat_request(_build_friend_reco_payload(current_user, missing))
+        _llm_calls += 1
+        response = get_azure_client().chat.completions.create(**request)
+        generated, cacheable = _parse_recommendations(response.choices[0].message.content, missing)
+        if not cacheable:
+            # fallback 결과는 이번 응답에만 사용
+            found.update({item["user_id"]: item for item in generated})
+            return [found[u.id] for u in candidates if u.id in found]
+        _store_generated(payload, found, generated)
+
+    return _ordered_results(response_key, candidates, found)
+
+
+# =====================================================
+# ⏱️ 비동기 + 지연 예산 (recommend_friends_ai 용)
+#
+# 이벤트 루프에서 AsyncAzureOpenAI 로 호출하고 latency_budget 안에 끝나지 않으면 None.
+# 호출은 취소하지 않고 백그라운드에서 끝까지 진행 → 결과가 캐시에 들어가서
+# 다음 요청부터는 AI 추천 이유가 바로 나간다.
+# 같은 후보 묶음으로 이미 진행 중인 호출이 있으면 새로 호출하지 않고 그 호출을 기다림.
+# =====================================================
+_async_client: AsyncAzureOpenAI | None = None
+_inflight: Dict[str, "asyncio.Task"] = {}
+
+
+def get_async_azure_client() -> AsyncAzureOpenAI:
+    """비동기 클라이언트 싱글톤 (AI_REQUEST_TIMEOUT_SECONDS 가 백그라운드 호출의 상한)"""
+    global _async_client
+
+    if _async_client is not None:
+        return _async_client
+
+    if not settings.AZURE_OPENAI_ENDPOINT or not settings.AZURE_OPENAI_API_KEY:
+        raise RuntimeError("Azure OpenAI 설정이 없습니다. ENDPOINT / API_KEY 를 확인하세요.")
+
+    _async_client = AsyncAzureOpenAI(
+        api_key=settings.AZURE_OPENAI_API_KEY,
+        api_version=settings.AZURE_OPENAI_API_VERSION,
+        azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
+        timeout=settings.AI_REQUEST_TIMEOUT_SECONDS,
+        max_retries=0,
+    )
+    return _async_client
+
+
+async def _agenerate_missing(
+    payload: Dict[str, Any],
+    current_user: User,
+    missing: List[User],
+) -> Optional[List[Dict[str, Any]]]:
+    """캐시에 없는 후보만 비동기로 생성해서 후보별 캐시에 저장 (fallback 결과면 None)"""
+    global _llm_calls
+
+    request = _chat_request(_build_friend_reco_payload(current_user, missing))
+    _llm_calls += 1
+    response = await get_async_azure_client().chat.completions.create(**request)
+    generated, cacheable = _parse_recommendations(response.choices[0].message.content, missing)
+    if not cacheable:
+        return None
+    _store_generated(payload, {}, generated)
+    return generated
+
+
+def _log_background_failure(task: "asyncio.Task") -> None:
+    if not task.cancelled() and task.exception() is not None:
+        print(f"[azure_ai] background recommendation failed: {task.exception()!r}")
+
+
+async def generate_friend_recommendations_ai_within(
+    current_user: User,
+    candidates: List[User],
+    latency_budget: Optional[float] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    latency_budget(초, 기본 AI_LATENCY_BUDGET_SECONDS) 안에 AI 결과를 만들면 그 결과,
+    못 만들면 None (호출측은 규칙 기반 설명 사용, AI 호출은 백그라운드에서 계속).
+    Azure 설정이 없으면 RuntimeError.
+    """
+    if latency_budget is None:
+        latency_budget = settings.AI_LATENCY_BUDGET_SECONDS
+
+    payload, response_key, found, missing = _lookup_cache(current_user, candidates)
+    if not missing:
+        return _ordered_results(response_key, candidates, found)
+
+    if not settings.AZURE_OPENAI_CHAT_DEPLOYMENT:
+        raise RuntimeError("AZURE_OPENAI_CHAT_DEPLOYMENT 가 설정되지 않았습니다.")
+
+    task = _inflight.get(response_key)
+    if task is None:
+        task = asyncio.ensure_future(_agenerate_missing(payload, current_user, missing))
+        _inflight[response_key] = task
+        task.add_done_callback(lambda _t: _inflight.pop(response_key, None))
+        task.add_done_callback(_log_background_failure)
 
-    client = get_azure_client()
+    # shield: 예산이 지나도 호출 자체는 취소하지 않음
+    done, _ = await asyncio.wait({asyncio.shield(task)}, timeout=latency_budget)
+    if not done or task.exception() is not None or task.result() is None:
+        return None
+
+    profiles = {u.id for u in missing}
+    for item in task.result():
+        if item["user_id"] in profiles:
+            found.setdefault(item["user_id"], item)
+    return _ordered_results(response_key, candidates, found)
+
+
+# =====================================================
+# 📡 스트리밍 (recommend_friends_ai_stream 용)
+#
+# 모델 출력 {"recommendations": [{...}, {...}]} 을 토큰 조각 단위로 받으면서
+# 배열 안 객체가 하나 닫힐 때마다 바로 파싱해서 내보낸다.
+# =====================================================
+_RECOMMENDATIONS_START = re.compile(r'"recommendations"\s*:\s*\[')
+
+
+class _RecommendationStreamParser:
+    """조각난 JSON 텍스트에서 recommendations 배열의 완성된 객체만 순서대로 꺼내는 파서"""
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0              # 다음에 검사할 위치
+        self._in_array = False
+        self._finished = False     # 배열이 닫힘
+        self._depth = 0            # 배열 안에서의 중첩 깊이
+        self._in_string = False
+        self._escape = False
+        self._start: Optional[int] = None
+        self.count = 0
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        self._buffer += text
+        items: List[Dict[str, Any]] = []
+        if self._finished:
+            return items
+
+        if not self._in_array:
+            match = _RECOMMENDATIONS_START.search(self._buffer)
+            if match is None:
+                return items
+            self._in_array = True
+            self._pos = match.end()
+
+        buf = self._buffer
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if self._depth == 0 and ch == "{":
+                    self._start = i
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 0:
+                    # recommendations 배열 끝
+                    self._finished = True
+                    break
+                self._depth -= 1
+                if self._depth == 0 and self._start is not None:
+                    try:
+                        item = json.loads(buf[self._start:i + 1])
+                    except json.JSONDecodeError:
+                        item = None
+                    if isinstance(item, dict):
+                        items.append(item)
+                        self.count += 1
+                    self._start = None
+            i += 1
+        self._pos = i
+        return items
+
+    @property
+    def text(self) -> str:
+        return self._buffer
+
+
+async def stream_friend_recommendations_ai(
+    current_user: User,
+    candidates: List[User],
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    후보별 AI 결과를 준비되는 순서대로 내보내는 async generator.
+    - 캐시에 있는 후보는 즉시
+    - 나머지는 스트리밍 응답에서 객체 하나가 완성될 때마다 (후보별 캐시에도 저장)
+    Azure 설정이 없으면 캐시된 후보까지만 내보낸 뒤 RuntimeError.
+    """
+    global _llm_calls
+
+    payload, response_key, found, missing = _lookup_cache(current_user, candidates)
+    for u in candidates:
+        if u.id in found:
+            yield found[u.id]
+    if not missing:
+        _ordered_results(response_key, candidates, found)
+        return
+
+    request = _chat_request(_build_friend_reco_payload(current_user, missing))
+    request["stream"] = True
+    _llm_calls += 1
+    stream = await get_async_azure_client().chat.completions.create(**request)
+
+    wanted = {u.id for u in missing}
+    parser = _RecommendationStreamParser()
+    async for chunk in stream:
+        # Azure 는 콘텐츠 필터 결과만 담긴(choices 가 빈) 청크를 먼저 보낼 수 있음
+        if not chunk.choices:
+            continue
+        piece = chunk.choices[0].delta.content
+        if not piece:
+            continue
+        for raw in parser.feed(piece):
+            item = _clean_item(raw)
+            if item and item["user_id"] in wanted and item["user_id"] not in found:
+                _store_generated(payload, found, [item])
+                yield item
+
+    if parser.count == 0:
+        # 형식을 따르지 않은 응답: 전체 텍스트로 한 번 더 파싱 (fallback 은 캐시하지 않음)
+        generated, cacheable = _parse_recommendations(parser.text, missing)
+        for item in generated:
+            if item["user_id"] in wanted and item["user_id"] not in found:
+                if cacheable:
+                    _store_generated(payload, found, [item])
+                else:
+                    found[item["user_id"]] = item
+                yield item
+        if not cacheable:
+            return
+
+    _ordered_results(response_key, candidates, found)
+
+
+# =====================================================
+# 📦 여러 사용자 묶음 호출 (ai_precompute 배치 작업용)
+# =====================================================
+async def agenerate_batch(
+    requests: List[tuple[User, List[User]]],
+    max_tokens: int,
+) -> tuple[Dict[int, List[Dict[str, Any]]], int]:
+    """
+    여러 (사용자, 후보 목록) 을 한 번의 Chat 호출로 생성.
+    반환: ({사용자 id: 결과 목록}, 사용한 토큰 수 (응답에 없으면 0))
+    각 사용자 결과는 그 사용자의 후보에 대한 항목만 포함.
+    """
+    global _llm_calls
+
+    if not settings.AZURE_OPENAI_CHAT_DEPLOYMENT:
+        raise RuntimeError("AZURE_OPENAI_CHAT_DEPLOYMENT 가 설정되지 않았습니다.")
+
+    payloads = [_build_friend_reco_payload(me, candidates) for me, candidates in requests]
+    system_prompt = (
+        "너는 친구 추천 서비스를 위한 추천 설명 도우미야. "
+        "requests 의 각 항목마다 사용자(me)의 프로필과 추천 후보들(candidates)의 프로필을 보고, "
+        "왜 이 사람들을 추천하는지 한두 문장으로 한국어로 설명해주고, "
+        "상대에게 부담스럽지 않은 첫 채팅 문장을 2~3개 만들어줘.\n\n"
+        "출력은 반드시 JSON 형식으로만 반환해야 한다. "
+        '형식은 {\"results\": [{\"me_id\": ..., \"recommendations\": '
+        '[{\"user_id\": ..., \"reason\": \"...\", \"first_messages\": [\"...\"]}]}]} 이다.'
+    )
+    user_prompt = json.dumps({"requests": payloads}, ensure_ascii=False)
+
+    _llm_calls += 1
+    response = await get_async_azure_client().chat.completions.create(
+        model=settings.AZURE_OPENAI_CHAT_DEPLOYMENT,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+        temperature=0.7,
+        max_tokens=max_tokens,
+        response_format={"type": "json_object"},
+    )
+    used = response.usage.total_tokens if response.usage else 0
+
+    try:
+        data = json.loads(response.choices[0].message.content)
+    except Exception:
+        return {}, used
+
+    wanted = {p["me"]["id"]: {c["id"] for c in p["candidates"]} for p in payloads}
+    results: Dict[int, List[Dict[str, Any]]] = {}
+    for entry in data.get("results", []) if isinstance(data, dict) else []:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            me_id = int(entry.get("me_id"))
+        except (TypeError, ValueError):
+            continue
+        if me_id not in wanted:
+            continue
+        items = [_clean_item(r) for r in entry.get("recommendations") or [] if isinstance(r, dict)]
+        results[me_id] = [item for item in items if item and item["user_id"] in wanted[me_id]]
+    return results, used
+
+
+# -----------------------------------------------------
+# 요청 / 응답 변환 (동기 / 비동기 공용)
+# -----------------------------------------------------
+def _chat_request(payload: Dict[str, Any]) -> Dict[str, Any]:
+    if not settings.AZURE_OPENAI_CHAT_DEPLOYMENT:
+        raise RuntimeError("AZURE_OPENAI_CHAT_DEPLOYMENT 가 설정되지 않았습니다.")
 
     # system / user 메시지 구성
     system_prompt = (
@@ -108,18 +584,51 @@ def generate_friend_recommendations_ai(
         f"{json.dumps(payload, ensure_ascii=False)}"
     )
 
-    response = client.chat.completions.create(
-        model=settings.AZURE_OPENAI_CHAT_DEPLOYMENT,
-        messages=[
+    return {
+        "model": settings.AZURE_OPENAI_CHAT_DEPLOYMENT,
+        "messages": [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt},
         ],
-        temperature=0.7,
-        max_tokens=800,
-        response_format={"type": "json_object"},
-    )
+        "temperature": 0.7,
+        "max_tokens": 800,
+        "response_format": {"type": "json_object"},
+    }
+
+
+def _clean_item(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """모델 출력 항목 하나 정리 (user_id 가 정수가 아니면 None)"""
+    try:
+        user_id = int(item.get("user_id"))
+    except (TypeError, ValueError):
+        return None
+    reason = item.get("reason") or "비슷한 학교/지역/나이대라 추천합니다."
+    first_messages = item.get("first_messages") or []
+
+    # first_messages 는 문자열 리스트로 강제
+    fm_list: List[str] = []
+    if isinstance(first_messages, list):
+        for v in first_messages:
+            if isinstance(v, str) and v.strip():
+                fm_list.append(v.strip())
+    elif isinstance(first_messages, str):
+        fm_list.append(first_messages.strip())
 
-    content = response.choices[0].message.content
+    return {
+        "user_id": user_id,
+        "reason": reason,
+        "first_messages": fm_list,
+    }
+
+
+def _parse_recommendations(
+    content: Optional[str],
+    candidates: List[User],
+) -> tuple[List[Dict[str, Any]], bool]:
+    """
+    모델 응답(JSON 문자열) → 결과 목록.
+    (결과 목록, 캐시 가능 여부) 반환 - JSON 파싱 실패로 만든 fallback 이면 False
+    """
     try:
         data = json.loads(content)
     except Exception:
@@ -136,31 +645,8 @@ def generate_friend_recommendations_ai(
                     ],
                 }
             )
-        return results
-
-    recos = data.get("recommendations", [])
-    cleaned: List[Dict[str, Any]] = []
-
-    for item in recos:
-        user_id = item.get("user_id")
-        reason = item.get("reason") or "비슷한 학교/지역/나이대라 추천합니다."
-        first_messages = item.get("first_messages") or []
-
-        # first_messages 는 문자열 리스트로 강제
-        fm_list: List[str] = []
-        if isinstance(first_messages, list):
-            for v in first_messages:
-                if isinstance(v, str) and v.strip():
-                    fm_list.append(v.strip())
-        elif isinstance(first_messages, str):
-            fm_list.append(first_messages.strip())
-
-        cleaned.append(
-            {
-                "user_id": user_id,
-                "reason": reason,
-                "first_messages": fm_list,
-            }
-        )
+        return results, False
 
-    return cleaned
+    recos = data.get("recommendations", []) if isinstance(data, dict) else []
+    cleaned = [item for item in (_clean_item(r) for r in recos if isinstance(r, dict)) if item]
+    return cleaned, True
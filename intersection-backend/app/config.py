@@ -1,6 +1,6 @@
 import os
 from functools import lru_cache
-from typing import List
+from typing import Dict, List
 
 # ✅ .env 자동 로드 (python-dotenv 없어도 안전하게 패스)
 try:
@@ -25,6 +25,39 @@ class Settings:
         self.ACCESS_TOKEN_EXPIRE_MINUTES: int = int(
             os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440")
         )
+        # 로그인 사용자 캐시: 유효 시간(초, 0 이면 사용 안 함) / 최대 사용자 수
+        self.USER_CACHE_TTL_SECONDS: int = int(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+        self.USER_CACHE_MAX_ENTRIES: int = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+
+        # ===== 비밀번호 해시 =====
+        # Argon2 비용: 반복 횟수 / 메모리(KiB) / 병렬 lane 수 (바꾸면 로그인 때 자동으로 다시 해시)
+        self.ARGON2_TIME_COST: int = int(os.getenv("ARGON2_TIME_COST", "3"))
+        self.ARGON2_MEMORY_COST: int = int(os.getenv("ARGON2_MEMORY_COST", "65536"))
+        self.ARGON2_PARALLELISM: int = int(os.getenv("ARGON2_PARALLELISM", "4"))
+        # 해시 전용 스레드 수(기본: CPU 코어 수) / 대기 가능한 요청 수 (넘으면 503)
+        self.PASSWORD_HASH_WORKERS: int = int(
+            os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2))
+        )
+        self.PASSWORD_HASH_QUEUE_SIZE: int = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "32"))
+
+        # ===== 로그인 시도 제한 (토큰 버킷, 0 이면 사용 안 함) =====
+        # 로그인 ID 별 / IP 별: 연속 허용 횟수 / 분당 다시 채워지는 횟수
+        self.LOGIN_THROTTLE_LOGIN_BURST: int = int(os.getenv("LOGIN_THROTTLE_LOGIN_BURST", "5"))
+        self.LOGIN_THROTTLE_LOGIN_PER_MINUTE: float = float(
+            os.getenv("LOGIN_THROTTLE_LOGIN_PER_MINUTE", "5")
+        )
+        # 학교 등 여러 학생이 같은 공인 IP 를 쓰는 경우가 많아 IP 한도는 넉넉하게
+        self.LOGIN_THROTTLE_IP_BURST: int = int(os.getenv("LOGIN_THROTTLE_IP_BURST", "30"))
+        self.LOGIN_THROTTLE_IP_PER_MINUTE: float = float(
+            os.getenv("LOGIN_THROTTLE_IP_PER_MINUTE", "30")
+        )
+        # memory: 프로세스별 (기본) / database: 인스턴스 간 공유 (migrations/add_login_throttle_bucket.sql)
+        self.LOGIN_THROTTLE_BACKEND: str = os.getenv("LOGIN_THROTTLE_BACKEND", "memory")
+        self.LOGIN_THROTTLE_MAX_KEYS: int = int(os.getenv("LOGIN_THROTTLE_MAX_KEYS", "100000"))
+        # 프록시(App Service 등) 뒤에서 X-Forwarded-For 의 마지막 값을 클라이언트 IP 로 사용
+        self.LOGIN_THROTTLE_TRUST_FORWARDED_FOR: bool = (
+            os.getenv("LOGIN_THROTTLE_TRUST_FORWARDED_FOR", "false").lower() in {"1", "true", "yes"}
+        )
 
         # ===== DB 연결 =====
         self.DATABASE_URL: str = os.getenv(
@@ -56,6 +89,31 @@ class Settings:
             "",
         )
 
+        # AI 추천 응답 대기 한도(초, 넘으면 규칙 기반 설명으로 응답) / 백그라운드 호출 타임아웃(초)
+        self.AI_LATENCY_BUDGET_SECONDS: float = float(os.getenv("AI_LATENCY_BUDGET_SECONDS", "2.0"))
+        self.AI_REQUEST_TIMEOUT_SECONDS: float = float(os.getenv("AI_REQUEST_TIMEOUT_SECONDS", "30"))
+        # AI 추천 이유/첫 메시지 캐시: 유효 시간(초) / 최대 항목 수 (전체 응답, 후보별 각각)
+        self.AI_CACHE_TTL_SECONDS: int = int(os.getenv("AI_CACHE_TTL_SECONDS", "21600"))
+        self.AI_CACHE_MAX_ENTRIES: int = int(os.getenv("AI_CACHE_MAX_ENTRIES", "10000"))
+
+        # AI 추천 이유 배치 생성: 동시 호출 수 / 분당 토큰 한도 / 호출 1번에 묶을 최대 후보 수
+        self.AI_PRECOMPUTE_CONCURRENCY: int = int(os.getenv("AI_PRECOMPUTE_CONCURRENCY", "4"))
+        self.AI_PRECOMPUTE_TOKENS_PER_MINUTE: int = int(
+            os.getenv("AI_PRECOMPUTE_TOKENS_PER_MINUTE", "60000")
+        )
+        self.AI_PRECOMPUTE_BATCH_CANDIDATES: int = int(
+            os.getenv("AI_PRECOMPUTE_BATCH_CANDIDATES", "40")
+        )
+
+        # ===== 프로필 임베딩 =====
+        # auto: Azure 임베딩 배포가 설정돼 있으면 azure, 아니면 local (해시 기반, 네트워크 없음)
+        self.EMBEDDING_PROVIDER: str = os.getenv("EMBEDDING_PROVIDER", "auto")
+        # 벡터 차원 (azure 는 dimensions 파라미터를 지원하는 text-embedding-3 계열 필요)
+        self.EMBEDDING_DIMENSIONS: int = int(os.getenv("EMBEDDING_DIMENSIONS", "256"))
+        # exact: 전체 내적 / ivf: 군집 중 가까운 EMBEDDING_IVF_PROBES 개만 탐색 (근사)
+        self.EMBEDDING_INDEX_MODE: str = os.getenv("EMBEDDING_INDEX_MODE", "exact")
+        self.EMBEDDING_IVF_PROBES: int = int(os.getenv("EMBEDDING_IVF_PROBES", "8"))
+
         # ===== Kakao OAuth =====
         self.KAKAO_CLIENT_ID: str = os.getenv("KAKAO_CLIENT_ID", "")
         self.KAKAO_CLIENT_SECRET: str = os.getenv("KAKAO_CLIENT_SECRET", "")
@@ -73,11 +131,88 @@ class Settings:
             "https://open.neis.go.kr/hub",
         )
 
+        # ===== 파일 업로드 저장소 =====
+        # local: 앱 서버 디스크(UPLOAD_DIR) / azure: Azure Blob Storage
+        # (인스턴스가 여러 대면 반드시 azure 사용)
+        self.STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "local")
+        self.UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "uploads")
+        # Azurite 로컬 에뮬레이터도 연결 문자열만 바꾸면 그대로 동작
+        self.AZURE_STORAGE_CONNECTION_STRING: str = os.getenv(
+            "AZURE_STORAGE_CONNECTION_STRING",
+            "",
+        )
+        self.AZURE_STORAGE_CONTAINER: str = os.getenv(
+            "AZURE_STORAGE_CONTAINER",
+            "uploads",
+        )
+        # CDN 등 별도 공개 URL을 쓰는 경우 (비우면 저장소 기본 URL 사용)
+        self.STORAGE_PUBLIC_BASE_URL: str = os.getenv("STORAGE_PUBLIC_BASE_URL", "")
+        # 직접 업로드(pre-signed URL) 유효 시간 (초)
+        self.UPLOAD_URL_EXPIRE_SECONDS: int = int(
+            os.getenv("UPLOAD_URL_EXPIRE_SECONDS", "900")
+        )
+        # 재개 가능한(청크) 업로드: 청크 최대 크기(바이트) / 방치된 세션 만료 시간
+        self.UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+        self.UPLOAD_SESSION_EXPIRE_HOURS: int = int(
+            os.getenv("UPLOAD_SESSION_EXPIRE_HOURS", "24")
+        )
+
+        # ===== 인기(hot) 피드 =====
+        # 좋아요/댓글 점수가 절반으로 줄어드는 시간 / 점수 DB 저장 주기
+        self.HOT_HALF_LIFE_HOURS: float = float(os.getenv("HOT_HALF_LIFE_HOURS", "12"))
+        self.HOT_FLUSH_INTERVAL_SECONDS: int = int(
+            os.getenv("HOT_FLUSH_INTERVAL_SECONDS", "60")
+        )
+
+        # ===== 추천 친구 프로필 인덱스 =====
+        # 학습된 TF-IDF 인덱스 저장 위치 (재시작 시 다시 학습하지 않음)
+        self.PROFILE_INDEX_PATH: str = os.getenv(
+            "PROFILE_INDEX_PATH",
+            "data/profile_index.pkl",
+        )
+
+        # ===== 추천 친구 저장소 =====
+        # 사용자별 저장 후보 수 / 저장 목록 유효 시간 / 백그라운드 갱신 주기 / 한 번에 갱신할 사용자 수
+        self.RECOMMENDATION_SIZE: int = int(os.getenv("RECOMMENDATION_SIZE", "20"))
+        self.RECOMMENDATION_TTL_SECONDS: int = int(
+            os.getenv("RECOMMENDATION_TTL_SECONDS", "3600")
+        )
+        self.RECOMMENDATION_REFRESH_INTERVAL_SECONDS: int = int(
+            os.getenv("RECOMMENDATION_REFRESH_INTERVAL_SECONDS", "60")
+        )
+        self.RECOMMENDATION_REFRESH_BATCH: int = int(
+            os.getenv("RECOMMENDATION_REFRESH_BATCH", "100")
+        )
+        # 추천 파이프라인 점수 가중치 ("점수기:가중치,...", 점수기: rules / tfidf / mutual_friends / embedding)
+        self.RECOMMENDATION_RULE_WEIGHTS: str = os.getenv("RECOMMENDATION_RULE_WEIGHTS", "rules:1")
+        self.RECOMMENDATION_CONTENT_WEIGHTS: str = os.getenv(
+            "RECOMMENDATION_CONTENT_WEIGHTS",
+            "tfidf:5,mutual_friends:1.5",
+        )
+        # 후보군(버킷 조회 결과) 재사용 시간(초) - rule / content 계산이 같은 후보군을 공유
+        self.RECOMMENDATION_POOL_TTL_SECONDS: int = int(
+            os.getenv("RECOMMENDATION_POOL_TTL_SECONDS", "60")
+        )
+
     @property
     def allowed_origins_list(self) -> List[str]:
         """ALLOWED_ORIGINS를 리스트로 변환"""
         return [o.strip() for o in self.ALLOWED_ORIGINS.split(",") if o.strip()]
 
+    def recommendation_weights(self, kind: str) -> Dict[str, float]:
+        """RECOMMENDATION_{KIND}_WEIGHTS 를 {점수기: 가중치} 로 변환"""
+        raw = getattr(self, f"RECOMMENDATION_{kind.upper()}_WEIGHTS")
+        weights: Dict[str, float] = {}
+        for part in raw.split(","):
+            name, _, weight = part.partition(":")
+            if not name.strip():
+                continue
+            try:
+                weights[name.strip()] = float(weight) if weight.strip() else 1.0
+            except ValueError:
+                raise RuntimeError(f"⚠️ RECOMMENDATION_{kind.upper()}_WEIGHTS 형식 오류: {part!r}")
+        return weights
+
 
 @lru_cache
 def get_settings() -> Settings:
@@ -28,6 +28,17 @@ def create_db_and_tables() -> None:
     SQLModel.metadata.create_all(engine)
 
 def get_session():
-    """필요시 사용 가능한 Session 의존성"""
-    with Session(engine) as session:
-        yield session
+    """
+    요청 단위 Session 의존성 (dependencies.db_session 으로 사용)
+    - 라우터와 인증 의존성이 같은 Session 하나를 공유 → 요청당 커넥션 1개
+    - 커넥션은 첫 쿼리 때 풀에서 가져옴 (캐시만 쓰는 요청은 커넥션을 잡지 않음)
+    - 핸들러가 정상 종료하면 commit, 예외(HTTPException 포함)면 rollback
+    - commit 후에도 객체를 만료시키지 않아 응답 직렬화 시 다시 조회하지 않음
+    """
+    with Session(engine, expire_on_commit=False) as session:
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
@@ -1,34 +1,143 @@
-from fastapi import Depends, HTTPException, status
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+from fastapi import Depends, HTTPException, Query, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlmodel import Session, select
-from .db import engine
+from sqlmodel import Session
+from .config import settings
+from .db import get_session
 from .models import User
 from .auth import decode_access_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
 
-def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+# 요청 단위 Session: `session: Session = db_session`
+# 같은 요청 안에서는 get_current_user 와 핸들러가 같은 Session 을 받고,
+# 핸들러가 끝나면 응답을 보내기 전에 commit / rollback 후 닫힘
+db_session = Depends(get_session, scope="function")
+
+
+# ======================================================
+# 👤 로그인 사용자 캐시
+#
+# 거의 모든 API 가 get_current_user 를 거치므로 요청마다 User 를 조회하지 않고
+# 짧은 시간(USER_CACHE_TTL_SECONDS) 동안 컬럼 값을 메모리에 보관한다.
+# - 요청마다 새 User 객체를 만들어 돌려주므로 핸들러에서 값을 바꿔도 캐시는 그대로
+# - 프로필 수정 / 탈퇴 / 카카오 로그인 정보 갱신 시 invalidate_cached_user 로 즉시 제거
+# - 프로세스별 캐시라 다른 인스턴스의 변경은 TTL 안에서 늦게 반영될 수 있음
+# - ETag 를 붙이는 경로는 캐시를 건너뜀 (스탬프는 DB 의 updated_at 기준이므로
+#   캐시된 예전 값으로 본문을 만들면 새 ETag 에 오래된 본문이 묶임)
+# ======================================================
+class _UserCache:
+    def __init__(self):
+        self._entries: "OrderedDict[int, tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[User]:
+        ttl = settings.USER_CACHE_TTL_SECONDS
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > ttl:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            values = entry[1]
+        # schools(JSON) 같은 가변 값까지 복사해서 요청 간 공유되지 않게 함
+        return User(**copy.deepcopy(values))
+
+    def set(self, user: User) -> None:
+        if settings.USER_CACHE_TTL_SECONDS <= 0:
+            return
+        values = {column.name: getattr(user, column.name) for column in User.__table__.columns}
+        with self._lock:
+            self._entries[user.id] = (time.monotonic(), copy.deepcopy(values))
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > settings.USER_CACHE_MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_user_cache = _UserCache()
+
+
+def invalidate_cached_user(user_id: int) -> None:
+    """사용자 정보가 바뀌거나 삭제된 뒤 (commit 후) 호출"""
+    _user_cache.invalidate(user_id)
+
+
+def get_current_user_id(token: str = Depends(oauth2_scheme)) -> int:
     """
-    JWT 토큰을 해석해서 현재 로그인한 사용자 정보를 가져옵니다.
+    JWT 토큰만 검증해서 현재 사용자 ID 를 반환합니다. (DB 조회 없음)
+    사용자 정보가 필요 없는 API 에서 사용합니다.
     """
     payload = decode_access_token(token)
-    if payload is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="유효하지 않은 인증 토큰입니다.",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    user_id = payload.get("user_id")
+    user_id = payload.get("user_id") if payload else None
     if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="유효하지 않은 인증 토큰입니다.",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return int(user_id)
+
+
+def get_current_user(
+    request: Request,
+    user_id: int = Depends(get_current_user_id),
+    session: Session = db_session,
+) -> User:
+    """
+    JWT 토큰을 해석해서 현재 로그인한 사용자 정보를 가져옵니다.
+    (USER_CACHE_TTL_SECONDS 동안은 DB 대신 캐시에서, 없으면 요청 Session 으로 조회)
+    ETagMiddleware 가 스탬프를 계산한 요청은 항상 DB 에서 읽음
+    """
+    if not getattr(request.state, "etag_stamped", False):
+        user = _user_cache.get(user_id)
+        if user is not None:
+            return user
+
+    user = session.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="사용자를 찾을 수 없습니다.")
+    _user_cache.set(user)
+    # 캐시에서 꺼낸 경우와 같이 Session 에 묶이지 않은 객체로 전달
+    session.expunge(user)
+    return user
 
-    with Session(engine) as session:
-        user = session.get(User, int(user_id))
-        if not user:
-            raise HTTPException(status_code=404, detail="사용자를 찾을 수 없습니다.")
-        return user
+
+# 배치 조회(/posts/batch, /users/batch)에서 한 번에 받을 수 있는 최대 ID 수
+BATCH_MAX_IDS = 50
+
+
+def get_batch_ids(ids: str = Query(..., description="쉼표로 구분한 ID 목록 (예: 1,2,3)")) -> List[int]:
+    """
+    ?ids=1,2,3 → [1, 2, 3]
+    - 중복은 제거하고 요청 순서는 유지
+    - 숫자가 아니거나 BATCH_MAX_IDS 를 넘으면 400
+    """
+    try:
+        parsed = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids 는 쉼표로 구분한 숫자여야 합니다.")
+
+    unique_ids = list(dict.fromkeys(parsed))
+    if not unique_ids:
+        raise HTTPException(status_code=400, detail="ids 가 비어 있습니다.")
+    if len(unique_ids) > BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"한 번에 최대 {BATCH_MAX_IDS}개까지 조회할 수 있습니다.",
+        )
+    return unique_ids
@@ -0,0 +1,521 @@
+# 파일 경로: intersection-backend/app/embeddings.py
+
+from __future__ import annotations
+
+import hashlib
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from .config import settings
+from .db import engine
+from .models import User, ProfileEmbedding, get_kst_now
+
+# =====================================================
+# 🧭 프로필 임베딩 + 벡터 인덱스 (추천 친구 후보 소스)
+#
+# - 프로필이 바뀔 때 한 번만 임베딩 (문서 해시가 같으면 다시 계산하지 않음)
+# - 제공자
+#     azure : AZURE_OPENAI_EMBEDDING_DEPLOYMENT (text-embedding-3 계열, dimensions 지정)
+#     local : 문자 n-gram 해싱 임베딩 (네트워크 없음, 같은 입력 → 항상 같은 벡터)
+# - 저장: ProfileEmbedding.vector 에 L2 정규화된 float32 바이트열
+#         (256차원 기준 사용자당 1 KB, 100만 명 ≈ 1 GB → 인덱스 메모리도 동일)
+# - 검색: 정규화 벡터의 내적 = 코사인 유사도
+#     exact : 전체 행렬 × 질의 벡터
+#     ivf   : k-means 군집 중심과 가까운 EMBEDDING_IVF_PROBES 개 군집만 계산 (근사)
+# =====================================================
+
+# 한 번에 임베딩할 문서 수 (Azure 요청당 입력 수)
+_EMBED_BATCH_SIZE = 64
+# 이 인원 미만이면 ivf 모드여도 exact 로 검색 (군집 학습 의미 없음)
+_IVF_MIN_SIZE = 1000
+_IVF_ITERATIONS = 10
+# 학습 이후 인원이 이 배수만큼 늘면 군집 다시 학습
+_IVF_RETRAIN_GROWTH = 2.0
+
+# local 해싱 임베딩 필드 가중치
+_LOCAL_FIELD_WEIGHTS = {"school": 3.0, "region": 2.0, "admission": 2.0, "birth": 1.0}
+
+
+# -----------------------------------------------------
+# 문서 / 임베딩 계산
+# -----------------------------------------------------
+def _school_entries(user: User) -> List[Tuple[str, Optional[int]]]:
+    """[(학교 이름, 입학년도)] (단일 school_name + schools JSON)"""
+    entries: List[Tuple[str, Optional[int]]] = []
+    if user.school_name:
+        entries.append((user.school_name, user.admission_year))
+    schools = user.schools if isinstance(user.schools, list) else (
+        list(user.schools.values()) if user.schools else []
+    )
+    for school in schools:
+        if not isinstance(school, dict) or not school.get("name"):
+            continue
+        entry = (school["name"], school.get("admission_year"))
+        if entry not in entries:
+            entries.append(entry)
+    return entries
+
+
+def _profile_fields(user: User) -> Dict[str, List[str]]:
+    return {
+        "school": [name for name, _ in _school_entries(user)],
+        "region": [user.region] if user.region else [],
+        "admission": [str(year) for _, year in _school_entries(user) if year],
+        "birth": [str(user.birth_year)] if user.birth_year else [],
+    }
+
+
+def embedding_document(user: User) -> str:
+    """임베딩 입력 문서 (Azure 로 보내는 텍스트 / 해시 비교 기준)"""
+    fields = _profile_fields(user)
+    parts = []
+    if fields["school"]:
+        schools = [
+            f"{name}({year}년 입학)" if year else name
+            for name, year in _school_entries(user)
+        ]
+        parts.append("학교: " + ", ".join(schools))
+    if fields["region"]:
+        parts.append(f"지역: {fields['region'][0]}")
+    if fields["birth"]:
+        parts.append(f"출생: {fields['birth'][0]}년")
+    return " / ".join(parts)
+
+
+def _model_key() -> str:
+    """저장된 벡터와 현재 설정이 같은 모델인지 비교하는 키"""
+    provider = embedding_provider()
+    name = settings.AZURE_OPENAI_EMBEDDING_DEPLOYMENT if provider == "azure" else "hash-ngram"
+    return f"{provider}:{name}:{settings.EMBEDDING_DIMENSIONS}"
+
+
+def embedding_provider() -> str:
+    provider = settings.EMBEDDING_PROVIDER.lower()
+    if provider == "auto":
+        configured = (
+            settings.AZURE_OPENAI_ENDPOINT
+            and settings.AZURE_OPENAI_API_KEY
+            and settings.AZURE_OPENAI_EMBEDDING_DEPLOYMENT
+        )
+        return "azure" if configured else "local"
+    if provider not in ("azure", "local"):
+        raise RuntimeError(f"Unknown EMBEDDING_PROVIDER: {settings.EMBEDDING_PROVIDER}")
+    return provider
+
+
+def _hash_feature(feature: str, dim: int) -> Tuple[int, float]:
+    digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+    value = int.from_bytes(digest, "little")
+    return value % dim, (1.0 if (value >> 63) & 1 else -1.0)
+
+
+def local_embedding(user: User, dim: Optional[int] = None) -> np.ndarray:
+    """
+    결정적 해싱 임베딩 (테스트 / 오프라인용).
+    필드별 값의 문자 2~3-gram 과 값 전체를 해시해서 부호 있는 가중치로 누적.
+    공백을 지워서 '남정' ↔ '남정초등학교' 처럼 부분 일치도 비슷하게 나옴.
+    """
+    dim = dim or settings.EMBEDDING_DIMENSIONS
+    vector = np.zeros(dim, dtype=np.float32)
+    for field, values in _profile_fields(user).items():
+        weight = _LOCAL_FIELD_WEIGHTS[field]
+        for value in values:
+            text = value.replace(" ", "")
+            features = [f"{field}={text}"]
+            if field in ("school", "region"):
+                features += [
+                    f"{field}:{text[i:i + n]}"
+                    for n in (2, 3) for i in range(max(len(text) - n + 1, 0))
+                ]
+            for feature in features:
+                index, sign = _hash_feature(feature, dim)
+                vector[index] += sign * weight
+    return _normalize(vector)
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return (matrix / np.where(norms == 0, 1.0, norms)).astype(np.float32)
+
+
+def _azure_embeddings(docs: List[str]) -> np.ndarray:
+    from .azure_ai import get_azure_client
+
+    if not settings.AZURE_OPENAI_EMBEDDING_DEPLOYMENT:
+        raise RuntimeError("AZURE_OPENAI_EMBEDDING_DEPLOYMENT 가 설정되지 않았습니다.")
+
+    client = get_azure_client()
+    vectors = []
+    for i in range(0, len(docs), _EMBED_BATCH_SIZE):
+        response = client.embeddings.create(
+            model=settings.AZURE_OPENAI_EMBEDDING_DEPLOYMENT,
+            input=docs[i:i + _EMBED_BATCH_SIZE],
+            dimensions=settings.EMBEDDING_DIMENSIONS,
+        )
+        vectors.extend(item.embedding for item in sorted(response.data, key=lambda d: d.index))
+    return _normalize(np.asarray(vectors, dtype=np.float32))
+
+
+def embed_users(users: Sequence[User]) -> np.ndarray:
+    """사용자들 프로필 임베딩 (n, EMBEDDING_DIMENSIONS) float32, 행별 L2 정규화"""
+    if not users:
+        return np.zeros((0, settings.EMBEDDING_DIMENSIONS), dtype=np.float32)
+    if embedding_provider() == "azure":
+        # 프로필 정보가 하나도 없으면 빈 문자열 대신 영벡터
+        docs = [embedding_document(u) for u in users]
+        vectors = np.zeros((len(users), settings.EMBEDDING_DIMENSIONS), dtype=np.float32)
+        filled = [i for i, doc in enumerate(docs) if doc]
+        if filled:
+            vectors[filled] = _azure_embeddings([docs[i] for i in filled])
+        return vectors
+    return np.stack([local_embedding(u) for u in users])
+
+
+def _doc_hash(user: User) -> str:
+    return hashlib.sha1(f"{_model_key()}|{embedding_document(user)}".encode("utf-8")).hexdigest()
+
+
+# -----------------------------------------------------
+# 벡터 인덱스
+# -----------------------------------------------------
+class EmbeddingIndex:
+    """
+    user_id → 정규화 벡터 (메모리).
+    - _vectors[:_size]: 행렬 (용량이 차면 2배로 늘림), _alive: 탈퇴 등으로 빠진 행 표시
+    - ivf: _centroids (nlist, dim), _assign[row] = 군집 번호
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._training = False
+        self.ready = False
+        self._reset()
+
+    def _reset(self) -> None:
+        self._dim = settings.EMBEDDING_DIMENSIONS
+        self._vectors = np.zeros((0, self._dim), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._alive = np.zeros(0, dtype=bool)
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._size = 0
+        self._row_of: Dict[int, int] = {}
+        self._centroids: Optional[np.ndarray] = None
+        self._trained_size = 0
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    # ----- 갱신 -----
+    def _grow(self, needed: int) -> None:
+        capacity = self._vectors.shape[0]
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 1024)
+        for name, dtype, shape in (
+            ("_vectors", np.float32, (capacity, self._dim)),
+            ("_ids", np.int64, (capacity,)),
+            ("_alive", bool, (capacity,)),
+            ("_assign", np.int32, (capacity,)),
+        ):
+            grown = np.zeros(shape, dtype=dtype)
+            grown[:self._size] = getattr(self, name)[:self._size]
+            setattr(self, name, grown)
+
+    def upsert_many(self, user_ids: Sequence[int], vectors: np.ndarray) -> None:
+        with self._lock:
+            self._grow(self._size + len(user_ids))
+            for user_id, vector in zip(user_ids, vectors):
+                row = self._row_of.get(user_id)
+                if row is None:
+                    row = self._size
+                    self._size += 1
+                    self._row_of[user_id] = row
+                    self._ids[row] = user_id
+                self._vectors[row] = vector
+                self._alive[row] = True
+                if self._centroids is not None:
+                    self._assign[row] = int(np.argmax(self._centroids @ vector))
+        self._maybe_train()
+
+    def upsert(self, user_id: int, vector: np.ndarray) -> None:
+        self.upsert_many([user_id], vector[None, :])
+
+    def remove(self, user_id: int) -> None:
+        with self._lock:
+            row = self._row_of.pop(user_id, None)
+            if row is not None:
+                self._alive[row] = False
+
+    def vector_of(self, user_id: int) -> Optional[np.ndarray]:
+        with self._lock:
+            row = self._row_of.get(user_id)
+            return None if row is None else self._vectors[row].copy()
+
+    # ----- ivf 학습 -----
+    def _maybe_train(self) -> None:
+        if settings.EMBEDDING_INDEX_MODE != "ivf":
+            return
+        size = len(self._row_of)
+        with self._lock:
+            if self._training or size < _IVF_MIN_SIZE:
+                return
+            if self._centroids is not None and size < self._trained_size * _IVF_RETRAIN_GROWTH:
+                return
+            self._training = True
+
+        def _run():
+            try:
+                self.train()
+            except Exception as e:
+                print(f"[embeddings] ivf training failed: {e}")
+            finally:
+                self._training = False
+
+        threading.Thread(target=_run, daemon=True).start()
+
+    def train(self, iterations: int = _IVF_ITERATIONS, seed: int = 0) -> int:
+        """
+        구면 k-means (군집 수 ≈ √n) 로 군집 중심 학습 후 모든 행 재배정.
+        학습은 스냅샷으로 lock 밖에서 수행.
+        """
+        with self._lock:
+            rows = np.flatnonzero(self._alive[:self._size])
+            data = self._vectors[rows].copy()
+        if len(rows) == 0:
+            return 0
+
+        nlist = max(1, int(math.sqrt(len(rows))))
+        rng = np.random.default_rng(seed)
+        centroids = data[rng.choice(len(rows), size=nlist, replace=False)]
+        for _ in range(iterations):
+            assign = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, data)
+            counts = np.bincount(assign, minlength=nlist)
+            # 빈 군집은 이전 중심 유지
+            centroids = np.where(counts[:, None] > 0, _normalize(sums), centroids)
+
+        with self._lock:
+            self._centroids = centroids
+            live = self._size
+            self._assign[:live] = np.argmax(self._vectors[:live] @ centroids.T, axis=1)
+            self._trained_size = len(rows)
+        return nlist
+
+    # ----- 검색 -----
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        exclude: Optional[Iterable[int]] = None,
+    ) -> List[Tuple[int, float]]:
+        """코사인 유사도 상위 k명 [(user_id, 유사도)] (유사도 0 이하는 제외)"""
+        with self._lock:
+            size = self._size
+            if size == 0 or k <= 0:
+                return []
+            mask = self._alive[:size].copy()
+            if settings.EMBEDDING_INDEX_MODE == "ivf" and self._centroids is not None:
+                probes = min(settings.EMBEDDING_IVF_PROBES, len(self._centroids))
+                nearest = np.argpartition(-(self._centroids @ query), probes - 1)[:probes]
+                mask &= np.isin(self._assign[:size], nearest)
+            rows = np.flatnonzero(mask)
+            sims = self._vectors[rows] @ query
+            ids = self._ids[rows]
+
+        if exclude:
+            keep = ~np.isin(ids, np.fromiter(exclude, dtype=np.int64))
+            ids, sims = ids[keep], sims[keep]
+        if ids.size == 0:
+            return []
+
+        k = min(k, ids.size)
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top], kind="stable")]
+        return [(int(ids[i]), float(sims[i])) for i in top if sims[i] > 0]
+
+    def similar_users(
+        self,
+        user: User,
+        k: int,
+        exclude: Optional[Set[int]] = None,
+    ) -> List[Tuple[int, float]]:
+        query = self.vector_of(user.id)
+        if query is None:
+            query = embed_users([user])[0]
+        return self.search(query, k, exclude=(exclude or set()) | {user.id})
+
+    def similarities(self, user: User, user_ids: Sequence[int]) -> np.ndarray:
+        """user 와 user_ids 각각의 코사인 유사도 (인덱스에 없는 사용자는 0)"""
+        query = self.vector_of(user.id)
+        if query is None:
+            query = embed_users([user])[0]
+        with self._lock:
+            rows = np.fromiter((self._row_of.get(i, -1) for i in user_ids), dtype=np.int64, count=len(user_ids))
+            sims = np.zeros(rows.size, dtype=np.float32)
+            known = rows >= 0
+            sims[known] = self._vectors[rows[known]] @ query
+        return sims
+
+    # ----- 로드 -----
+    def load(self, session: Session) -> int:
+        """
+        저장된 벡터 로드 (서버 시작 시).
+        모델이 다르거나 벡터가 없는 사용자는 백그라운드에서 계산.
+        """
+        model = _model_key()
+        rows = session.exec(
+            select(ProfileEmbedding.user_id, ProfileEmbedding.vector)
+            .join(User, User.id == ProfileEmbedding.user_id)
+            .where(ProfileEmbedding.model == model)
+        ).all()
+
+        with self._lock:
+            self._reset()
+        if rows:
+            vectors = np.frombuffer(b"".join(vector for _, vector in rows), dtype=np.float32)
+            self.upsert_many([user_id for user_id, _ in rows], vectors.reshape(len(rows), -1))
+        self.ready = True
+
+        missing = session.exec(
+            select(User.id).where(User.id.notin_(
+                select(ProfileEmbedding.user_id).where(ProfileEmbedding.model == model)
+            ))
+        ).all()
+        if missing:
+            threading.Thread(target=backfill_embeddings, args=(list(missing),), daemon=True).start()
+        return len(rows)
+
+
+embedding_index = EmbeddingIndex()
+
+
+# -----------------------------------------------------
+# 저장 (프로필 생성/수정/탈퇴 시 호출)
+# -----------------------------------------------------
+def _store(session: Session, users: Sequence[User], vectors: np.ndarray) -> None:
+    model = _model_key()
+    for user, vector in zip(users, vectors):
+        session.merge(ProfileEmbedding(
+            user_id=user.id,
+            model=model,
+            doc_hash=_doc_hash(user),
+            vector=vector.astype(np.float32).tobytes(),
+            updated_at=get_kst_now(),
+        ))
+
+
+def update_user_embeddings(session: Session, users: Sequence[User]) -> int:
+    """
+    프로필 문서가 바뀐 사용자만 임베딩 계산 + 저장 + 인덱스 반영 (한 번의 호출로 묶어서 계산)
+    계산한 사용자 수 반환
+    """
+    if not users:
+        return 0
+    rows = {
+        row.user_id: row
+        for row in session.exec(
+            select(ProfileEmbedding).where(ProfileEmbedding.user_id.in_([u.id for u in users]))
+        ).all()
+    }
+
+    changed = []
+    for user in users:
+        row = rows.get(user.id)
+        if row is not None and row.doc_hash == _doc_hash(user):
+            if embedding_index.vector_of(user.id) is None:
+                embedding_index.upsert(user.id, np.frombuffer(row.vector, dtype=np.float32))
+        else:
+            changed.append(user)
+    if not changed:
+        return 0
+
+    ids = [u.id for u in changed]
+    vectors = embed_users(changed)
+    _store(session, changed, vectors)
+    session.commit()
+    embedding_index.upsert_many(ids, vectors)
+    return len(changed)
+
+
+class _EmbeddingRefresher:
+    """
+    프로필 생성/수정 후 임베딩 갱신을 응답과 분리해서 처리하는 백그라운드 스레드 1개
+    - 요청은 사용자 id 만 넣고 바로 반환 (Azure 가 느려도 가입/프로필 수정이 기다리지 않음)
+    - 같은 사용자가 여러 번 들어와도 한 번만 계산, 모인 사용자는 _EMBED_BATCH_SIZE 씩 묶어서 계산
+    """
+
+    def __init__(self):
+        self._pending: Set[int] = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, user_id: int) -> None:
+        with self._lock:
+            self._pending.add(user_id)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="embedding-refresh", daemon=True
+                )
+                self._thread.start()
+        self._wakeup.set()
+
+    def _take(self) -> List[int]:
+        with self._lock:
+            batch = sorted(self._pending)[:_EMBED_BATCH_SIZE]
+            self._pending.difference_update(batch)
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            while True:
+                batch = self._take()
+                if not batch:
+                    break
+                try:
+                    with Session(engine) as session:
+                        users = session.exec(select(User).where(User.id.in_(batch))).all()
+                        update_user_embeddings(session, users)
+                except Exception as e:
+                    print(f"[embeddings] refresh failed for users {batch}: {e}")
+
+
+_refresher = _EmbeddingRefresher()
+
+
+def schedule_embedding_refresh(user_id: int) -> None:
+    """프로필 생성/수정 후 호출 (commit 후). 임베딩은 응답 이후 백그라운드에서 계산"""
+    _refresher.submit(user_id)
+
+
+def delete_user_embedding(session: Session, user_id: int) -> None:
+    """탈퇴 시 벡터 삭제 (호출한 쪽에서 commit 후 embedding_index.remove)"""
+    session.exec(delete(ProfileEmbedding).where(ProfileEmbedding.user_id == user_id))
+
+
+def backfill_embeddings(user_ids: Sequence[int], batch_size: int = _EMBED_BATCH_SIZE) -> int:
+    """벡터가 없거나 모델이 바뀐 사용자들 일괄 계산"""
+    done = 0
+    for i in range(0, len(user_ids), batch_size):
+        try:
+            with Session(engine) as session:
+                users = session.exec(
+                    select(User).where(User.id.in_(user_ids[i:i + batch_size]))
+                ).all()
+                ids = [u.id for u in users]
+                vectors = embed_users(users)
+                _store(session, users, vectors)
+                session.commit()
+            embedding_index.upsert_many(ids, vectors)
+            done += len(ids)
+        except Exception as e:
+            print(f"[embeddings] backfill failed at batch {i // batch_size}: {e}")
+    return done
@@ -0,0 +1,266 @@
+# 파일 경로: intersection-backend/app/etag.py
+
+from __future__ import annotations
+
+import hashlib
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import func, or_, case, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from .auth import decode_access_token
+from .db import engine
+from .models import (
+    User, Post, PostLike, Comment, UserFriendship, ChatRoom, ChatMessage,
+    UserBlock, UserReport, Notification, ContentVersion,
+)
+from .ranking import hot_ranker
+
+# =====================================================
+# 🏷️ 조건부 GET (ETag / If-None-Match)
+#
+# 응답 본문을 만들지 않고, 응답에 영향을 주는 테이블의
+# (행 수, 최대 id, 최대 updated_at) 같은 집계값만 조회해서 "버전 스탬프"를 만든다.
+# - 행이 추가되면 최대 id, 삭제되면 행 수, 수정되면 updated_at 이 바뀜
+# - 큰 테이블(피드)은 COUNT 대신 인덱스로 바로 읽히는 최대 id / updated_at 과
+#   삭제할 때 올리는 버전 카운터(ContentVersion)를 사용
+# - 스탬프 + 경로 + 쿼리스트링 + 사용자 → 해시 → 강한 ETag
+# - 클라이언트가 같은 ETag 를 보내면 엔드포인트를 실행하지 않고 304
+# =====================================================
+
+# 경로 → 스탬프 함수 (session, user_id, request) → 집계 컬럼 목록
+StampFunc = Callable[[Session, int, Request], List]
+_STAMPS: Dict[str, StampFunc] = {}
+
+
+def version_stamp(path: str):
+    """해당 경로(GET)의 버전 스탬프 함수 등록"""
+    def decorator(func_: StampFunc) -> StampFunc:
+        _STAMPS[path] = func_
+        return func_
+    return decorator
+
+
+def _summary(model, *conditions) -> List:
+    """(행 수, 최대 id) 스칼라 서브쿼리"""
+    return [
+        select(func.count(model.id)).where(*conditions).scalar_subquery(),
+        select(func.max(model.id)).where(*conditions).scalar_subquery(),
+    ]
+
+
+def _max(column, *conditions):
+    return select(func.max(column)).where(*conditions).scalar_subquery()
+
+
+def _version(name: str):
+    """삭제 버전 카운터 (행이 없으면 NULL)"""
+    return select(ContentVersion.version).where(ContentVersion.name == name).scalar_subquery()
+
+
+def bump_version(session: Session, name: str) -> None:
+    """
+    삭제 버전 카운터 +1 (행 삭제는 최대 id 로 잡히지 않으므로 삭제하는 쪽에서 호출)
+    - commit 은 호출한 쪽에서 (삭제와 같은 트랜잭션으로 반영)
+    """
+    dialect = session.get_bind().dialect.name
+
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+        stmt = dialect_insert(ContentVersion).values(name=name, version=1)
+        session.exec(stmt.on_conflict_do_update(
+            index_elements=["name"],
+            set_={"version": ContentVersion.version + 1},
+        ))
+        return
+
+    # 그 외 DB: UPDATE 후 행이 없으면 세이브포인트 안에서 INSERT
+    bump = update(ContentVersion).where(ContentVersion.name == name).values(version=ContentVersion.version + 1)
+    if session.exec(bump).rowcount:
+        return
+    try:
+        with session.begin_nested():
+            session.exec(insert(ContentVersion).values(name=name, version=1))
+    except IntegrityError:
+        session.exec(bump)
+
+
+def chat_rooms_version_name(user_id: int) -> str:
+    """채팅방 목록(/chat/rooms) 버전 카운터 이름 (사용자별)"""
+    return f"chat_rooms:{user_id}"
+
+
+def _user_relations(user_id: int) -> List:
+    """차단(양방향) / 내가 한 신고(pending) - 목록 필터링에 쓰이는 관계"""
+    return [
+        *_summary(UserBlock, or_(UserBlock.user_id == user_id, UserBlock.blocked_user_id == user_id)),
+        *_summary(UserReport, or_(UserReport.reporter_id == user_id, UserReport.reported_user_id == user_id)),
+        select(func.count(UserReport.id)).where(
+            UserReport.reporter_id == user_id, UserReport.status == "pending"
+        ).scalar_subquery(),
+    ]
+
+
+# -----------------------------------------------------
+# 경로별 스탬프
+# -----------------------------------------------------
+@version_stamp("/posts/")
+def _posts_stamp(session: Session, user_id: int, request: Request) -> List:
+    # 피드는 모든 작성자의 게시글/좋아요/댓글 수와 작성자 프로필에 영향을 받음
+    # 폴링마다 읽히므로 전체 COUNT 없이 인덱스 조회만 (추가/수정 → 최대 id/updated_at, 삭제 → "feed" 카운터)
+    columns = [
+        _max(Post.id),
+        _max(Post.updated_at),
+        _max(PostLike.id),
+        _max(Comment.id),
+        _max(User.updated_at),
+        _version("feed"),
+        *_user_relations(user_id),
+    ]
+    return columns
+
+
+@version_stamp("/users/me")
+def _me_stamp(session: Session, user_id: int, request: Request) -> List:
+    return [
+        *_summary(Post, Post.author_id == user_id, Post.image_url != None),
+        _max(Post.updated_at, Post.author_id == user_id),
+    ]
+
+
+@version_stamp("/friends/me")
+def _friends_stamp(session: Session, user_id: int, request: Request) -> List:
+    friend_ids = select(UserFriendship.friend_user_id).where(UserFriendship.user_id == user_id)
+    return [
+        *_summary(UserFriendship, UserFriendship.user_id == user_id),
+        _max(User.updated_at, User.id.in_(friend_ids)),
+        *_user_relations(user_id),
+    ]
+
+
+@version_stamp("/users/me/notifications")
+def _notifications_stamp(session: Session, user_id: int, request: Request) -> List:
+    sender_ids = select(Notification.sender_id).where(Notification.receiver_id == user_id)
+    return [
+        *_summary(Notification, Notification.receiver_id == user_id),
+        select(func.count(Notification.id)).where(
+            Notification.receiver_id == user_id, Notification.is_read == False
+        ).scalar_subquery(),
+        _max(User.updated_at, User.id.in_(sender_ids)),
+    ]
+
+
+@version_stamp("/chat/rooms")
+def _chat_rooms_stamp(session: Session, user_id: int, request: Request) -> List:
+    mine = or_(ChatRoom.user1_id == user_id, ChatRoom.user2_id == user_id)
+    room_ids = select(ChatRoom.id).where(mine)
+    partner_ids = select(
+        case((ChatRoom.user1_id == user_id, ChatRoom.user2_id), else_=ChatRoom.user1_id)
+    ).where(mine)
+    return [
+        *_summary(ChatRoom, mine),
+        # 나가기는 updated_at 을 갱신, 고정/해제는 (목록 순서가 바뀌지 않도록) 버전 카운터만 올림
+        _max(ChatRoom.updated_at, mine),
+        _version(chat_rooms_version_name(user_id)),
+        # 마지막 메시지 / 읽지 않은 메시지 수
+        *_summary(ChatMessage, ChatMessage.room_id.in_(room_ids)),
+        select(func.count(ChatMessage.id)).where(
+            ChatMessage.room_id.in_(room_ids), ChatMessage.is_read == False
+        ).scalar_subquery(),
+        _max(User.updated_at, User.id.in_(partner_ids)),
+        *_user_relations(user_id),
+    ]
+
+
+# -----------------------------------------------------
+# ETag 계산
+# -----------------------------------------------------
+def _user_id_from(request: Request) -> Optional[int]:
+    auth = request.headers.get("authorization", "")
+    scheme, _, token = auth.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    payload = decode_access_token(token)
+    if not payload or payload.get("user_id") is None:
+        return None
+    try:
+        return int(payload["user_id"])
+    except (TypeError, ValueError):
+        return None
+
+
+def compute_etag(request: Request, user_id: int) -> Optional[str]:
+    """
+    등록된 경로면 강한 ETag, 아니면 None.
+    로그인 사용자 행의 updated_at 도 항상 포함 (탈퇴/프로필 변경 시 무효화)
+    """
+    stamp_func = _STAMPS.get(request.url.path)
+    if stamp_func is None:
+        return None
+
+    with Session(engine) as session:
+        columns = [
+            select(User.updated_at).where(User.id == user_id).scalar_subquery(),
+            *stamp_func(session, user_id, request),
+        ]
+        values = session.exec(select(*columns)).one()
+
+    parts = [request.url.path, request.url.query, str(user_id), *map(str, values)]
+    # 인기순 피드는 DB 가 아니라 랭커 메모리에서 순서가 정해짐
+    if request.url.path == "/posts/" and request.query_params.get("sort") == "hot":
+        parts.append(f"hot:{hot_ranker.version}")
+
+    digest = hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+class ETagMiddleware(BaseHTTPMiddleware):
+    """
+    등록된 GET 엔드포인트에 ETag 를 붙이고, If-None-Match 가 같으면 304 반환.
+    - 스탬프는 엔드포인트 실행 "전"에 계산 → 그 사이 데이터가 바뀌어도
+      다음 요청에서 스탬프가 달라지므로 오래된 응답이 304 로 굳지 않음
+    - 토큰이 없거나 잘못된 요청은 그대로 통과 (엔드포인트에서 401 처리)
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        if request.method != "GET" or request.url.path not in _STAMPS:
+            return await call_next(request)
+
+        user_id = _user_id_from(request)
+        if user_id is None:
+            return await call_next(request)
+
+        try:
+            etag = await run_in_threadpool(compute_etag, request, user_id)
+        except Exception as e:
+            # 스탬프 계산 실패 시 ETag 없이 일반 응답
+            print(f"[etag] stamp failed for {request.url.path}: {e}")
+            return await call_next(request)
+
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if _matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+        # 본문이 스탬프보다 오래된 값으로 만들어지지 않도록 get_current_user 의 캐시를 건너뜀
+        request.state.etag_stamped = True
+
+        response = await call_next(request)
+        if response.status_code == 200:
+            response.headers.update(headers)
+        return response
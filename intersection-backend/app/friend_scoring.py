@@ -0,0 +1,135 @@
+# 파일 경로: intersection-backend/app/friend_scoring.py
+
+from __future__ import annotations
+
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+# =====================================================
+# 🧮 추천 친구 점수 (NumPy 벡터화)
+#
+# 두 사용자의 프로필 규칙 점수를 후보 전체에 대해 한 번에 계산한다.
+# - 같은 학교 이름 +30 / 같은 학교 유형 +10 / 같은 지역 +10 / 같은 성별 +2
+# - 입학년도 차이 0년 +20, 1년 +10, 3년 이내 +5 / 출생연도 차이 0년 +10, 2년 이내 +5
+# - 프로필 이미지가 있으면 +1 (활성 사용자 가중치)
+# - 문자열 속성(학교/학교유형/지역/성별)은 정수 코드로, 없으면 0
+# - 연도 속성(입학년도/출생연도)은 그대로, 없으면 0 (원본의 truthy 검사와 동일)
+# =====================================================
+
+SCHOOL_NAME_POINTS = 30
+SCHOOL_TYPE_POINTS = 10
+ADMISSION_POINTS = (20, 10, 5)   # 차이 0 / 1 / 3 이내
+REGION_POINTS = 10
+BIRTH_POINTS = (10, 5)           # 차이 0 / 2 이내
+GENDER_POINTS = 2
+IMAGE_POINTS = 1
+
+_STRING_FIELDS = ("school_name", "school_type", "region", "gender")
+_YEAR_FIELDS = ("admission_year", "birth_year")
+
+
+class CandidateArrays:
+    """
+    후보 사용자 속성을 열(column) 단위 배열로 인코딩한 것.
+    - codes[field]: int32 코드 배열 (0 = 값 없음)
+    - vocab[field]: 문자열 → 코드
+    - years[field]: int32 연도 배열 (0 = 값 없음)
+    - has_image: bool 배열
+    - ids: 사용자 id 배열 (원래 순서 유지)
+    """
+
+    def __init__(self, users: Sequence):
+        n = len(users)
+        self.size = n
+        self.ids = np.fromiter((u.id for u in users), dtype=np.int64, count=n)
+        self.vocab: Dict[str, Dict[str, int]] = {}
+        self.codes: Dict[str, np.ndarray] = {}
+        self.years: Dict[str, np.ndarray] = {}
+
+        for field in _STRING_FIELDS:
+            vocab: Dict[str, int] = {}
+            codes = np.fromiter(
+                (
+                    vocab.setdefault(value, len(vocab) + 1) if value else 0
+                    for value in (getattr(u, field) for u in users)
+                ),
+                dtype=np.int32,
+                count=n,
+            )
+            self.vocab[field] = vocab
+            self.codes[field] = codes
+
+        for field in _YEAR_FIELDS:
+            self.years[field] = np.fromiter(
+                (getattr(u, field) or 0 for u in users), dtype=np.int32, count=n
+            )
+
+        self.has_image = np.fromiter(
+            (bool(u.profile_image) for u in users), dtype=bool, count=n
+        )
+
+    def code_of(self, field: str, value: Optional[str]) -> int:
+        # 후보에 없는 값이면 -1 (어떤 코드와도 같지 않음)
+        if not value:
+            return -1
+        return self.vocab[field].get(value, -1)
+
+
+def score_candidates(me, arrays: CandidateArrays) -> np.ndarray:
+    """me 기준 모든 후보의 규칙 점수 int32 배열"""
+    scores = np.zeros(arrays.size, dtype=np.int32)
+
+    for field, points in (
+        ("school_name", SCHOOL_NAME_POINTS),
+        ("school_type", SCHOOL_TYPE_POINTS),
+        ("region", REGION_POINTS),
+        ("gender", GENDER_POINTS),
+    ):
+        code = arrays.code_of(field, getattr(me, field))
+        if code > 0:
+            scores += np.where(arrays.codes[field] == code, points, 0).astype(np.int32)
+
+    if me.admission_year:
+        years = arrays.years["admission_year"]
+        diff = np.abs(years - me.admission_year)
+        exact, near, window = ADMISSION_POINTS
+        scores += np.select(
+            [years == 0, diff == 0, diff == 1, diff <= 3],
+            [0, exact, near, window],
+            default=0,
+        ).astype(np.int32)
+
+    if me.birth_year:
+        years = arrays.years["birth_year"]
+        diff = np.abs(years - me.birth_year)
+        exact, near = BIRTH_POINTS
+        scores += np.select(
+            [years == 0, diff == 0, diff <= 2],
+            [0, exact, near],
+            default=0,
+        ).astype(np.int32)
+
+    scores += np.where(arrays.has_image, IMAGE_POINTS, 0).astype(np.int32)
+    return scores
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    점수 > 0 인 후보 중 상위 k개 인덱스 (정수 규칙 점수 / 추천 파이프라인의 실수 가중합 공용).
+    list.sort(reverse=True) 와 같은 순서 (동점이면 원래 순서가 앞선 것 먼저)
+    - 전체 정렬 대신 argpartition 으로 k개만 고른 뒤 그 k개만 정렬
+    """
+    eligible = np.flatnonzero(scores > 0)
+    if k <= 0 or eligible.size == 0:
+        return eligible[:0]
+
+    if eligible.size > k:
+        eligible = eligible[np.argpartition(-scores[eligible], k - 1)[:k]]
+        # 경계 점수 동점은 argpartition 이 임의로 고르므로 앞선 후보로 다시 맞춤
+        cutoff = scores[eligible].min()
+        above = np.flatnonzero(scores > cutoff)
+        ties = np.flatnonzero(scores == cutoff)[:k - above.size]
+        eligible = np.concatenate([above, ties])
+
+    return eligible[np.lexsort((eligible, -scores[eligible]))]
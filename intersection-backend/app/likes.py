@@ -0,0 +1,102 @@
+# 파일 경로: intersection-backend/app/likes.py
+
+from datetime import datetime
+from typing import Optional, Tuple, Type
+
+from sqlalchemy import delete, func, insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, SQLModel, select
+
+from .models import get_kst_now
+
+
+# =====================================================
+# 좋아요 공통 로직 (PostLike / CommentLike)
+# - (user_id, target_id) 유니크 제약에 기대서 check-then-insert 없이 처리
+# - 호출측에서 한 번만 commit 하도록 여기서는 commit 하지 않음
+# =====================================================
+
+def _insert_ignore(session: Session, model: Type[SQLModel], target_field: str, values: dict) -> bool:
+    """
+    INSERT ... ON CONFLICT DO NOTHING
+    새로 들어갔으면 True, 이미 있었으면 False
+    """
+    dialect = session.get_bind().dialect.name
+
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+        stmt = (
+            dialect_insert(model)
+            .values(**values)
+            .on_conflict_do_nothing(index_elements=["user_id", target_field])
+        )
+        return session.exec(stmt).rowcount == 1
+
+    # 그 외 DB: 세이브포인트 안에서 INSERT 후 중복이면 무시
+    try:
+        with session.begin_nested():
+            session.exec(insert(model).values(**values))
+        return True
+    except IntegrityError:
+        return False
+
+
+def set_like(
+    session: Session, model: Type[SQLModel], target_field: str, user_id: int, target_id: int
+) -> Optional[datetime]:
+    """좋아요 설정 (멱등). 새로 눌렀으면 그 created_at (인기 점수 반영용), 이미 눌려 있었으면 None"""
+    liked_at = get_kst_now()
+    inserted = _insert_ignore(
+        session,
+        model,
+        target_field,
+        {"user_id": user_id, target_field: target_id, "created_at": liked_at},
+    )
+    return liked_at if inserted else None
+
+
+def unset_like(
+    session: Session, model: Type[SQLModel], target_field: str, user_id: int, target_id: int
+) -> Optional[datetime]:
+    """
+    좋아요 해제 (멱등)
+    실제로 지웠으면 지운 좋아요의 created_at (인기 점수를 누른 시점 기준으로 빼기 위함), 없었으면 None
+    """
+    where = (model.user_id == user_id, getattr(model, target_field) == target_id)
+
+    # DELETE ... RETURNING (PostgreSQL / SQLite 3.35+) → 조회 없이 한 번에
+    if session.get_bind().dialect.delete_returning:
+        row = session.execute(delete(model).where(*where).returning(model.created_at)).first()
+        if row is None:
+            return None
+        return row[0] or get_kst_now()
+
+    created_at = session.exec(select(model.created_at).where(*where)).first()
+    if not session.exec(delete(model).where(*where)).rowcount:
+        return None
+    return created_at or get_kst_now()
+
+
+def toggle_like(
+    session: Session, model: Type[SQLModel], target_field: str, user_id: int, target_id: int
+) -> Tuple[bool, Optional[datetime], Optional[datetime]]:
+    """
+    좋아요 토글 → (is_liked, liked_at, removed_at)
+    DELETE 가 지운 행이 없을 때만 INSERT ... ON CONFLICT DO NOTHING
+    (동시에 두 번 눌려도 행은 최대 1개)
+    liked_at / removed_at: 새로 눌렀거나 취소한 좋아요의 created_at (해당 없으면 None)
+    """
+    removed_at = unset_like(session, model, target_field, user_id, target_id)
+    if removed_at is not None:
+        return False, None, removed_at
+    return True, set_like(session, model, target_field, user_id, target_id), None
+
+
+def count_likes(session: Session, model: Type[SQLModel], target_field: str, target_id: int) -> int:
+    return session.exec(
+        select(func.count(model.id)).where(getattr(model, target_field) == target_id)
+    ).one()
@@ -1,13 +1,26 @@
 # 파일 경로: intersection-backend/app/main.py
 
-import os
 import logging
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
-from .db import create_db_and_tables
+from sqlmodel import Session
+
+from .db import create_db_and_tables, engine
 from .config import settings
+from .storage import get_storage, LocalStorage
+from .ranking import hot_ranker
+from .profile_index import profile_index
+from .social_graph import social_graph
+from .recommendation_store import recommendation_store
+from .embeddings import embedding_index
+from .azure_ai import get_ai_cache_stats
+from .recommendation_pipeline import get_pipeline_stats
+from .etag import ETagMiddleware
+from .auth import PasswordHashingBusy, password_hasher
+from .rate_limit import get_login_throttle_stats
 
 # 라우터
 from .routers import (
@@ -19,11 +32,26 @@ from .routers import (
     common as common_router,
     chat as chat_router,
     moderation as moderation_router,
+    uploads as uploads_router,
 )
 
 app = FastAPI(title="Intersection Backend")
 logger = logging.getLogger("uvicorn.error")
 
+# ✅ 조건부 GET (ETag / 304)
+# - CORS 보다 먼저 등록해야 304 응답에도 CORS 헤더가 붙음 (나중에 등록한 미들웨어가 바깥쪽)
+app.add_middleware(ETagMiddleware)
+
+# ✅ 비밀번호 해시 대기열 초과 → 기다리지 않고 503
+@app.exception_handler(PasswordHashingBusy)
+async def password_hashing_busy_handler(request: Request, exc: PasswordHashingBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"},
+    )
+
+
 # ✅ CORS 설정
 origins = settings.allowed_origins_list
 
@@ -43,12 +71,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],  # 조건부 GET / 댓글 페이지 커서
 )
 
-# ✅ 파일 업로드 디렉토리
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-app.mount("/static", StaticFiles(directory=UPLOAD_DIR), name="static")
+# ✅ 파일 업로드 저장소
+# - local: 디스크(UPLOAD_DIR)를 /static 으로 서빙
+# - azure: Blob URL 로 직접 접근하므로 마운트 불필요
+storage = get_storage()
+if isinstance(storage, LocalStorage):
+    app.mount("/static", StaticFiles(directory=storage.root), name="static")
 
 
 # ✅ Startup: DB 생성
@@ -59,6 +90,64 @@ def on_startup():
         logger.info("✅ Database initialized successfully.")
     except Exception as e:
         logger.error(f"⚠️ Database init skipped or failed: {e}")
+        return
+
+    # 인기 피드 점수 로드 (저장된 점수가 없으면 전체 재계산)
+    try:
+        with Session(engine) as session:
+            loaded = hot_ranker.load(session)
+        logger.info(f"✅ Hot ranking loaded: {loaded} posts")
+    except Exception as e:
+        logger.error(f"⚠️ Hot ranking load failed: {e}")
+
+    # 추천 친구 프로필 인덱스 로드 (저장 이후 바뀐 사용자만 반영)
+    try:
+        with Session(engine) as session:
+            indexed = profile_index.load(session)
+        logger.info(f"✅ Profile index loaded: {indexed} users")
+    except Exception as e:
+        logger.error(f"⚠️ Profile index load failed: {e}")
+
+    # 친구 그래프 (CSR) 로드
+    try:
+        with Session(engine) as session:
+            edges = social_graph.load(session)
+        logger.info(f"✅ Social graph loaded: {edges} edges")
+    except Exception as e:
+        logger.error(f"⚠️ Social graph load failed: {e}")
+
+    # 프로필 임베딩 로드 (없는 사용자는 백그라운드에서 계산)
+    try:
+        with Session(engine) as session:
+            embedded = embedding_index.load(session)
+        logger.info(f"✅ Profile embeddings loaded: {embedded} users")
+    except Exception as e:
+        logger.error(f"⚠️ Profile embeddings load failed: {e}")
+
+    # 추천 친구 목록 백그라운드 갱신 시작
+    recommendation_store.start()
+
+
+# ✅ Shutdown: 메모리에만 있는 점수 저장
+@app.on_event("shutdown")
+def on_shutdown():
+    try:
+        with Session(engine) as session:
+            hot_ranker.flush(session)
+    except Exception as e:
+        logger.error(f"⚠️ Hot ranking flush failed: {e}")
+
+    recommendation_store.stop()
+    logger.info(f"📊 AI recommendation cache: {get_ai_cache_stats()}")
+    logger.info(f"📊 Recommendation pipeline stages: {get_pipeline_stats()}")
+    logger.info(f"📊 Password hashing: {password_hasher.get_stats()}")
+    logger.info(f"📊 Login throttle: {get_login_throttle_stats()}")
+    password_hasher.shutdown()
+
+    try:
+        profile_index.save()
+    except Exception as e:
+        logger.error(f"⚠️ Profile index save failed: {e}")
 
 
 # ✅ 라우터 등록
@@ -71,6 +160,7 @@ for router in [
     common_router.router,
     chat_router.router,
     moderation_router.router,
+    uploads_router.router,
 ]:
     app.include_router(router)
 
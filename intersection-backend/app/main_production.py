@@ -3,6 +3,8 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from .db import create_db_and_tables
+from .storage import get_storage, LocalStorage
+from .etag import ETagMiddleware
 
 # 라우터 모듈 불러오기
 from .routers import auth as auth_router
@@ -13,9 +15,13 @@ from .routers import friends as friends_router
 from .routers import common as common_router
 from .routers import chat as chat_router
 from .routers import moderation as moderation_router
+from .routers import uploads as uploads_router
 
 app = FastAPI(title="Intersection Backend")
 
+# ✅ 조건부 GET (ETag / 304) - CORS 보다 먼저 등록 (CORS 가 바깥쪽에서 304 에도 헤더 추가)
+app.add_middleware(ETagMiddleware)
+
 # ✅ CORS 설정 (환경별 다르게 설정)
 ENV = os.getenv("ENV", "development")  # 환경 변수로 development/production 구분
 
@@ -28,6 +34,7 @@ if ENV == "production":
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["ETag", "X-Next-Cursor"],
     )
 else:
     # 🔓 개발 환경: 모든 출처 허용
@@ -37,15 +44,15 @@ else:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["ETag", "X-Next-Cursor"],
     )
 
-# 이미지 업로드 폴더 설정
-UPLOAD_DIR = "uploads"
-if not os.path.exists(UPLOAD_DIR):
-    os.makedirs(UPLOAD_DIR)
-
-# 정적 파일 서빙
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
+# 업로드 저장소 (local 인 경우에만 정적 파일 서빙)
+storage = get_storage()
+if isinstance(storage, LocalStorage):
+    app.mount("/static", StaticFiles(directory=storage.root), name="static")
+    # 기존 운영 서버는 /uploads 로 서빙했으므로 DB 에 저장된 예전 이미지 URL 도 계속 열리도록 유지
+    app.mount("/uploads", StaticFiles(directory=storage.root), name="uploads")
 
 
 @app.on_event("startup")
@@ -63,6 +70,7 @@ app.include_router(friends_router.router)
 app.include_router(common_router.router)
 app.include_router(chat_router.router)
 app.include_router(moderation_router.router)
+app.include_router(uploads_router.router)
 
 
 @app.get("/")
@@ -1,5 +1,6 @@
 from typing import Optional, List, Dict, Any
 from sqlmodel import SQLModel, Field, Relationship, Column, JSON
+from sqlalchemy import UniqueConstraint, Index, LargeBinary
 from datetime import datetime, timezone, timedelta
 from sqlalchemy.dialects.postgresql import JSONB
 
@@ -32,6 +33,11 @@ class Community(SQLModel, table=True):
 # 2. User (사용자) 모델
 # ------------------------------------------------------
 class User(SQLModel, table=True):
+    # 여러 학교 JSONB 포함 검색(@>)용 GIN 인덱스 (PostgreSQL 전용, migrations/add_schools_jsonb_column.sql 과 동일)
+    __table_args__ = (
+        Index("idx_user_schools", "schools", postgresql_using="gin"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     login_id: str = Field(index=True, unique=True)
     password_hash: Optional[str] = None
@@ -42,10 +48,11 @@ class User(SQLModel, table=True):
     
     birth_year: Optional[int] = None
     gender: Optional[str] = None
-    region: Optional[str] = None
-    school_name: Optional[str] = None  # 하위 호환성을 위해 유지
+    # region / school_name / admission_year: 추천 친구 후보군(같은 학교/지역/입학년도) 조회용 인덱스
+    region: Optional[str] = Field(default=None, index=True)
+    school_name: Optional[str] = Field(default=None, index=True)  # 하위 호환성을 위해 유지
     school_type: Optional[str] = None  # 하위 호환성을 위해 유지
-    admission_year: Optional[int] = None  # 하위 호환성을 위해 유지
+    admission_year: Optional[int] = Field(default=None, index=True)  # 하위 호환성을 위해 유지
     # 여러 학교 정보를 JSON 형식으로 저장
     schools: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSONB))
 
@@ -58,6 +65,12 @@ class User(SQLModel, table=True):
     community: Optional[Community] = Relationship(back_populates="users")
 
     created_at: datetime = Field(default_factory=get_kst_now)
+    # 프로필이 바뀔 때마다 자동 갱신 (ETag 버전 스탬프용)
+    updated_at: Optional[datetime] = Field(
+        default_factory=get_kst_now,
+        index=True,
+        sa_column_kwargs={"onupdate": get_kst_now},
+    )
 
 
 # ------------------------------------------------------
@@ -71,14 +84,25 @@ class Post(SQLModel, table=True):
     # 게시글 이미지 URL
     image_url: Optional[str] = None
 
+    # 댓글 수 (댓글 작성/삭제 시 함께 갱신, 목록 조회 때 COUNT 하지 않음)
+    # 어긋나면 scripts/reconcile_comment_counts.py 로 재계산
+    comment_count: int = Field(default=0)
+
     created_at: datetime = Field(default_factory=get_kst_now)
-    updated_at: Optional[datetime] = None
+    # 게시글 수정 시각 (작성 직후에는 None)
+    # 댓글 수 갱신 같은 내부 UPDATE 로는 바뀌지 않도록 update_post 에서 직접 설정
+    updated_at: Optional[datetime] = Field(default=None, index=True)
 
 
 # ------------------------------------------------------
 # 4. Comment (댓글) 모델
 # ------------------------------------------------------
 class Comment(SQLModel, table=True):
+    # 게시글별 댓글 목록 keyset 페이지네이션 (post_id, created_at, id)
+    __table_args__ = (
+        Index("ix_comment_post_created_id", "post_id", "created_at", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     post_id: int = Field(foreign_key="post.id")
     user_id: int = Field(foreign_key="user.id")
@@ -90,6 +114,11 @@ class Comment(SQLModel, table=True):
 # 5. UserFriendship (친구 관계) 모델
 # ------------------------------------------------------
 class UserFriendship(SQLModel, table=True):
+    # 친구 목록 / 함께 아는 친구 self-join 용 (user_id → friend_user_id)
+    __table_args__ = (
+        Index("ix_userfriendship_user_friend", "user_id", "friend_user_id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
     friend_user_id: int = Field(foreign_key="user.id")
@@ -157,6 +186,9 @@ class UserReport(SQLModel, table=True):
 # ------------------------------------------------------
 class PostLike(SQLModel, table=True):
     """게시글 좋아요 모델"""
+    # 같은 사용자의 중복 좋아요 방지 (동시 클릭에도 1행만 유지)
+    __table_args__ = (UniqueConstraint("user_id", "post_id", name="uq_postlike_user_post"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
     post_id: int = Field(foreign_key="post.id")
@@ -168,6 +200,8 @@ class PostLike(SQLModel, table=True):
 # ------------------------------------------------------
 class CommentLike(SQLModel, table=True):
     """댓글 좋아요 모델"""
+    __table_args__ = (UniqueConstraint("user_id", "comment_id", name="uq_commentlike_user_comment"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
     comment_id: int = Field(foreign_key="comment.id")
@@ -215,4 +249,119 @@ class Notification(SQLModel, table=True):
     related_post_id: Optional[int] = Field(default=None, foreign_key="post.id")
     
     is_read: bool = Field(default=False)
-    created_at: datetime = Field(default_factory=get_kst_now)
\ No newline at end of file
+    created_at: datetime = Field(default_factory=get_kst_now)
+
+
+# ------------------------------------------------------
+# 📎 UploadSession (재개 가능한 청크 업로드) 모델
+# ------------------------------------------------------
+class UploadSession(SQLModel, table=True):
+    """청크 업로드 세션 (create → PUT chunk by offset → complete)"""
+    id: str = Field(primary_key=True)  # uuid hex (클라이언트에 노출되는 upload_id)
+    user_id: int = Field(foreign_key="user.id", index=True)
+
+    key: str  # 저장소에 최종 저장될 파일 key (uuid.확장자)
+    file_name: str
+    file_size: int
+    file_type: Optional[str] = None
+
+    received_bytes: int = Field(default=0)
+    chunk_count: int = Field(default=0)
+    status: str = Field(default="uploading")  # uploading, completed
+    file_url: Optional[str] = None
+
+    created_at: datetime = Field(default_factory=get_kst_now)
+    expires_at: datetime = Field(index=True)
+
+
+# ------------------------------------------------------
+# 🔥 PostHotScore (인기 피드 점수) 모델
+# ------------------------------------------------------
+class PostHotScore(SQLModel, table=True):
+    """
+    ranking.HotRanker 의 메모리 점수를 주기적으로 저장한 테이블
+    (서버 재시작 시 전체 재계산 없이 바로 로드)
+    """
+    post_id: int = Field(primary_key=True)  # 게시글 삭제와 독립적으로 정리되도록 FK 없음
+    community_id: Optional[int] = Field(default=None, index=True)
+    score: float = Field(index=True)  # 인기순 DB 정렬(랭커 fallback)용
+    base_score: float
+    updated_at: datetime = Field(default_factory=get_kst_now)
+
+
+# ------------------------------------------------------
+# 🤝 FriendRecommendation (미리 계산한 추천 친구) 모델
+# ------------------------------------------------------
+class FriendRecommendation(SQLModel, table=True):
+    """
+    recommendation_store 가 사용자별로 저장해 둔 추천 후보 상위 N명
+    - kind: 추천 방식 ("rule" = 규칙 기반, "content" = 프로필 유사도 + 함께 아는 친구)
+    - is_stale: 프로필/친구/차단/신고 변경으로 다시 계산해야 하는 상태
+    """
+    user_id: int = Field(primary_key=True)  # 탈퇴 시 직접 정리 (FK 없음)
+    kind: str = Field(primary_key=True)
+    candidate_ids: List[int] = Field(default_factory=list, sa_column=Column(JSON))
+    is_stale: bool = Field(default=False, index=True)
+    computed_at: datetime = Field(default_factory=get_kst_now, index=True)
+    # ai_precompute 가 이 목록의 AI 추천 이유를 만든 시각 (computed_at 보다 이전이면 다시 생성 대상)
+    ai_generated_at: Optional[datetime] = Field(default=None)
+
+
+# ------------------------------------------------------
+# 🧭 ProfileEmbedding (프로필 임베딩) 모델
+# ------------------------------------------------------
+class ProfileEmbedding(SQLModel, table=True):
+    """
+    embeddings.py 가 계산한 사용자 프로필 임베딩 (float32 바이트열)
+    - model: 임베딩 제공자/배포/차원 (바뀌면 다시 계산)
+    - doc_hash: 임베딩한 프로필 문서 해시 (프로필이 그대로면 다시 계산하지 않음)
+    """
+    user_id: int = Field(primary_key=True)  # 탈퇴 시 직접 정리 (FK 없음)
+    model: str
+    doc_hash: str
+    vector: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    updated_at: datetime = Field(default_factory=get_kst_now)
+
+
+# ------------------------------------------------------
+# 💬 AIRecommendationText (미리 생성한 AI 추천 이유) 모델
+# ------------------------------------------------------
+class AIRecommendationText(SQLModel, table=True):
+    """
+    ai_precompute 배치 작업이 만든 (사용자, 추천 후보) 별 추천 이유 / 첫 메시지
+    - cache_key: 생성 당시 두 사람 프로필 해시 (프로필이 바뀌면 키가 달라져 사용하지 않음)
+    """
+    user_id: int = Field(primary_key=True)       # 탈퇴 시 직접 정리 (FK 없음)
+    candidate_id: int = Field(primary_key=True, index=True)
+    cache_key: str
+    reason: str
+    first_messages: List[str] = Field(default_factory=list, sa_column=Column(JSON))
+    created_at: datetime = Field(default_factory=get_kst_now)
+
+
+# ------------------------------------------------------
+# 🚦 LoginThrottleBucket (로그인 시도 제한 버킷) 모델
+# ------------------------------------------------------
+class LoginThrottleBucket(SQLModel, table=True):
+    """
+    rate_limit.DatabaseRateLimitStore 가 쓰는 토큰 버킷 (LOGIN_THROTTLE_BACKEND=database)
+    - key: "login:<로그인 ID>" / "ip:<IP>"
+    - updated_at: 마지막으로 토큰을 계산한 시각 (epoch 초)
+    """
+    key: str = Field(primary_key=True)
+    tokens: float
+    updated_at: float = Field(index=True)
+
+
+# ------------------------------------------------------
+# 🏷️ ContentVersion (삭제 버전 카운터) 모델
+# ------------------------------------------------------
+class ContentVersion(SQLModel, table=True):
+    """
+    etag.bump_version 이 올리는 카운터
+    - 행 삭제는 최대 id / updated_at 으로 잡히지 않으므로 삭제하는 쪽에서 1씩 올림
+    - name: "feed" (게시글 / 게시글 좋아요 / 댓글 삭제)
+    - name: "chat_rooms:{user_id}" (채팅방 고정/해제 - updated_at 을 바꾸면 목록 순서가 바뀜)
+    """
+    name: str = Field(primary_key=True)
+    version: int = Field(default=0)
@@ -0,0 +1,273 @@
+# 파일 경로: intersection-backend/app/profile_index.py
+
+from __future__ import annotations
+
+import os
+import pickle
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sqlmodel import Session, select
+from sqlalchemy import func
+
+from .config import settings
+from .db import engine
+from .models import User
+
+# =====================================================
+# 🧠 프로필 TF-IDF 인덱스 (services.get_content_based_scores 용)
+#
+# 요청마다 TfidfVectorizer 를 새로 fit 하지 않고,
+# - 전체 사용자 프로필로 한 번 fit 한 vectorizer
+# - 사용자별 (L2 정규화된) TF-IDF 희소 행렬
+# 을 메모리에 유지한다. 유사도 = 희소 행렬 × 질의 벡터 (코사인)
+#
+# 프로필이 바뀌면 해당 행만 transform 해서 바로 행렬에 반영 (기존 어휘 기준).
+# 조회 때는 행렬 하나에 곱하기만 하도록 블록/오버레이를 따로 두지 않음.
+# 새 n-gram 이 쌓이면 백그라운드에서 다시 fit.
+# 디스크(PROFILE_INDEX_PATH)에 저장해 두고 재시작 시 바뀐 사용자만 반영.
+# =====================================================
+
+# 마지막 fit 이후 이만큼(비율) 행이 바뀌면 다시 fit
+_REFIT_RATIO = 0.2
+_REFIT_MIN_UPDATES = 100
+
+
+def profile_document(user: User) -> str:
+    """사용자 프로필 → 문서 (공백 제거해서 '남정' ↔ '남정초등학교' 도 매칭)"""
+    return (
+        f"{str(user.school_name or '').replace(' ', '')} "
+        f"{str(user.region or '').replace(' ', '')} "
+        f"{user.admission_year or ''}"
+    )
+
+
+def _new_vectorizer() -> TfidfVectorizer:
+    # analyzer='char', ngram_range=(2, 3): 2~3글자씩 쪼개서 비교
+    return TfidfVectorizer(analyzer="char", ngram_range=(2, 3))
+
+
+class ProfileIndex:
+    """
+    user_id → TF-IDF 행.
+    - _matrix: 전체 사용자 CSR 행렬 (행 = _ids 순서), 변경 시 새 행렬로 교체
+      (조회 스레드는 lock 안에서 참조만 가져가서 lock 밖에서 계산)
+    - _ids: 행 순서의 user_id 배열 (np.isin 으로 제외 마스크 계산)
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.PROFILE_INDEX_PATH
+        self._lock = threading.RLock()
+        self._vectorizer: Optional[TfidfVectorizer] = None
+        self._matrix = sparse.csr_matrix((0, 0))
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._row_of: Dict[int, int] = {}
+        self._updates_since_fit = 0
+        self._refitting = False
+        # 마지막 fit 시점의 MAX(User.updated_at) (재시작 시 이후 변경분만 다시 반영)
+        self.synced_at: Optional[datetime] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._vectorizer is not None
+
+    def ensure_loaded(self) -> None:
+        """서버 startup 을 거치지 않은 경우(스크립트 등) 처음 한 번 로드"""
+        if self.ready:
+            return
+        with Session(engine) as session:
+            self.load(session)
+
+    # ----- 구축 -----
+    def _fit(self, users: List[User]) -> Tuple[Optional[TfidfVectorizer], sparse.csr_matrix, List[int]]:
+        vectorizer = _new_vectorizer()
+        docs = [profile_document(u) for u in users]
+        try:
+            matrix = vectorizer.fit_transform(docs).tocsr()
+        except ValueError:
+            # 사용자가 없거나 n-gram 이 하나도 없으면 빈 인덱스
+            return None, sparse.csr_matrix((0, 0)), []
+        return vectorizer, matrix, [u.id for u in users]
+
+    def rebuild(self, session: Session) -> int:
+        """전체 사용자로 다시 fit (fit 은 lock 밖에서 수행)"""
+        users = session.exec(select(User)).all()
+        synced_at = session.exec(select(func.max(User.updated_at))).one()
+        vectorizer, matrix, ids = self._fit(users)
+
+        with self._lock:
+            self._vectorizer = vectorizer
+            self._set_matrix(matrix, ids)
+            self._updates_since_fit = 0
+            self.synced_at = synced_at
+        return len(ids)
+
+    def _set_matrix(self, matrix: sparse.csr_matrix, ids) -> None:
+        """lock 보유 상태에서 호출"""
+        self._matrix = matrix
+        self._ids = np.asarray(ids, dtype=np.int64)
+        self._row_of = {int(user_id): row for row, user_id in enumerate(self._ids)}
+
+    # ----- 증분 갱신 -----
+    def upsert(self, user: User) -> None:
+        """프로필 생성/수정 시 해당 사용자 벡터만 교체"""
+        self.upsert_many([user])
+
+    def upsert_many(self, users: List[User]) -> None:
+        """여러 사용자 벡터를 한 번에 교체 (행렬을 한 번만 다시 만듦)"""
+        with self._lock:
+            if self._vectorizer is None or not users:
+                return
+            latest = {u.id: u for u in users}
+            vectors = self._vectorizer.transform([profile_document(u) for u in latest.values()]).tocsr()
+            self._replace_rows(list(latest), vectors)
+            self._updates_since_fit += len(latest)
+        self._maybe_refit()
+
+    def remove(self, user_id: int) -> None:
+        self.remove_many([user_id])
+
+    def remove_many(self, user_ids: Iterable[int]) -> None:
+        with self._lock:
+            gone = [user_id for user_id in user_ids if user_id in self._row_of]
+            if gone:
+                self._replace_rows(gone, None)
+
+    def _replace_rows(self, user_ids: List[int], vectors: Optional[sparse.csr_matrix]) -> None:
+        """
+        user_ids 의 기존 행을 빼고 vectors(없으면 삭제만)를 뒤에 붙인 새 행렬로 교체
+        (lock 보유 상태에서 호출)
+        """
+        keep = ~np.isin(self._ids, np.asarray(user_ids, dtype=np.int64))
+        blocks = [self._matrix[keep]] if keep.any() else []
+        ids = self._ids[keep]
+        if vectors is not None:
+            blocks.append(vectors)
+            ids = np.concatenate([ids, np.asarray(user_ids, dtype=np.int64)])
+
+        width = len(self._vectorizer.vocabulary_) if self._vectorizer else 0
+        matrix = sparse.vstack(blocks).tocsr() if blocks else sparse.csr_matrix((0, width))
+        self._set_matrix(matrix, ids)
+
+    def _maybe_refit(self) -> None:
+        """새 n-gram(기존 어휘에 없는 학교/지역)이 반영되도록 변경이 쌓이면 백그라운드 재학습"""
+        threshold = max(_REFIT_MIN_UPDATES, int(len(self._ids) * _REFIT_RATIO))
+        with self._lock:
+            if self._refitting or self._updates_since_fit < threshold:
+                return
+            self._refitting = True
+
+        def _run():
+            try:
+                with Session(engine) as session:
+                    self.rebuild(session)
+                self.save()
+            except Exception as e:
+                print(f"[profile_index] refit failed: {e}")
+            finally:
+                self._refitting = False
+
+        threading.Thread(target=_run, daemon=True).start()
+
+    # ----- 조회 -----
+    def _vectors_for(self, user_ids: Iterable[int]) -> Tuple[List[int], sparse.csr_matrix]:
+        """인덱스에 있는 사용자만 (id 목록, 행렬) 로 반환 (lock 보유 상태에서 호출)"""
+        found = [user_id for user_id in user_ids if user_id in self._row_of]
+        if not found:
+            return [], sparse.csr_matrix((0, 0))
+        return found, self._matrix[[self._row_of[user_id] for user_id in found]]
+
+    def similarities(self, target: User, candidates: List[User]) -> Dict[int, float]:
+        """
+        target 과 후보들의 코사인 유사도 {user_id: 0.0~1.0}
+        인덱스에 없는 후보(아직 반영 전)는 바로 transform 해서 계산
+        """
+        with self._lock:
+            if self._vectorizer is None or not candidates:
+                return {}
+            query = self._vectorizer.transform([profile_document(target)])
+            ids, matrix = self._vectors_for(u.id for u in candidates)
+            known = set(ids)
+            missing = [u for u in candidates if u.id not in known]
+            if missing:
+                ids = ids + [u.id for u in missing]
+                extra = self._vectorizer.transform([profile_document(u) for u in missing])
+                matrix = sparse.vstack([matrix, extra]).tocsr() if matrix.shape[0] else extra
+
+        # 행이 L2 정규화돼 있으므로 내적 = 코사인 유사도
+        sims = np.asarray((matrix @ query.T).todense()).ravel()
+        return {user_id: float(sim) for user_id, sim in zip(ids, sims)}
+
+    def top_k(self, target: User, k: int, exclude: Iterable[int] = ()) -> List[Tuple[int, float]]:
+        """전체 사용자 중 target 과 가장 비슷한 k명 [(user_id, 유사도), ...]"""
+        with self._lock:
+            if self._vectorizer is None or not self._matrix.shape[0]:
+                return []
+            query = self._vectorizer.transform([profile_document(target)])
+            matrix, ids = self._matrix, self._ids
+
+        sims = np.asarray((matrix @ query.T).todense()).ravel()
+        skip = np.fromiter(exclude, dtype=np.int64)
+        mask = ~np.isin(ids, np.append(skip, target.id))
+        sims = np.where(mask, sims, -1.0)
+
+        k = min(k, int(mask.sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top], kind="stable")]
+        return [(int(ids[row]), float(sims[row])) for row in top if sims[row] > 0]
+
+    # ----- 저장 / 로드 -----
+    def save(self) -> None:
+        with self._lock:
+            if self._vectorizer is None:
+                return
+            state = {
+                "vectorizer": self._vectorizer,
+                "matrix": self._matrix,
+                "ids": self._ids.tolist(),
+                "synced_at": self.synced_at,
+            }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+
+    def load(self, session: Session) -> int:
+        """
+        디스크에서 로드 후 저장 이후 변경분만 반영.
+        파일이 없거나 깨졌으면 전체 rebuild.
+        """
+        try:
+            with open(self.path, "rb") as f:
+                state = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            count = self.rebuild(session)
+            self.save()
+            return count
+
+        with self._lock:
+            self._vectorizer = state["vectorizer"]
+            self._set_matrix(state["matrix"], state["ids"])
+            self._updates_since_fit = 0
+            self.synced_at = state["synced_at"]
+
+        # 저장 이후 가입/수정된 사용자
+        changed = select(User)
+        if self.synced_at is not None:
+            changed = changed.where(User.updated_at > self.synced_at)
+        self.upsert_many(session.exec(changed).all())
+
+        # 저장 이후 탈퇴한 사용자
+        alive = set(session.exec(select(User.id)).all())
+        self.remove_many(user_id for user_id in self._row_of if user_id not in alive)
+        return len(alive)
+
+
+profile_index = ProfileIndex()
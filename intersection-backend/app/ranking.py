@@ -0,0 +1,503 @@
+# 파일 경로: intersection-backend/app/ranking.py
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, func
+from sqlmodel import Session, select
+
+from .config import settings
+from .db import engine
+from .models import KST, Post, PostLike, Comment, User, PostHotScore, get_kst_now
+
+# =====================================================
+# 🔥 인기(hot) 피드 랭킹
+#
+# 점수 = Σ weight × 2^(-(now - t) / half_life)  (좋아요/댓글이 오래될수록 반감)
+#
+# now 는 모든 게시글에 공통이므로 로그 공간에서
+#   score = log Σ weight × 2^((t - EPOCH) / half_life)
+# 만 유지하면 순위가 시간에 따라 바뀌지 않는다.
+# → 이벤트가 들어올 때 해당 게시글 점수만 갱신 (전체 재계산 없음)
+# =====================================================
+
+# 이벤트 가중치
+WEIGHT_POST = 1.0      # 게시글 작성 자체 (새 글도 피드에 노출되도록)
+WEIGHT_LIKE = 1.0
+WEIGHT_COMMENT = 2.0
+
+# 전체 피드 키 (커뮤니티별 피드와 별도로 모든 게시글을 담음)
+ALL_COMMUNITIES = "all"
+
+# 한 번에 저장할 점수 행 수
+_FLUSH_BATCH_SIZE = 1000
+
+# 로그 점수 기준 시각 (값이 너무 커지지 않도록)
+_EPOCH = datetime(2025, 1, 1, tzinfo=KST).timestamp()
+
+
+def _log_weight(weight: float, ts: float) -> float:
+    half_life = settings.HOT_HALF_LIFE_HOURS * 3600
+    return math.log(weight) + (ts - _EPOCH) / half_life * math.log(2)
+
+
+def _log_add(a: float, b: float) -> float:
+    """log(e^a + e^b) (overflow 없이)"""
+    if a < b:
+        a, b = b, a
+    return a + math.log1p(math.exp(b - a))
+
+
+def _log_sub(a: float, b: float, floor: float) -> float:
+    """log(e^a - e^b), floor(게시글 기본 점수) 아래로는 내려가지 않음"""
+    if b >= a:
+        return floor
+    return max(a + math.log1p(-math.exp(b - a)), floor)
+
+
+def _to_epoch(dt: Optional[datetime]) -> float:
+    if dt is None:
+        return time.time()
+    # SQLite 등에서 tz 정보 없이 돌아온 값은 KST 로 저장된 것으로 간주
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=KST)
+    return dt.timestamp()
+
+
+class HotRanker:
+    """
+    커뮤니티별 정렬 리스트로 게시글 점수를 유지하는 인메모리 랭커.
+    - _scores / _base / _community: post_id → 점수 / 작성 시점 기본 점수 / 커뮤니티
+    - _sorted: 커뮤니티 키 → [(-score, post_id), ...] 오름차순 (= 점수 내림차순)
+    - 변경분은 HOT_FLUSH_INTERVAL_SECONDS 마다 백그라운드 스레드에서 PostHotScore 에 저장
+      · 점수 절대값이 아니라 이번 주기에 더한/뺀 양(_added / _retracted, 로그 합)만 행 잠금 후 반영
+        → 인스턴스가 여러 대여도 서로의 점수를 덮어쓰지 않음
+      · 저장 후 다른 인스턴스가 갱신한 행(updated_at)을 읽어 메모리 점수에 반영
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._scores: Dict[int, float] = {}
+        self._base: Dict[int, float] = {}
+        self._community: Dict[int, Optional[int]] = {}
+        self._sorted: Dict[object, List[Tuple[float, int]]] = {ALL_COMMUNITIES: []}
+        self._dirty: Set[int] = set()
+        self._removed: Set[int] = set()
+        # 마지막 저장 이후 더한/뺀 가중치 (로그 공간 합)
+        self._added: Dict[int, float] = {}
+        self._retracted: Dict[int, float] = {}
+        self._last_flush = time.time()
+        self._flushing = False
+        # 이 시각 이후 갱신된 PostHotScore 행을 다음 저장 때 읽어 옴
+        self._last_sync: datetime = get_kst_now()
+        # 순위가 바뀔 때마다 증가 (ETag 등 캐시 무효화용)
+        self.version = 0
+
+    # ----- 정렬 리스트 관리 (lock 보유 상태에서 호출) -----
+    def _keys(self, post_id: int) -> List[object]:
+        community_id = self._community.get(post_id)
+        return [ALL_COMMUNITIES] if community_id is None else [ALL_COMMUNITIES, community_id]
+
+    def _unlink(self, post_id: int) -> None:
+        entry = (-self._scores[post_id], post_id)
+        for key in self._keys(post_id):
+            bucket = self._sorted.get(key, [])
+            i = bisect_left(bucket, entry)
+            if i < len(bucket) and bucket[i] == entry:
+                bucket.pop(i)
+
+    def _link(self, post_id: int) -> None:
+        entry = (-self._scores[post_id], post_id)
+        for key in self._keys(post_id):
+            insort(self._sorted.setdefault(key, []), entry)
+
+    def _set(self, post_id: int, score: float) -> None:
+        if post_id in self._scores:
+            self._unlink(post_id)
+        self._scores[post_id] = score
+        self._link(post_id)
+        self._dirty.add(post_id)
+        self._removed.discard(post_id)
+        self.version += 1
+
+    @staticmethod
+    def _accumulate(deltas: Dict[int, float], post_id: int, lw: float) -> None:
+        deltas[post_id] = _log_add(deltas[post_id], lw) if post_id in deltas else lw
+
+    # ----- 이벤트 반영 -----
+    def add_post(self, post_id: int, community_id: Optional[int], created_ts: Optional[float] = None) -> None:
+        """게시글 등록 (작성 시점 기본 점수)"""
+        base = _log_weight(WEIGHT_POST, created_ts or time.time())
+        with self._lock:
+            if post_id in self._scores:
+                return
+            self._community[post_id] = community_id
+            self._base[post_id] = base
+            self._set(post_id, base)
+        self.maybe_flush()
+
+    def _ensure_post(self, session: Session, post: Post) -> None:
+        """서버 시작 후 처음 보는 게시글이면 기본 점수로 등록"""
+        if post.id in self._scores:
+            return
+        author = session.get(User, post.author_id)
+        self.add_post(post.id, author.community_id if author else None, _to_epoch(post.created_at))
+
+    def record(
+        self, session: Session, post: Post, weight: float, happened_at: Optional[datetime] = None
+    ) -> None:
+        """
+        좋아요/댓글 추가 (+weight) 반영
+        - happened_at: 저장된 created_at (retract 가 같은 시각으로 빼므로 정확히 상쇄됨, 없으면 현재 시각)
+        """
+        self._ensure_post(session, post)
+        lw = _log_weight(weight, _to_epoch(happened_at))
+        with self._lock:
+            if post.id in self._scores:
+                self._set(post.id, _log_add(self._scores[post.id], lw))
+                self._accumulate(self._added, post.id, lw)
+        self.maybe_flush()
+
+    def retract(
+        self, session: Session, post: Post, weight: float, happened_at: Optional[datetime] = None
+    ) -> None:
+        """
+        좋아요 취소/댓글 삭제 (-weight) 반영 (기본 점수 아래로는 X)
+        - happened_at: 취소되는 좋아요/댓글이 생긴 시각 (더할 때와 같은 시각 기준으로 빼야 함, 없으면 현재 시각)
+        """
+        self._ensure_post(session, post)
+        lw = _log_weight(weight, _to_epoch(happened_at))
+        with self._lock:
+            if post.id in self._scores:
+                self._set(post.id, _log_sub(self._scores[post.id], lw, self._base[post.id]))
+                self._accumulate(self._retracted, post.id, lw)
+        self.maybe_flush()
+
+    def remove_post(self, post_id: int) -> None:
+        """게시글 삭제"""
+        with self._lock:
+            if post_id not in self._scores:
+                return
+            self._unlink(post_id)
+            del self._scores[post_id]
+            self._base.pop(post_id, None)
+            self._community.pop(post_id, None)
+            self._dirty.discard(post_id)
+            self._added.pop(post_id, None)
+            self._retracted.pop(post_id, None)
+            self._removed.add(post_id)
+            self.version += 1
+
+    # ----- 조회 -----
+    def top(self, community_id: Optional[int] = None, offset: int = 0, count: int = 20) -> List[int]:
+        """점수 순 post_id 목록 (community_id 가 None 이면 전체 피드)"""
+        key = ALL_COMMUNITIES if community_id is None else community_id
+        with self._lock:
+            bucket = self._sorted.get(key, [])
+            return [post_id for _, post_id in bucket[offset:offset + count]]
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    # ----- 저장 / 로드 -----
+    def maybe_flush(self) -> None:
+        """저장 주기가 지났으면 백그라운드 스레드에서 flush (요청 처리 중에는 DB I/O 를 하지 않음)"""
+        with self._lock:
+            if self._flushing or time.time() - self._last_flush < settings.HOT_FLUSH_INTERVAL_SECONDS:
+                return
+            self._flushing = True
+
+        def _run():
+            try:
+                with Session(engine) as session:
+                    self.flush(session)
+            except Exception as e:
+                # 변경분은 flush 안에서 되돌려 놓았으므로 다음 주기에 다시 저장
+                print(f"[ranking] flush failed: {e}")
+            finally:
+                self._flushing = False
+
+        threading.Thread(target=_run, name="hot-flush", daemon=True).start()
+
+    def flush(self, session: Session) -> int:
+        """
+        변경분을 PostHotScore 에 반영하고, 다른 인스턴스가 저장한 점수를 읽어 옴
+        1) 처음 저장하는 게시글은 기본 점수 행 생성 (이미 있으면 그대로)
+        2) 행을 잠그고 이번 주기에 더한/뺀 양만 반영 (절대값으로 덮어쓰지 않음)
+        3) 마지막 동기화 이후 갱신된 행으로 메모리 점수 갱신
+        - 이번 주기 변경분은 꺼내서 저장하고, commit 이 실패하면 다시 돌려놓음 (점수 변경분 유실 X)
+        """
+        with self._lock:
+            taken = (self._dirty, self._removed, self._added, self._retracted)
+            dirty = {
+                pid: (self._community.get(pid), self._base[pid], self._added.get(pid), self._retracted.get(pid))
+                for pid in self._dirty if pid in self._scores
+            }
+            removed = list(self._removed)
+            self._dirty, self._removed, self._added, self._retracted = set(), set(), {}, {}
+            self._last_flush = time.time()
+            since = self._last_sync
+
+        try:
+            self._write(session, dirty, removed)
+        except Exception:
+            session.rollback()
+            with self._lock:
+                self._restore(*taken)
+            raise
+
+        return self._sync(session, since, len(dirty) + len(removed))
+
+    def _restore(
+        self, dirty: Set[int], removed: Set[int], added: Dict[int, float], retracted: Dict[int, float]
+    ) -> None:
+        """저장에 실패한 변경분을 그 사이 새로 쌓인 변경분과 합쳐 되돌림 (lock 보유 상태)"""
+        self._removed |= removed
+        self._dirty |= {pid for pid in dirty if pid in self._scores}
+        for deltas, taken in ((self._added, added), (self._retracted, retracted)):
+            for pid, lw in taken.items():
+                if pid in self._scores:
+                    self._accumulate(deltas, pid, lw)
+
+    def _write(self, session: Session, dirty: Dict[int, tuple], removed: List[int]) -> None:
+        now = get_kst_now()
+
+        if removed:
+            session.exec(delete(PostHotScore).where(PostHotScore.post_id.in_(removed)))
+
+        if dirty:
+            self._insert_missing(session, [
+                {
+                    "post_id": pid,
+                    "community_id": community_id,
+                    "score": base,
+                    "base_score": base,
+                    "updated_at": now,
+                }
+                for pid, (community_id, base, _, _) in dirty.items()
+            ])
+
+            ids = list(dirty)
+            for i in range(0, len(ids), _FLUSH_BATCH_SIZE):
+                rows = session.exec(
+                    select(PostHotScore)
+                    .where(PostHotScore.post_id.in_(ids[i:i + _FLUSH_BATCH_SIZE]))
+                    .with_for_update()
+                ).all()
+                for row in rows:
+                    _, _, added, retracted = dirty[row.post_id]
+                    row.score = self._apply_deltas(row.score, row.base_score, added, retracted)
+                    row.updated_at = now
+                    session.add(row)
+
+        session.commit()
+
+    def _sync(self, session: Session, since: datetime, saved: int) -> int:
+        now = get_kst_now()
+        # 다른 인스턴스와의 시계 차이 / 늦은 commit 을 감안해 한 주기만큼 겹쳐서 읽음 (다시 읽어도 결과 같음)
+        changed = session.exec(
+            select(PostHotScore)
+            .join(Post, Post.id == PostHotScore.post_id)
+            .where(PostHotScore.updated_at >= since)
+        ).all()
+        with self._lock:
+            for row in changed:
+                self._adopt(row)
+            if changed:
+                self.version += 1
+            self._last_sync = now - timedelta(seconds=settings.HOT_FLUSH_INTERVAL_SECONDS)
+
+        return saved
+
+    @staticmethod
+    def _apply_deltas(score: float, base: float, added: Optional[float], retracted: Optional[float]) -> float:
+        if added is not None:
+            score = _log_add(score, added)
+        if retracted is not None:
+            score = _log_sub(score, retracted, base)
+        return score
+
+    def _adopt(self, row: PostHotScore) -> None:
+        """저장된 점수를 메모리에 반영 (저장 이후 이 인스턴스에 들어온 변경분은 다시 얹음, lock 보유 상태)"""
+        pid = row.post_id
+        if pid in self._removed:
+            return
+        score = self._apply_deltas(
+            row.score, row.base_score, self._added.get(pid), self._retracted.get(pid)
+        )
+        if pid in self._scores:
+            self._unlink(pid)
+        else:
+            self._community[pid] = row.community_id
+        self._base[pid] = row.base_score
+        self._scores[pid] = score
+        self._link(pid)
+
+    @staticmethod
+    def _insert_missing(session: Session, rows: List[dict]) -> None:
+        """PostHotScore 행이 없는 게시글만 추가 (다른 인스턴스가 먼저 만든 행은 건드리지 않음)"""
+        if not rows:
+            return
+        dialect = session.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            if dialect == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+            # 파라미터 개수 제한을 넘지 않도록 나눠서 insert
+            for i in range(0, len(rows), _FLUSH_BATCH_SIZE):
+                stmt = dialect_insert(PostHotScore).values(rows[i:i + _FLUSH_BATCH_SIZE])
+                session.exec(stmt.on_conflict_do_nothing(index_elements=["post_id"]))
+        else:
+            ids = [row["post_id"] for row in rows]
+            existing = set(session.exec(select(PostHotScore.post_id).where(PostHotScore.post_id.in_(ids))).all())
+            for row in rows:
+                if row["post_id"] not in existing:
+                    session.add(PostHotScore(**row))
+            session.flush()
+
+    def _reset(self) -> None:
+        self._scores.clear()
+        self._base.clear()
+        self._community.clear()
+        self._sorted = {ALL_COMMUNITIES: []}
+        self._dirty.clear()
+        self._removed.clear()
+        self._added.clear()
+        self._retracted.clear()
+        self.version += 1
+
+    def load(self, session: Session) -> int:
+        """
+        서버 시작 시 PostHotScore 에서 점수 로드.
+        - 저장된 점수가 없는데 게시글이 있으면 rebuild 로 전체 계산
+        - 점수 행이 없는 게시글(마지막 저장 이후 작성 등)은 원본으로 계산해서 행 추가 후 로드
+        """
+        has_rows = session.exec(select(func.count(PostHotScore.post_id))).one() > 0
+        if not has_rows:
+            has_posts = session.exec(select(func.count(Post.id))).one() > 0
+            return self.rebuild(session) if has_posts else 0
+
+        missing = session.exec(
+            select(Post.id, Post.created_at, User.community_id)
+            .join(User, Post.author_id == User.id)
+            .outerjoin(PostHotScore, PostHotScore.post_id == Post.id)
+            .where(PostHotScore.post_id == None)  # noqa: E711
+        ).all()
+        if missing:
+            now = get_kst_now()
+            scores = self._score_posts(session, missing, [post_id for post_id, _, _ in missing])
+            self._insert_missing(session, [
+                {
+                    "post_id": pid,
+                    "community_id": community_id,
+                    "score": score,
+                    "base_score": base,
+                    "updated_at": now,
+                }
+                for pid, (community_id, base, score) in scores.items()
+            ])
+            session.commit()
+
+        sync_from = get_kst_now()
+        rows = session.exec(
+            select(PostHotScore).join(Post, Post.id == PostHotScore.post_id)
+        ).all()
+
+        with self._lock:
+            self._reset()
+            for row in rows:
+                self._community[row.post_id] = row.community_id
+                self._base[row.post_id] = row.base_score
+                self._scores[row.post_id] = row.score
+            self._sorted = self._build_buckets()
+            self._last_flush = time.time()
+            self._last_sync = sync_from
+        return len(rows)
+
+    @staticmethod
+    def _score_posts(
+        session: Session,
+        posts: Iterable[Tuple[int, datetime, Optional[int]]],
+        only_ids: Optional[List[int]] = None,
+    ) -> Dict[int, Tuple[Optional[int], float, float]]:
+        """
+        게시글/좋아요/댓글 원본으로 점수 계산 → {post_id: (community_id, 기본 점수, 점수)}
+        only_ids 가 있으면 그 게시글의 좋아요/댓글만 조회 (없으면 전체 조회)
+        """
+        base: Dict[int, float] = {}
+        community: Dict[int, Optional[int]] = {}
+        scores: Dict[int, float] = {}
+        for post_id, created_at, community_id in posts:
+            base[post_id] = scores[post_id] = _log_weight(WEIGHT_POST, _to_epoch(created_at))
+            community[post_id] = community_id
+
+        def events(model, weight):
+            statement = select(model.post_id, model.created_at)
+            if only_ids is None:
+                yield from ((row, weight) for row in session.exec(statement).all())
+                return
+            for i in range(0, len(only_ids), _FLUSH_BATCH_SIZE):
+                chunk = only_ids[i:i + _FLUSH_BATCH_SIZE]
+                yield from ((row, weight) for row in session.exec(statement.where(model.post_id.in_(chunk))).all())
+
+        for model, weight in ((PostLike, WEIGHT_LIKE), (Comment, WEIGHT_COMMENT)):
+            for (post_id, created_at), w in events(model, weight):
+                if post_id in scores:
+                    scores[post_id] = _log_add(scores[post_id], _log_weight(w, _to_epoch(created_at)))
+
+        return {pid: (community[pid], base[pid], scores[pid]) for pid in scores}
+
+    def rebuild(self, session: Session) -> int:
+        """
+        게시글/좋아요/댓글 원본으로 전체 점수 재계산 후 저장 (정합성 복구용 명령).
+        실행 중인 다른 인스턴스는 다음 저장 주기에 새 점수를 읽어 감.
+        """
+        posts = session.exec(
+            select(Post.id, Post.created_at, User.community_id).join(User, Post.author_id == User.id)
+        ).all()
+        scores = self._score_posts(session, posts)
+        now = get_kst_now()
+
+        session.exec(delete(PostHotScore))
+        self._insert_missing(session, [
+            {
+                "post_id": pid,
+                "community_id": community_id,
+                "score": score,
+                "base_score": base,
+                "updated_at": now,
+            }
+            for pid, (community_id, base, score) in scores.items()
+        ])
+        session.commit()
+
+        with self._lock:
+            self._reset()
+            for pid, (community_id, base, score) in scores.items():
+                self._community[pid] = community_id
+                self._base[pid] = base
+                self._scores[pid] = score
+            self._sorted = self._build_buckets()
+            self._last_flush = time.time()
+            self._last_sync = now
+        return len(posts)
+
+    def _build_buckets(self) -> Dict[object, List[Tuple[float, int]]]:
+        buckets: Dict[object, List[Tuple[float, int]]] = {ALL_COMMUNITIES: []}
+        for post_id, score in self._scores.items():
+            for key in self._keys(post_id):
+                buckets.setdefault(key, []).append((-score, post_id))
+        for bucket in buckets.values():
+            bucket.sort()
+        return buckets
+
+
+hot_ranker = HotRanker()
@@ -0,0 +1,263 @@
+# 파일 경로: intersection-backend/app/rate_limit.py
+#
+# 로그인 시도 제한 (토큰 버킷)
+#
+# POST /token 은 시도마다 Argon2 검증을 하므로, 크리덴셜 스터핑처럼 잘못된 요청이
+# 몰리면 CPU 를 그대로 소모한다. 비밀번호 검증 전에 로그인 ID 별 / IP 별 버킷에서
+# 토큰을 하나씩 꺼내고, 비어 있으면 바로 429 로 거절한다.
+# - 버킷 크기(BURST) 만큼은 연속으로 시도 가능, 이후 분당 PER_MINUTE 개씩 다시 채워짐
+# - 저장소: memory (프로세스별, 기본) / database (LoginThrottleBucket 테이블, 인스턴스 간 공유)
+#   다른 공유 저장소(Redis 등)는 RateLimitStore 를 구현해서 set_rate_limit_store 로 교체
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, delete, select
+
+from .config import settings
+from .db import engine
+from .models import LoginThrottleBucket
+
+
+# =====================================================
+# 1. 버킷 저장소
+# =====================================================
+class RateLimitStore:
+    """
+    토큰 버킷 저장소 공통 인터페이스.
+    - take: key 버킷에서 토큰 1개를 꺼냄. 성공하면 0, 비어 있으면 다음 토큰까지 남은 초
+    """
+
+    name = "base"
+
+    def take(self, key: str, capacity: float, refill_per_second: float, now: float) -> float:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+def _refill(tokens: float, updated_at: float, capacity: float, refill_per_second: float, now: float) -> float:
+    return min(capacity, tokens + max(0.0, now - updated_at) * refill_per_second)
+
+
+def _consume(tokens: float, refill_per_second: float) -> Tuple[float, float]:
+    """(남은 토큰, 대기 시간) - 토큰이 1개 미만이면 꺼내지 않고 대기 시간만 계산"""
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / refill_per_second
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """
+    프로세스 메모리 저장소 (단일 인스턴스 / 개발용)
+    - 인스턴스가 여러 대면 인스턴스 수만큼 한도가 늘어남 → database 저장소 사용
+    - 키가 max_keys 를 넘으면 가장 오래 쓰지 않은 버킷부터 버림 (버려진 버킷은 가득 찬 상태로 다시 시작)
+    """
+
+    name = "memory"
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: float, refill_per_second: float, now: float) -> float:
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens, wait = _consume(_refill(tokens, updated_at, capacity, refill_per_second, now), refill_per_second)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class DatabaseRateLimitStore(RateLimitStore):
+    """
+    DB 저장소 (LoginThrottleBucket) - 여러 인스턴스가 같은 한도를 공유
+    - 요청 Session 과 별도 Session 사용: 로그인이 401 로 rollback 돼도 꺼낸 토큰은 유지
+    - PostgreSQL 에서는 행 잠금(FOR UPDATE)으로 동시 요청이 같은 토큰을 꺼내지 않음
+    - prune_every 번 꺼낼 때마다 이미 가득 찼을 오래된 버킷 정리
+    """
+
+    name = "database"
+
+    def __init__(self, prune_every: int = 1000):
+        self.prune_every = prune_every
+        self._takes = 0
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: float, refill_per_second: float, now: float) -> float:
+        for _ in range(2):
+            with Session(engine) as session:
+                bucket = session.exec(
+                    select(LoginThrottleBucket)
+                    .where(LoginThrottleBucket.key == key)
+                    .with_for_update()
+                ).first()
+                if bucket is None:
+                    bucket = LoginThrottleBucket(key=key, tokens=capacity, updated_at=now)
+                tokens, wait = _consume(
+                    _refill(bucket.tokens, bucket.updated_at, capacity, refill_per_second, now),
+                    refill_per_second,
+                )
+                bucket.tokens = tokens
+                bucket.updated_at = now
+                session.add(bucket)
+                try:
+                    session.commit()
+                except IntegrityError:
+                    # 다른 요청이 같은 키 버킷을 먼저 만듦 → 다시 읽어서 처리
+                    continue
+            break
+        else:
+            wait = 0.0
+
+        with self._lock:
+            self._takes += 1
+            due = bool(self.prune_every) and self._takes % self.prune_every == 0
+        if due:
+            self.prune(now - capacity / refill_per_second)
+        return wait
+
+    def prune(self, older_than: float) -> int:
+        with Session(engine) as session:
+            result = session.exec(
+                delete(LoginThrottleBucket).where(LoginThrottleBucket.updated_at < older_than)
+            )
+            session.commit()
+            return result.rowcount or 0
+
+    def clear(self) -> None:
+        with Session(engine) as session:
+            session.exec(delete(LoginThrottleBucket))
+            session.commit()
+
+
+_store: Optional[RateLimitStore] = None
+
+
+def get_rate_limit_store() -> RateLimitStore:
+    """
+    설정(LOGIN_THROTTLE_BACKEND)에 맞는 버킷 저장소 싱글톤 반환.
+    알 수 없는 값이면 RuntimeError 발생.
+    """
+    global _store
+
+    if _store is not None:
+        return _store
+
+    backend = settings.LOGIN_THROTTLE_BACKEND.lower()
+    if backend == "memory":
+        _store = MemoryRateLimitStore(settings.LOGIN_THROTTLE_MAX_KEYS)
+    elif backend == "database":
+        _store = DatabaseRateLimitStore()
+    else:
+        raise RuntimeError(f"알 수 없는 LOGIN_THROTTLE_BACKEND 입니다: {settings.LOGIN_THROTTLE_BACKEND}")
+
+    return _store
+
+
+def set_rate_limit_store(store: RateLimitStore) -> None:
+    """외부 공유 저장소(Redis 등) 구현으로 교체"""
+    global _store
+    _store = store
+
+
+# =====================================================
+# 2. 로그인 시도 제한
+# =====================================================
+class TokenBucketLimiter:
+    """
+    이름(name) 별로 구분된 토큰 버킷 묶음
+    - burst <= 0 이거나 per_minute <= 0 이면 제한하지 않음
+    """
+
+    def __init__(self, name: str, burst: int, per_minute: float):
+        self.name = name
+        self.burst = burst
+        self.per_minute = per_minute
+
+    @property
+    def enabled(self) -> bool:
+        return self.burst > 0 and self.per_minute > 0
+
+    def hit(self, key: str, now: Optional[float] = None) -> float:
+        """토큰 1개 사용. 허용이면 0, 거절이면 Retry-After(초)"""
+        if not self.enabled:
+            return 0.0
+        return get_rate_limit_store().take(
+            f"{self.name}:{key}",
+            float(self.burst),
+            self.per_minute / 60.0,
+            time.time() if now is None else now,
+        )
+
+
+login_id_limiter = TokenBucketLimiter(
+    "login", settings.LOGIN_THROTTLE_LOGIN_BURST, settings.LOGIN_THROTTLE_LOGIN_PER_MINUTE
+)
+ip_limiter = TokenBucketLimiter(
+    "ip", settings.LOGIN_THROTTLE_IP_BURST, settings.LOGIN_THROTTLE_IP_PER_MINUTE
+)
+
+_stats: Dict[str, int] = {"allowed": 0, "throttled_ip": 0, "throttled_login": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def check_login_attempt(login_id: str, client_ip: Optional[str]) -> float:
+    """
+    로그인 시도 1번을 기록하고 허용 여부 반환 (비밀번호 검증 전에 호출)
+    - 0 이면 허용, 아니면 Retry-After(초)
+    - IP 버킷이 먼저 막히면 로그인 ID 버킷은 건드리지 않음
+      (다른 사람의 로그인 ID 한도를 한 IP 가 전부 써버리지 않도록)
+    """
+    if client_ip:
+        wait = ip_limiter.hit(client_ip)
+        if wait > 0:
+            _count("throttled_ip")
+            return wait
+
+    wait = login_id_limiter.hit(login_id.strip().lower())
+    if wait > 0:
+        _count("throttled_login")
+        return wait
+
+    _count("allowed")
+    return 0.0
+
+
+def client_ip_from(host: Optional[str], forwarded_for: Optional[str]) -> Optional[str]:
+    """
+    요청 IP
+    - LOGIN_THROTTLE_TRUST_FORWARDED_FOR=true (App Service 등 프록시 뒤) 이면
+      프록시가 마지막에 덧붙인 X-Forwarded-For 값 사용 (클라이언트가 앞쪽 값을 위조해도 무시)
+    """
+    if settings.LOGIN_THROTTLE_TRUST_FORWARDED_FOR and forwarded_for:
+        ip = forwarded_for.split(",")[-1].strip()
+        # Azure 프런트엔드는 "IPv4:포트" / "[IPv6]:포트" 형태로 넘겨줌
+        if ip.startswith("["):
+            ip = ip[1:].partition("]")[0]
+        elif ip.count(":") == 1:
+            ip = ip.split(":")[0]
+        if ip:
+            return ip
+    return host
+
+
+def get_login_throttle_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_stats)
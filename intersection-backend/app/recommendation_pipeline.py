@@ -0,0 +1,403 @@
+# 파일 경로: intersection-backend/app/recommendation_pipeline.py
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from random import shuffle
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import func, or_, union_all
+from sqlmodel import Session, select
+
+from .config import settings
+from .embeddings import embedding_document, embedding_index
+from .friend_scoring import CandidateArrays, score_candidates, top_k_indices
+from .models import User, UserFriendship, UserBlock, UserReport
+from .profile_index import profile_index
+from .services import get_content_based_scores, get_mutual_friend_counts
+from .social_graph import social_graph
+
+# =====================================================
+# 🧭 추천 친구 파이프라인
+#
+# 규칙 기반(rule) / 콘텐츠 기반(content) 추천이 같은 단계를 공유한다.
+#   1. exclude    : 친구 / 차단 / 신고 관계 (쿼리 1번, UNION ALL)
+#   2. candidates : 버킷별 인덱스 조회로 후보군 수집 (전체 사용자 조회 없음)
+#                   같은 사용자의 후보군은 RECOMMENDATION_POOL_TTL_SECONDS 동안 재사용
+#   3. score.*    : 등록된 점수기(rules / tfidf / mutual_friends / embedding) × 가중치 합
+#   4. rank       : 점수 > 0 상위 limit명 (+ rule 은 0점 후보 랜덤 채우기)
+# 가중치는 RECOMMENDATION_{RULE,CONTENT}_WEIGHTS 로 조절하고,
+# 단계별 소요 시간은 get_pipeline_stats() 로 확인한다.
+# =====================================================
+
+# 후보군 버킷(같은 학교 / 지역 / 입학년도 ...) 하나에서 가져올 최대 인원
+CANDIDATES_PER_BUCKET = 300
+# 입학년도 버킷 범위 (rules 점수에서 점수를 주는 최대 차이)
+ADMISSION_YEAR_WINDOW = 3
+# 후보군 캐시 최대 사용자 수
+POOL_CACHE_MAX_ENTRIES = 1024
+
+
+class RunContext:
+    """
+    파이프라인 한 번 실행 동안 단계 간에 공유하는 값
+    - mutual_counts: 함께 아는 친구 수 (후보 수집 + mutual_friends 점수기에서 한 번만 계산)
+    """
+
+    def __init__(self, session: Session, user: User):
+        self.session = session
+        self.user = user
+        self._mutual_counts: Optional[Dict[int, int]] = None
+
+    def mutual_counts(self) -> Dict[int, int]:
+        if self._mutual_counts is None:
+            self._mutual_counts = get_mutual_friend_counts(self.session, self.user.id)
+        return self._mutual_counts
+
+
+# -----------------------------------------------------
+# 1. 제외 대상
+# -----------------------------------------------------
+def collect_excluded_user_ids(session: Session, current_user: User) -> Set[int]:
+    """
+    추천 대상에서 제외할 사용자 ID (쿼리 1번).
+    - 나 자신 / 이미 친구인 사용자
+    - 내가 차단한 / 나를 차단한 사용자
+    - 내가 신고한 / 나를 신고한 사용자
+    """
+    user_id = current_user.id
+    stmt = union_all(
+        select(UserFriendship.friend_user_id).where(UserFriendship.user_id == user_id),
+        select(UserBlock.blocked_user_id).where(UserBlock.user_id == user_id),
+        select(UserBlock.user_id).where(UserBlock.blocked_user_id == user_id),
+        select(UserReport.reported_user_id).where(UserReport.reporter_id == user_id),
+        select(UserReport.reporter_id).where(UserReport.reported_user_id == user_id),
+    )
+    excluded_ids: Set[int] = {user_id}
+    excluded_ids.update(session.execute(stmt).scalars().all())
+    return excluded_ids
+
+
+# -----------------------------------------------------
+# 2. 후보군
+# -----------------------------------------------------
+def _school_names(user: User) -> List[str]:
+    """단일 school_name + schools(JSONB) 의 학교 이름들"""
+    names = [user.school_name] if user.school_name else []
+    schools = user.schools if isinstance(user.schools, list) else (
+        list(user.schools.values()) if user.schools else []
+    )
+    for school in schools:
+        name = school.get("name") if isinstance(school, dict) else None
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def _users_in_order(session: Session, user_ids: List[int]) -> List[User]:
+    if not user_ids:
+        return []
+    found = {u.id: u for u in session.exec(select(User).where(User.id.in_(user_ids))).all()}
+    return [found[user_id] for user_id in user_ids if user_id in found]
+
+
+def collect_candidates(
+    session: Session,
+    current_user: User,
+    excluded_ids: Set[int],
+    per_bucket: int = CANDIDATES_PER_BUCKET,
+    context: Optional[RunContext] = None,
+) -> List[User]:
+    """
+    전체 사용자 대신 나와 겹치는 사용자만 후보로 가져옵니다. (버킷별 인덱스 조회 + 상한)
+    - 같은 학교 (school_name, PostgreSQL 이면 schools JSONB @> 도 포함)
+    - 같은 지역
+    - 입학년도 ±ADMISSION_YEAR_WINDOW
+    - 함께 아는 친구가 많은 친구의 친구
+    - 프로필 TF-IDF / 임베딩이 가까운 사용자 (학교/지역 표기가 조금 달라도 포함)
+    → 추천 비용이 전체 사용자 수가 아니라 코호트 크기에 비례
+    """
+    def _bucket(*conditions, order_by=None) -> List[User]:
+        stmt = select(User).where(*conditions)
+        if excluded_ids:
+            stmt = stmt.where(User.id.notin_(excluded_ids))
+        stmt = stmt.order_by(order_by if order_by is not None else User.id.desc())
+        return session.exec(stmt.limit(per_bucket)).all()
+
+    buckets: List[List[User]] = []
+
+    school_names = _school_names(current_user)
+    if current_user.school_name:
+        buckets.append(_bucket(User.school_name == current_user.school_name))
+    if school_names and session.get_bind().dialect.name == "postgresql":
+        # schools @> '[{"name": ...}]' (GIN 인덱스 사용)
+        buckets.append(_bucket(or_(*[
+            User.schools.contains([{"name": name}]) for name in school_names
+        ])))
+
+    if current_user.region:
+        buckets.append(_bucket(User.region == current_user.region))
+
+    if current_user.admission_year:
+        year = current_user.admission_year
+        buckets.append(_bucket(
+            User.admission_year.between(year - ADMISSION_YEAR_WINDOW, year + ADMISSION_YEAR_WINDOW),
+            order_by=func.abs(User.admission_year - year),
+        ))
+
+    # 친구의 친구 (그래프가 없으면 self-join 쿼리 1번)
+    if social_graph.ready:
+        mutual_ids = [
+            user_id for user_id, _ in
+            social_graph.friends_of_friends_top_k(current_user.id, per_bucket, exclude=excluded_ids)
+        ]
+    else:
+        counts = (context or RunContext(session, current_user)).mutual_counts()
+        mutual_ids = sorted(
+            (user_id for user_id in counts if user_id not in excluded_ids),
+            key=lambda user_id: (-counts[user_id], user_id),
+        )[:per_bucket]
+    buckets.append(_users_in_order(session, mutual_ids))
+
+    if profile_index.ready:
+        buckets.append(_users_in_order(session, [
+            user_id for user_id, _ in profile_index.top_k(current_user, per_bucket, exclude=excluded_ids)
+        ]))
+
+    if embedding_index.ready:
+        try:
+            similar_ids = [
+                user_id for user_id, _ in
+                embedding_index.similar_users(current_user, per_bucket, exclude=excluded_ids)
+            ]
+        except Exception as e:
+            # 임베딩 제공자 장애 시 나머지 버킷만 사용
+            print(f"[recommendation_pipeline] embedding candidates skipped: {e}")
+            similar_ids = []
+        buckets.append(_users_in_order(session, similar_ids))
+
+    # 버킷 간 중복 제거 (먼저 나온 버킷 순서 유지)
+    candidates: Dict[int, User] = {}
+    for bucket in buckets:
+        for u in bucket:
+            candidates.setdefault(u.id, u)
+    return list(candidates.values())
+
+
+class _PoolCache:
+    """
+    사용자별 후보군 id 목록 (LRU + TTL).
+    키에 내 프로필 문서를 넣어 프로필이 바뀌면 자연히 새로 수집하고,
+    제외 대상은 매번 새로 조회해서 걸러내므로 친구 추가 / 차단이 바로 반영된다.
+    """
+
+    def __init__(self, max_entries: int = POOL_CACHE_MAX_ENTRIES):
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[tuple, Tuple[float, List[int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[List[int]]:
+        ttl = settings.RECOMMENDATION_POOL_TTL_SECONDS
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if ttl <= 0 or time.monotonic() - entry[0] > ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: tuple, user_ids: List[int]) -> None:
+        if settings.RECOMMENDATION_POOL_TTL_SECONDS <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), user_ids)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_pool_cache = _PoolCache()
+
+
+def candidate_pool(
+    session: Session,
+    current_user: User,
+    excluded_ids: Set[int],
+    limit: int,
+    context: Optional[RunContext] = None,
+) -> List[User]:
+    """
+    후보군 (버킷 + 부족하면 최근 가입자로 limit*5 명까지 채움).
+    rule / content 가 같은 후보군을 쓰므로 짧게 캐시해서 버킷 조회를 한 번만 한다.
+    """
+    key = (current_user.id, limit, embedding_document(current_user))
+    cached_ids = _pool_cache.get(key)
+    if cached_ids is not None:
+        return _users_in_order(session, [i for i in cached_ids if i not in excluded_ids])
+
+    candidates = collect_candidates(session, current_user, excluded_ids, context=context)
+
+    # 버킷이 작으면 최근 가입자 일부를 더해서 빈 자리를 채울 수 있게 함
+    if len(candidates) < limit * 5:
+        taken_ids = excluded_ids | {u.id for u in candidates}
+        fill_stmt = select(User)
+        if taken_ids:
+            fill_stmt = fill_stmt.where(User.id.notin_(taken_ids))
+        candidates.extend(session.exec(
+            fill_stmt.order_by(User.id.desc()).limit(limit * 5 - len(candidates))
+        ).all())
+
+    _pool_cache.set(key, [u.id for u in candidates])
+    return candidates
+
+
+def clear_candidate_pool_cache() -> None:
+    _pool_cache.clear()
+
+
+# -----------------------------------------------------
+# 3. 점수기
+# -----------------------------------------------------
+# 점수기: (session, user, candidates, context) → 후보별 점수 배열 (candidates 순서)
+Scorer = Callable[[Session, User, List[User], RunContext], np.ndarray]
+_SCORERS: Dict[str, Scorer] = {}
+
+
+def scorer(name: str):
+    """점수기 등록 (가중치 설정의 이름으로 사용)"""
+    def decorator(func_: Scorer) -> Scorer:
+        _SCORERS[name] = func_
+        return func_
+    return decorator
+
+
+@scorer("rules")
+def _rule_scores(session: Session, user: User, candidates: List[User], context: RunContext) -> np.ndarray:
+    """학교 / 입학년도 / 지역 / 나이 / 성별 규칙 점수 (friend_scoring, 최대 83점)"""
+    return score_candidates(user, CandidateArrays(candidates)).astype(np.float64)
+
+
+@scorer("tfidf")
+def _tfidf_scores(session: Session, user: User, candidates: List[User], context: RunContext) -> np.ndarray:
+    """프로필 글자 n-gram TF-IDF 코사인 유사도 (0.0 ~ 1.0)"""
+    sims = get_content_based_scores(candidates, user)
+    return np.fromiter((sims.get(u.id, 0.0) for u in candidates), dtype=np.float64, count=len(candidates))
+
+
+@scorer("mutual_friends")
+def _mutual_friend_scores(session: Session, user: User, candidates: List[User], context: RunContext) -> np.ndarray:
+    """함께 아는 친구 수 (후보 수집에서 이미 계산했으면 재사용)"""
+    counts = context.mutual_counts()
+    return np.fromiter((counts.get(u.id, 0) for u in candidates), dtype=np.float64, count=len(candidates))
+
+
+@scorer("embedding")
+def _embedding_scores(session: Session, user: User, candidates: List[User], context: RunContext) -> np.ndarray:
+    """프로필 임베딩 코사인 유사도 (0 이하는 0, 인덱스가 없으면 전부 0)"""
+    if not embedding_index.ready:
+        return np.zeros(len(candidates))
+    sims = embedding_index.similarities(user, [u.id for u in candidates])
+    return np.clip(sims, 0.0, None).astype(np.float64)
+
+
+# -----------------------------------------------------
+# 4. 순위 + 파이프라인
+# -----------------------------------------------------
+_stats_lock = threading.Lock()
+# (kind, 단계) → [호출 수, 누적 초]
+_stage_stats: Dict[Tuple[str, str], List[float]] = {}
+
+
+def _record(kind: str, timings: Dict[str, float]) -> None:
+    with _stats_lock:
+        for stage, seconds in timings.items():
+            entry = _stage_stats.setdefault((kind, stage), [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+
+def get_pipeline_stats() -> Dict[str, Dict[str, float]]:
+    """{"kind.단계": {"calls", "avg_ms"}} (서버 종료 시 로그)"""
+    with _stats_lock:
+        return {
+            f"{kind}.{stage}": {"calls": int(calls), "avg_ms": round(total * 1000 / calls, 3)}
+            for (kind, stage), (calls, total) in _stage_stats.items()
+        }
+
+
+class RecommendationPipeline:
+    """
+    kind: 가중치 설정 이름 (RECOMMENDATION_{KIND}_WEIGHTS) 겸 통계 이름
+    fill_zero_scored: 상위 후보가 limit 보다 적으면 0점 후보를 랜덤으로 채움
+    require_name: 이름이 없는(가입 절차 미완료) 사용자 제외
+    """
+
+    def __init__(self, kind: str, fill_zero_scored: bool = False, require_name: bool = False):
+        self.kind = kind
+        self.fill_zero_scored = fill_zero_scored
+        self.require_name = require_name
+
+    def run(self, session: Session, user: User, limit: int = 20) -> List[User]:
+        return self.run_with_timings(session, user, limit)[0]
+
+    def run_with_timings(
+        self,
+        session: Session,
+        user: User,
+        limit: int = 20,
+    ) -> Tuple[List[User], Dict[str, float]]:
+        """추천 목록 + 단계별 소요 시간(초)"""
+        timings: Dict[str, float] = {}
+        started = time.perf_counter()
+
+        context = RunContext(session, user)
+        excluded_ids = collect_excluded_user_ids(session, user)
+        timings["exclude"] = time.perf_counter() - started
+
+        mark = time.perf_counter()
+        candidates = candidate_pool(session, user, excluded_ids, limit, context)
+        if self.require_name:
+            candidates = [u for u in candidates if u.name is not None]
+        timings["candidates"] = time.perf_counter() - mark
+
+        if not candidates:
+            _record(self.kind, timings)
+            return [], timings
+
+        scores = np.zeros(len(candidates))
+        for name, weight in settings.recommendation_weights(self.kind).items():
+            if not weight:
+                continue
+            compute = _SCORERS.get(name)
+            if compute is None:
+                raise RuntimeError(f"⚠️ 알 수 없는 추천 점수기: {name} (RECOMMENDATION_{self.kind.upper()}_WEIGHTS)")
+            mark = time.perf_counter()
+            scores += weight * compute(session, user, candidates, context)
+            timings[f"score.{name}"] = time.perf_counter() - mark
+
+        mark = time.perf_counter()
+        primary = [candidates[i] for i in top_k_indices(scores, limit)]
+        if self.fill_zero_scored and len(primary) < limit:
+            zero_scored = [candidates[i] for i in np.flatnonzero(scores <= 0)]
+            if zero_scored:
+                shuffle(zero_scored)
+                primary.extend(zero_scored[:limit - len(primary)])
+        timings["rank"] = time.perf_counter() - mark
+
+        timings["total"] = time.perf_counter() - started
+        _record(self.kind, timings)
+        return primary, timings
+
+
+# 규칙 점수 (0점 후보도 랜덤으로 채움) / 프로필 유사도 + 함께 아는 친구
+rule_pipeline = RecommendationPipeline("rule", fill_zero_scored=True)
+content_pipeline = RecommendationPipeline("content", require_name=True)
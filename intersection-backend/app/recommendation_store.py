@@ -0,0 +1,172 @@
+# 파일 경로: intersection-backend/app/recommendation_store.py
+
+from __future__ import annotations
+
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import delete, update, or_
+from sqlmodel import Session, select
+
+from .config import settings
+from .db import engine
+from .models import KST, User, FriendRecommendation, get_kst_now
+
+# =====================================================
+# 🤝 추천 친구 저장소
+#
+# 추천 API 가 호출될 때마다 후보 수집 + 점수 계산을 하지 않고,
+# 사용자별 상위 N명(id 목록)을 FriendRecommendation 에 저장해 두고 그대로 내려준다.
+# - 저장 목록이 없거나 stale / TTL 초과면 그 자리에서 계산 후 저장 (miss)
+# - 프로필 수정 / 친구 추가 / 차단 / 신고 시 관련 사용자 목록을 stale 로 표시
+# - 백그라운드 스레드가 stale / 오래된 목록을 주기적으로 다시 계산
+#
+# 다른 사용자의 프로필 수정이나 신규 가입은 TTL 안에서 늦게 반영된다.
+# (사용자 정보 자체는 내려줄 때마다 User 에서 새로 읽으므로 항상 최신)
+# =====================================================
+
+# 추천 방식 → 계산 함수 (session, user, limit) → 추천 사용자 목록
+Recommender = Callable[[Session, User, int], List[User]]
+_RECOMMENDERS: Dict[str, Recommender] = {}
+
+
+def recommender(kind: str):
+    """추천 방식 등록 (routers/friends.py, services.py 에서 사용)"""
+    def decorator(func_: Recommender) -> Recommender:
+        _RECOMMENDERS[kind] = func_
+        return func_
+    return decorator
+
+
+def _as_kst(dt: datetime) -> datetime:
+    # SQLite 등에서 tz 정보 없이 돌아온 값은 KST 로 저장된 것으로 간주
+    return dt.replace(tzinfo=KST) if dt.tzinfo is None else dt
+
+
+class RecommendationStore:
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ----- 조회 -----
+    def _is_fresh(self, row: Optional[FriendRecommendation]) -> bool:
+        if row is None or row.is_stale:
+            return False
+        age = get_kst_now() - _as_kst(row.computed_at)
+        return age < timedelta(seconds=settings.RECOMMENDATION_TTL_SECONDS)
+
+    def get(self, session: Session, user: User, kind: str) -> List[User]:
+        """저장된 추천 목록 (없거나 오래됐으면 계산 후 저장)"""
+        row = session.get(FriendRecommendation, (user.id, kind))
+        if self._is_fresh(row):
+            ids = list(row.candidate_ids or [])
+            if not ids:
+                return []
+            # 저장 이후 탈퇴한 사용자는 자연히 빠짐
+            users = {u.id: u for u in session.exec(select(User).where(User.id.in_(ids))).all()}
+            return [users[user_id] for user_id in ids if user_id in users]
+
+        users = _RECOMMENDERS[kind](session, user, settings.RECOMMENDATION_SIZE)
+        self.put(session, user.id, kind, [u.id for u in users])
+        session.commit()
+        return users
+
+    # ----- 저장 -----
+    def put(self, session: Session, user_id: int, kind: str, candidate_ids: List[int]) -> None:
+        row = {
+            "user_id": user_id,
+            "kind": kind,
+            "candidate_ids": candidate_ids,
+            "is_stale": False,
+            "computed_at": get_kst_now(),
+        }
+        dialect = session.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            if dialect == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+            # 백그라운드 갱신과 동시에 저장해도 충돌하지 않도록 upsert
+            stmt = dialect_insert(FriendRecommendation).values(row)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["user_id", "kind"],
+                set_={
+                    "candidate_ids": stmt.excluded.candidate_ids,
+                    "is_stale": stmt.excluded.is_stale,
+                    "computed_at": stmt.excluded.computed_at,
+                },
+            )
+            session.exec(stmt)
+        else:
+            session.merge(FriendRecommendation(**row))
+
+    # ----- 무효화 -----
+    def invalidate(self, session: Session, *user_ids: int) -> None:
+        """해당 사용자들의 저장 목록을 stale 로 표시 (호출한 쪽에서 commit)"""
+        if not user_ids:
+            return
+        session.exec(
+            update(FriendRecommendation)
+            .where(FriendRecommendation.user_id.in_(user_ids))
+            .values(is_stale=True)
+        )
+
+    def delete_user(self, session: Session, user_id: int) -> None:
+        """탈퇴 시 저장 목록 삭제 (호출한 쪽에서 commit)"""
+        session.exec(delete(FriendRecommendation).where(FriendRecommendation.user_id == user_id))
+
+    # ----- 백그라운드 갱신 -----
+    def refresh_due(self, limit: Optional[int] = None) -> int:
+        """stale 이거나 TTL 이 지난 목록을 다시 계산 (오래된 것부터)"""
+        limit = limit or settings.RECOMMENDATION_REFRESH_BATCH
+        cutoff = get_kst_now() - timedelta(seconds=settings.RECOMMENDATION_TTL_SECONDS)
+
+        with Session(engine) as session:
+            due = session.exec(
+                select(FriendRecommendation.user_id, FriendRecommendation.kind)
+                .where(or_(FriendRecommendation.is_stale == True, FriendRecommendation.computed_at < cutoff))
+                .order_by(FriendRecommendation.computed_at)
+                .limit(limit)
+            ).all()
+
+        refreshed = 0
+        for user_id, kind in due:
+            compute = _RECOMMENDERS.get(kind)
+            try:
+                with Session(engine) as session:
+                    user = session.get(User, user_id)
+                    if user is None or compute is None:
+                        self.delete_user(session, user_id)
+                    else:
+                        users = compute(session, user, settings.RECOMMENDATION_SIZE)
+                        self.put(session, user_id, kind, [u.id for u in users])
+                        refreshed += 1
+                    session.commit()
+            except Exception as e:
+                print(f"[recommendation_store] refresh failed for user {user_id} ({kind}): {e}")
+        return refreshed
+
+    def _run(self) -> None:
+        while not self._stop.wait(settings.RECOMMENDATION_REFRESH_INTERVAL_SECONDS):
+            try:
+                self.refresh_due()
+            except Exception as e:
+                print(f"[recommendation_store] refresh loop error: {e}")
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="recommendation-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+recommendation_store = RecommendationStore()
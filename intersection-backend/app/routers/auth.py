@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Request, Depends, HTTPException, status
 from fastapi.responses import RedirectResponse, HTMLResponse
 from typing import Optional
-from ..auth import create_access_token, get_password_hash, verify_password
+from ..auth import create_access_token, password_hasher
 from ..models import User
-from ..db import engine, create_db_and_tables
+from ..db import create_db_and_tables
+from ..dependencies import invalidate_cached_user, db_session
 from sqlmodel import Session, select
 from sqlalchemy import or_
 from sqlalchemy.exc import IntegrityError
@@ -59,7 +60,13 @@ async def kakao_login(client_redirect: str | None = None):
 
 
 @router.get("/kakao/callback")
-async def kakao_callback(request: Request, code: Optional[str] = None, mock: Optional[int] = None, state: Optional[str] = None):
+async def kakao_callback(
+    request: Request,
+    code: Optional[str] = None,
+    mock: Optional[int] = None,
+    state: Optional[str] = None,
+    session: Session = db_session,
+):
     # If configured, exchange code for Kakao token and fetch profile
     profile = None
 
@@ -103,66 +110,67 @@ async def kakao_callback(request: Request, code: Optional[str] = None, mock: Opt
 
     # Upsert user in DB and give JWT access token
     try:
-        with Session(engine) as session:
-            # Try find by email if exists
-            email = None
-            nickname = None
-            kakao_id = str(profile.get('id'))
-            
-            if profile.get("kakao_account"):
-                email = profile["kakao_account"].get("email")
-                if profile["kakao_account"].get("profile"):
-                    nickname = profile["kakao_account"]["profile"].get("nickname")
-            
-            # If no nickname from profile, use a default
-            if not nickname:
-                nickname = f"카카오사용자{kakao_id[-4:]}"
-
-            existing = None
-            # Use kakao:ID as login_id (email is optional and may not be available)
-            login_id_val = f"kakao:{kakao_id}"
-            
-            # Try to find existing user by login_id first, then by email if available
-            statement = select(User).where(User.login_id == login_id_val)
+        # Try find by email if exists
+        email = None
+        nickname = None
+        kakao_id = str(profile.get('id'))
+        
+        if profile.get("kakao_account"):
+            email = profile["kakao_account"].get("email")
+            if profile["kakao_account"].get("profile"):
+                nickname = profile["kakao_account"]["profile"].get("nickname")
+        
+        # If no nickname from profile, use a default
+        if not nickname:
+            nickname = f"카카오사용자{kakao_id[-4:]}"
+
+        existing = None
+        # Use kakao:ID as login_id (email is optional and may not be available)
+        login_id_val = f"kakao:{kakao_id}"
+        
+        # Try to find existing user by login_id first, then by email if available
+        statement = select(User).where(User.login_id == login_id_val)
+        existing = session.exec(statement).first()
+        
+        # If not found by login_id and email is available, try to find by email
+        if not existing and email:
+            statement = select(User).where(User.email == email)
             existing = session.exec(statement).first()
-            
-            # If not found by login_id and email is available, try to find by email
-            if not existing and email:
-                statement = select(User).where(User.email == email)
-                existing = session.exec(statement).first()
-                # If found by email, update login_id to kakao format
-                if existing:
-                    existing.login_id = login_id_val
-                    session.add(existing)
-                    session.commit()
-                    session.refresh(existing)
-
-            if existing is None:
-                # create a new user record
-                user = User(login_id=login_id_val, email=email, name=nickname, nickname=nickname)
-                user.password_hash = get_password_hash("kakao-oauth")
-                try:
-                    session.add(user)
-                    session.commit()
-                    session.refresh(user)
-                    existing = user
-                except IntegrityError as exc:
-                    # This can happen if another process created the same login_id concurrently.
-                    session.rollback()
-                    print(f"[auth.kakao.callback] IntegrityError while inserting user: {exc}")
-                    # Try to load the existing user now
-                    fallback = session.exec(select(User).where(User.login_id == login_id_val)).first()
-                    if fallback is not None:
-                        existing = fallback
-                    else:
-                        # Unexpected — re-raise for higher-level handling
-                        raise
-
-            # create access token
-            token = create_access_token({"user_id": existing.id})
+            # If found by email, update login_id to kakao format
+            if existing:
+                existing.login_id = login_id_val
+                session.add(existing)
+                session.commit()
+                session.refresh(existing)
+                invalidate_cached_user(existing.id)
+
+        if existing is None:
+            # create a new user record
+            user = User(login_id=login_id_val, email=email, name=nickname, nickname=nickname)
+            user.password_hash = await password_hasher.hash_async("kakao-oauth")
+            try:
+                session.add(user)
+                session.commit()
+                session.refresh(user)
+                existing = user
+            except IntegrityError as exc:
+                # This can happen if another process created the same login_id concurrently.
+                session.rollback()
+                print(f"[auth.kakao.callback] IntegrityError while inserting user: {exc}")
+                # Try to load the existing user now
+                fallback = session.exec(select(User).where(User.login_id == login_id_val)).first()
+                if fallback is not None:
+                    existing = fallback
+                else:
+                    # Unexpected — re-raise for higher-level handling
+                    raise
+
+        # create access token
+        token = create_access_token({"user_id": existing.id})
     except Exception as exc:
         # Unexpected DB error — log and return a readable message for debugging (dev only)
         print(f"[auth.kakao.callback] DB error: {exc}")
+        session.rollback()
         return HTMLResponse(f"Server error while storing user: {exc}", status_code=500)
 
     # For a mobile client, if a state was provided containing the client redirect scheme, redirect to it
@@ -203,24 +211,22 @@ async def kakao_callback(request: Request, code: Optional[str] = None, mock: Opt
 
 
 @router.get("/kakao/dev_token")
-async def kakao_dev_token():
+async def kakao_dev_token(session: Session = db_session):
     """Development-only helper: return an access token for a local test user.
     Intended for local development/testing only.
     """
     # upsert a test user and return JWT
     profile = {"id": "kakao-local-dev", "kakao_account": {"email": "kakao_dev@example.com", "profile": {"nickname": "DevUser"}}}
 
-    from sqlmodel import Session, select
-    with Session(engine) as session:
-        statement = select(User).where(User.email == profile["kakao_account"]["email"])
-        existing = session.exec(statement).first()
-        if existing is None:
-            user = User(login_id=profile["kakao_account"]["email"], email=profile["kakao_account"]["email"], name="DevUser", nickname="DevUser")
-            user.password_hash = get_password_hash("dev-token")
-            session.add(user)
-            session.commit()
-            session.refresh(user)
-            existing = user
-
-        token = create_access_token({"user_id": existing.id})
-        return {"access_token": token}
+    statement = select(User).where(User.email == profile["kakao_account"]["email"])
+    existing = session.exec(statement).first()
+    if existing is None:
+        user = User(login_id=profile["kakao_account"]["email"], email=profile["kakao_account"]["email"], name="DevUser", nickname="DevUser")
+        user.password_hash = await password_hasher.hash_async("dev-token")
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        existing = user
+
+    token = create_access_token({"user_id": existing.id})
+    return {"access_token": token}
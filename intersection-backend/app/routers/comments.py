@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from typing import List, Optional, Tuple
+from datetime import datetime
+import base64
 from sqlmodel import Session, select, func
-from sqlalchemy import or_
-from ..db import engine
+from sqlalchemy import or_, exists, false, tuple_, case, delete, update
 from ..models import Comment, Post, User, CommentReport, Notification, CommentLike
 from ..schemas import (
     CommentCreate, 
@@ -11,237 +12,291 @@ from ..schemas import (
     CommentReportCreate, 
     CommentReportRead
 )
-from ..dependencies import get_current_user
+from ..dependencies import get_current_user, db_session
+from ..likes import toggle_like, set_like, unset_like, count_likes
+from ..ranking import hot_ranker, WEIGHT_COMMENT
+from ..etag import bump_version
 
 router = APIRouter(tags=["comments"])
 
+def adjust_comment_count(session: Session, post_id: int, delta: int) -> None:
+    """
+    Post.comment_count 를 DB 에서 바로 증감 (읽고-쓰기 없이 UPDATE 1번, 0 아래로는 X)
+    호출측 트랜잭션에서 댓글 INSERT/DELETE 와 함께 commit
+    """
+    new_count = Post.comment_count + delta
+    session.exec(
+        update(Post)
+        .where(Post.id == post_id)
+        .values(comment_count=case((new_count < 0, 0), else_=new_count))
+    )
+
+
 @router.post("/posts/{post_id}/comments", response_model=CommentRead)
-def create_comment(post_id: int, payload: CommentCreate, current_user: User = Depends(get_current_user)):
+def create_comment(post_id: int, payload: CommentCreate, current_user: User = Depends(get_current_user), session: Session = db_session):
     """
     댓글 생성 API
+    - 댓글, 게시글 댓글 수, 알림을 한 트랜잭션으로 저장
     """
-    with Session(engine) as session:
-        statement = select(Post).where(Post.id == post_id)
-        post = session.exec(statement).first()
-        if not post:
-            raise HTTPException(status_code=404, detail="Post not found")
+    statement = select(Post).where(Post.id == post_id)
+    post = session.exec(statement).first()
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
             
-        comment = Comment(post_id=post_id, user_id=current_user.id, content=payload.content)
-        session.add(comment)
-        session.commit()
-        session.refresh(comment)
+    comment = Comment(post_id=post_id, user_id=current_user.id, content=payload.content)
+    session.add(comment)
+    adjust_comment_count(session, post_id, 1)
         
-        # 🔔 알림 생성
-        if post.author_id != current_user.id:
-            sender_name = current_user.name or current_user.nickname or "알 수 없음"
-            notif = Notification(
-                receiver_id=post.author_id,
-                sender_id=current_user.id,
-                type="comment",
-                message=f"{sender_name}님이 회원님의 게시글에 댓글을 남겼습니다.",
-                related_post_id=post.id
-            )
-            session.add(notif)
-            session.commit()
+    # 🔔 알림 생성
+    if post.author_id != current_user.id:
+        sender_name = current_user.name or current_user.nickname or "알 수 없음"
+        notif = Notification(
+            receiver_id=post.author_id,
+            sender_id=current_user.id,
+            type="comment",
+            message=f"{sender_name}님이 회원님의 게시글에 댓글을 남겼습니다.",
+            related_post_id=post.id
+        )
+        session.add(notif)
+
+    session.commit()
+    session.refresh(comment)
+
+    # 🔥 인기 점수 반영
+    hot_ranker.record(session, post, WEIGHT_COMMENT, comment.created_at)
         
-        display_name = current_user.name or current_user.nickname or current_user.login_id
+    display_name = current_user.name or current_user.nickname or current_user.login_id
         
-        return CommentRead(
-            id=comment.id, 
-            post_id=comment.post_id, 
-            user_id=comment.user_id, 
-            content=comment.content, 
-            author_name=display_name, 
-            author_profile_image=current_user.profile_image, 
-            created_at=comment.created_at.isoformat(),
-            like_count=0,
-            is_liked=False
-        )
+    return CommentRead(
+        id=comment.id, 
+        post_id=comment.post_id, 
+        user_id=comment.user_id, 
+        content=comment.content, 
+        author_name=display_name, 
+        author_profile_image=current_user.profile_image, 
+        created_at=comment.created_at.isoformat(),
+        like_count=0,
+        is_liked=False
+    )
+
+# 댓글 목록 페이지 크기 (기본 / 최대)
+COMMENT_PAGE_SIZE = 50
+COMMENT_PAGE_MAX = 200
+
+
+def _encode_cursor(created_at: datetime, comment_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{comment_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, comment_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(comment_id)
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="잘못된 cursor 입니다.")
+
 
 @router.get("/posts/{post_id}/comments", response_model=List[CommentRead])
 def list_comments(
     post_id: int,
-    current_user: Optional[User] = Depends(get_current_user)
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(COMMENT_PAGE_SIZE, ge=1, le=COMMENT_PAGE_MAX),
+    current_user: Optional[User] = Depends(get_current_user),
+    session: Session = db_session
 ):
     """
-    댓글 목록 조회 API
+    댓글 목록 조회 API (작성순, 페이지 단위)
+    - 다음 페이지가 있으면 응답 헤더 X-Next-Cursor 값을 ?cursor= 로 넘겨서 이어서 조회
+    - (created_at, id) 기준 keyset 페이지네이션 → 뒤쪽 페이지도 OFFSET 없이 인덱스로 바로 찾음
+    - 좋아요 수 / 내 좋아요 여부까지 쿼리 1번으로 조회
     """
-    with Session(engine) as session:
-        statement = (
-            select(Comment, User)
-            .join(User, Comment.user_id == User.id)
-            .where(Comment.post_id == post_id)
-            .order_by(Comment.created_at.asc())
+    like_count = (
+        select(func.count(CommentLike.id))
+        .where(CommentLike.comment_id == Comment.id)
+        .correlate(Comment)
+        .scalar_subquery()
+    )
+    if current_user:
+        is_liked = exists().where(
+            CommentLike.comment_id == Comment.id,
+            CommentLike.user_id == current_user.id,
         )
-        results = session.exec(statement).all()
-        
-        comments_list = []
-        for comment, user in results:
-            display_name = user.name or user.nickname or user.login_id or "익명"
-            
-            # ❤️ 좋아요 수
-            like_count = session.exec(
-                select(func.count(CommentLike.id)).where(CommentLike.comment_id == comment.id)
-            ).one()
-            
-            # ❤️ 좋아요 여부
-            is_liked = False
-            if current_user:
-                liked_check = session.exec(
-                    select(CommentLike).where(
-                        CommentLike.comment_id == comment.id, 
-                        CommentLike.user_id == current_user.id
-                    )
-                ).first()
-                if liked_check:
-                    is_liked = True
-
-            comments_list.append(CommentRead(
-                id=comment.id, 
-                post_id=comment.post_id, 
-                user_id=comment.user_id, 
-                content=comment.content, 
-                author_name=display_name, 
-                author_profile_image=user.profile_image, 
-                created_at=comment.created_at.isoformat(),
-                like_count=like_count, 
-                is_liked=is_liked      
-            ))
-
-        return comments_list
+    else:
+        is_liked = false()
+
+    statement = (
+        select(Comment, User, like_count, is_liked)
+        .join(User, Comment.user_id == User.id)
+        .where(Comment.post_id == post_id)
+    )
+    if cursor:
+        after_created_at, after_id = _decode_cursor(cursor)
+        statement = statement.where(
+            tuple_(Comment.created_at, Comment.id) > tuple_(after_created_at, after_id)
+        )
+    # 다음 페이지 존재 여부 확인용으로 1개 더 조회
+    statement = statement.order_by(Comment.created_at.asc(), Comment.id.asc()).limit(limit + 1)
+
+    results = session.exec(statement).all()
+
+    if len(results) > limit:
+        results = results[:limit]
+        last_comment = results[-1][0]
+        response.headers["X-Next-Cursor"] = _encode_cursor(last_comment.created_at, last_comment.id)
+
+    comments_list = []
+    for comment, user, likes, liked in results:
+        display_name = user.name or user.nickname or user.login_id or "익명"
+
+        comments_list.append(CommentRead(
+            id=comment.id, 
+            post_id=comment.post_id, 
+            user_id=comment.user_id, 
+            content=comment.content, 
+            author_name=display_name, 
+            author_profile_image=user.profile_image, 
+            created_at=comment.created_at.isoformat(),
+            like_count=likes, 
+            is_liked=bool(liked)
+        ))
+
+    return comments_list
 
 @router.put("/posts/{post_id}/comments/{comment_id}", response_model=CommentRead)
 def update_comment(
     post_id: int, 
     comment_id: int, 
     comment_data: CommentUpdate, 
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    session: Session = db_session
 ):
-    with Session(engine) as session:
-        comment = session.get(Comment, comment_id)
-        if not comment:
-            raise HTTPException(status_code=404, detail="Comment not found")
+    comment = session.get(Comment, comment_id)
+    if not comment:
+        raise HTTPException(status_code=404, detail="Comment not found")
         
-        if comment.user_id != current_user.id:
-            raise HTTPException(status_code=403, detail="Not authorized to edit this comment")
+    if comment.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to edit this comment")
             
-        comment.content = comment_data.content
-        session.add(comment)
-        session.commit()
-        session.refresh(comment)
+    comment.content = comment_data.content
+    session.add(comment)
+    session.commit()
+    session.refresh(comment)
         
-        display_name = current_user.name or current_user.nickname or current_user.login_id
+    display_name = current_user.name or current_user.nickname or current_user.login_id
 
-        like_count = session.exec(
-            select(func.count(CommentLike.id)).where(CommentLike.comment_id == comment.id)
-        ).one()
+    like_count = session.exec(
+        select(func.count(CommentLike.id)).where(CommentLike.comment_id == comment.id)
+    ).one()
         
-        is_liked = session.exec(
-            select(CommentLike).where(
-                CommentLike.comment_id == comment.id, 
-                CommentLike.user_id == current_user.id
-            )
-        ).first() is not None
-
-        return CommentRead(
-            id=comment.id,
-            post_id=comment.post_id,
-            user_id=comment.user_id,
-            content=comment.content,
-            author_name=display_name,
-            author_profile_image=current_user.profile_image,
-            created_at=comment.created_at.isoformat(),
-            like_count=like_count,
-            is_liked=is_liked
+    is_liked = session.exec(
+        select(CommentLike).where(
+            CommentLike.comment_id == comment.id, 
+            CommentLike.user_id == current_user.id
         )
+    ).first() is not None
+
+    return CommentRead(
+        id=comment.id,
+        post_id=comment.post_id,
+        user_id=comment.user_id,
+        content=comment.content,
+        author_name=display_name,
+        author_profile_image=current_user.profile_image,
+        created_at=comment.created_at.isoformat(),
+        like_count=like_count,
+        is_liked=is_liked
+    )
 
 # 🔥 [수정된 부분] 댓글 삭제 로직 강화
 @router.delete("/posts/{post_id}/comments/{comment_id}")
 def delete_comment(
     post_id: int, 
     comment_id: int, 
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    session: Session = db_session
 ):
     """
     댓글 삭제 API
     - 본인 댓글만 삭제 가능
     - 연관된 좋아요(CommentLike) 및 신고(CommentReport) 데이터를 먼저 삭제하여 FK 에러 방지
+    - 일괄 DELETE + 게시글 댓글 수 감소를 한 트랜잭션으로 처리
     """
-    with Session(engine) as session:
-        comment = session.get(Comment, comment_id)
-        if not comment:
-            raise HTTPException(status_code=404, detail="Comment not found")
+    comment = session.get(Comment, comment_id)
+    if not comment:
+        raise HTTPException(status_code=404, detail="Comment not found")
             
-        if comment.user_id != current_user.id:
-            raise HTTPException(status_code=403, detail="Not authorized to delete this comment")
-            
-        # 1. 댓글 좋아요 삭제 (전체 삭제)
-        likes = session.exec(select(CommentLike).where(CommentLike.comment_id == comment_id)).all()
-        for like in likes:
-            session.delete(like)
-
-        # 2. 댓글 신고 삭제 (전체 삭제 - 이 부분이 없어서 에러가 날 수도 있음)
-        reports = session.exec(select(CommentReport).where(CommentReport.reported_comment_id == comment_id)).all()
-        for report in reports:
-            session.delete(report)
-
-        # 3. 댓글 삭제
-        session.delete(comment)
-        
-        session.commit()
+    if comment.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to delete this comment")
+
+    comment_post_id = comment.post_id
+    comment_created_at = comment.created_at
+
+    # 1. 댓글 좋아요 / 신고 일괄 삭제 (행마다 SELECT → DELETE 하지 않음)
+    session.exec(delete(CommentLike).where(CommentLike.comment_id == comment_id))
+    session.exec(delete(CommentReport).where(CommentReport.reported_comment_id == comment_id))
+
+    # 2. 댓글 삭제 + 게시글 댓글 수 감소 (동시 삭제 요청이면 한 번만 감소)
+    deleted = session.exec(delete(Comment).where(Comment.id == comment_id)).rowcount
+    if deleted:
+        adjust_comment_count(session, comment_post_id, -1)
+        bump_version(session, "feed")
+
+    session.commit()
+
+    if not deleted:
         return {"ok": True}
 
+    # 🔥 인기 점수 반영
+    post = session.get(Post, comment_post_id)
+    if post:
+        hot_ranker.retract(session, post, WEIGHT_COMMENT, comment_created_at)
+
+    return {"ok": True}
+
 # ------------------------------------------------------
 # ❤️ 댓글 좋아요 기능
+# - toggle(POST) / 설정(PUT) / 해제(DELETE), commit 1회
 # ------------------------------------------------------
 @router.post("/comments/{comment_id}/like")
 def toggle_comment_like(
     comment_id: int,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    session: Session = db_session
 ):
-    with Session(engine) as session:
-        comment = session.get(Comment, comment_id)
-        if not comment:
-            raise HTTPException(status_code=404, detail="Comment not found")
-
-        existing_like = session.exec(
-            select(CommentLike).where(
-                CommentLike.user_id == current_user.id,
-                CommentLike.comment_id == comment_id
-            )
-        ).first()
-
-        if existing_like:
-            session.delete(existing_like)
-            is_liked = False
-        else:
-            new_like = CommentLike(user_id=current_user.id, comment_id=comment_id)
-            session.add(new_like)
-            is_liked = True
-        
-        session.commit()
-        
-        like_count = session.exec(
-            select(func.count(CommentLike.id)).where(CommentLike.comment_id == comment_id)
-        ).one()
+    comment = session.get(Comment, comment_id)
+    if not comment:
+        raise HTTPException(status_code=404, detail="Comment not found")
+
+    is_liked, _, _ = toggle_like(session, CommentLike, "comment_id", current_user.id, comment_id)
+    session.commit()
+
+    like_count = count_likes(session, CommentLike, "comment_id", comment_id)
+    return {"is_liked": is_liked, "like_count": like_count}
+
+@router.put("/comments/{comment_id}/like")
+def like_comment(comment_id: int, current_user: User = Depends(get_current_user), session: Session = db_session):
+    """댓글 좋아요 설정 (여러 번 호출해도 결과 동일)"""
+    comment = session.get(Comment, comment_id)
+    if not comment:
+        raise HTTPException(status_code=404, detail="Comment not found")
 
-        return {"is_liked": is_liked, "like_count": like_count}
+    set_like(session, CommentLike, "comment_id", current_user.id, comment_id)
+    session.commit()
+
+    like_count = count_likes(session, CommentLike, "comment_id", comment_id)
+    return {"ok": True, "is_liked": True, "like_count": like_count}
 
 @router.delete("/comments/{comment_id}/like")
-def unlike_comment(comment_id: int, current_user: User = Depends(get_current_user)):
-    with Session(engine) as session:
-        existing_like = session.exec(
-            select(CommentLike).where(
-                CommentLike.comment_id == comment_id, 
-                CommentLike.user_id == current_user.id
-            )
-        ).first()
-
-        if existing_like:
-            session.delete(existing_like)
-            session.commit()
-        
-        return {"ok": True}
+def unlike_comment(comment_id: int, current_user: User = Depends(get_current_user), session: Session = db_session):
+    """댓글 좋아요 해제 (여러 번 호출해도 결과 동일)"""
+    unset_like(session, CommentLike, "comment_id", current_user.id, comment_id)
+    session.commit()
+
+    like_count = count_likes(session, CommentLike, "comment_id", comment_id)
+    return {"ok": True, "is_liked": False, "like_count": like_count}
 
 # ------------------------------------------------------
 # 🚨 댓글 신고 기능
@@ -251,31 +306,31 @@ def report_comment(
     post_id: int,
     comment_id: int,
     report_data: CommentReportCreate,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    session: Session = db_session
 ):
-    with Session(engine) as session:
-        comment = session.get(Comment, comment_id)
-        if not comment:
-            raise HTTPException(status_code=404, detail="Comment not found")
-
-        if comment.user_id == current_user.id:
-             raise HTTPException(status_code=400, detail="Cannot report your own comment")
-
-        new_report = CommentReport(
-            reporter_id=current_user.id,
-            reported_comment_id=comment_id,
-            reason=report_data.reason,
-            status="pending"
-        )
-        session.add(new_report)
-        session.commit()
-        session.refresh(new_report)
+    comment = session.get(Comment, comment_id)
+    if not comment:
+        raise HTTPException(status_code=404, detail="Comment not found")
+
+    if comment.user_id == current_user.id:
+         raise HTTPException(status_code=400, detail="Cannot report your own comment")
+
+    new_report = CommentReport(
+        reporter_id=current_user.id,
+        reported_comment_id=comment_id,
+        reason=report_data.reason,
+        status="pending"
+    )
+    session.add(new_report)
+    session.commit()
+    session.refresh(new_report)
         
-        return CommentReportRead(
-            id=new_report.id,
-            reporter_id=new_report.reporter_id,
-            reported_comment_id=new_report.reported_comment_id,
-            reason=new_report.reason,
-            status=new_report.status,
-            created_at=new_report.created_at.isoformat()
-        )
\ No newline at end of file
+    return CommentReportRead(
+        id=new_report.id,
+        reporter_id=new_report.reporter_id,
+        reported_comment_id=new_report.reported_comment_id,
+        reason=new_report.reason,
+        status=new_report.status,
+        created_at=new_report.created_at.isoformat()
+    )
\ No newline at end of file
@@ -1,20 +1,21 @@
 from typing import List, Tuple, Optional
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
-from fastapi.security import OAuth2PasswordBearer
-import shutil
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+from tempfile import SpooledTemporaryFile
 import os
+import re
 import uuid
-from pathlib import Path
 import httpx
 from time import time
 from collections import OrderedDict
 
 # ✅ JWT 인증 임포트
-from ..auth import decode_access_token
+from ..dependencies import get_current_user_id
 from ..config import settings
+from ..schemas import UploadPresignRequest
+from ..storage import get_storage, LocalStorage, verify_upload_signature, CHUNK_SIZE
 
 router = APIRouter(tags=["common"])
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
 
 # ✅ 학교 검색 결과 캐시 (메모리 기반, 최대 100개, 1시간 TTL)
 _school_search_cache: OrderedDict[str, Tuple[List[str], float]] = OrderedDict()
@@ -57,11 +58,6 @@ def _set_cached_result(keyword: str, results: List[str]):
         _school_search_cache.popitem(last=False)  # 가장 오래된 항목 제거
     _school_search_cache[keyword_lower] = (results, time())
 
-UPLOAD_DIR = "uploads"
-
-# ✅ uploads 폴더 자동 생성
-Path(UPLOAD_DIR).mkdir(exist_ok=True)
-
 # ✅ 파일 크기 제한 (10MB)
 MAX_FILE_SIZE = 10 * 1024 * 1024
 
@@ -72,16 +68,46 @@ ALLOWED_EXTENSIONS = {
     "zip", "rar", "7z"  # 압축
 }
 
+# ✅ 업로드 key 형식 (uuid4.확장자) - 직접 업로드 경로 검증용
+_UPLOAD_KEY_PATTERN = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\.[a-z0-9]+$")
 
-def get_current_user_id(token: str = Depends(oauth2_scheme)) -> int:
-    """토큰에서 사용자 ID 추출"""
-    payload = decode_access_token(token)
-    if payload is None:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    user_id = payload.get("user_id")
-    if not user_id:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    return user_id
+
+def validate_upload_file(filename: Optional[str], file_size: Optional[int]) -> str:
+    """확장자/크기 검증 후 확장자 반환"""
+    file_ext = os.path.splitext(filename or "")[1].lower().replace(".", "")
+    if file_ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"허용되지 않은 파일 형식입니다. 허용: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
+
+    if file_size is not None and file_size > MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"파일 크기가 너무 큽니다. 최대 {MAX_FILE_SIZE / 1024 / 1024}MB"
+        )
+    return file_ext
+
+
+def resolve_uploaded_file_url(file_url: str) -> str:
+    """
+    클라이언트가 보낸 파일 URL 검증 (/upload, /upload/presign 등으로 올린 파일만 허용)
+    - 현재 저장소의 공개 URL 아래에 있는 업로드 key 이고, 실제로 저장돼 있어야 함
+    - 크기 제한을 넘는 파일은 삭제 후 거부 (Azure SAS 직접 업로드는 저장소에서 크기를 막을 수 없음)
+    - 저장소를 조회하므로 threadpool 에서 호출
+    """
+    storage = get_storage()
+    key = storage.key_from_url(file_url.strip())
+    file_size = storage.size(key) if key and _UPLOAD_KEY_PATTERN.match(key) else None
+    if file_size is None:
+        raise HTTPException(status_code=400, detail="업로드된 파일의 URL이 아닙니다.")
+    if file_size > MAX_FILE_SIZE:
+        storage.delete(key)
+        raise HTTPException(
+            status_code=400,
+            detail=f"파일 크기가 너무 큽니다. 최대 {MAX_FILE_SIZE / 1024 / 1024}MB"
+        )
+    return storage.url_for(key)
 
 
 @router.post("/upload")
@@ -91,45 +117,90 @@ async def upload_file(
 ):
     """
     이미지/파일을 업로드하면, 접속 가능한 URL을 반환해주는 API
+    (가능하면 /upload/presign 으로 저장소에 직접 업로드하는 것을 권장)
     """
     
-    # ✅ 파일 확장자 확인
-    file_ext = os.path.splitext(file.filename)[1].lower().replace(".", "")
-    if file_ext not in ALLOWED_EXTENSIONS:
-        raise HTTPException(
-            status_code=400,
-            detail=f"허용되지 않은 파일 형식입니다. 허용: {', '.join(ALLOWED_EXTENSIONS)}"
-        )
-    
     # ✅ 파일 크기 확인
     file.file.seek(0, 2)
     file_size = file.file.tell()
     file.file.seek(0)
-    
-    if file_size > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail=f"파일 크기가 너무 큽니다. 최대 {MAX_FILE_SIZE / 1024 / 1024}MB"
-        )
+
+    # ✅ 파일 확장자/크기 확인
+    file_ext = validate_upload_file(file.filename, file_size)
     
     # 1. 랜덤 ID 생성
     filename = f"{uuid.uuid4()}.{file_ext}"
-    file_location = os.path.join(UPLOAD_DIR, filename)
     
-    # 2. 파일 저장
-    with open(file_location, "wb") as file_object:
-        shutil.copyfileobj(file.file, file_object)
+    # 2. 파일 저장 (저장소로 스트리밍, 이벤트 루프 블로킹 방지)
+    file_url = await run_in_threadpool(
+        get_storage().save, filename, file.file, file.content_type
+    )
     
     # 3. 반환
     return {
         "success": True,
-        "file_url": f"/static/{filename}",
+        "file_url": file_url,
         "filename": file.filename,
         "size": file_size,
         "type": file.content_type
     }
 
 
+@router.post("/upload/presign")
+def create_presigned_upload(
+    data: UploadPresignRequest,
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """
+    저장소 직접 업로드용 pre-signed URL 발급
+    - 클라이언트는 upload_url 로 method/headers 그대로 파일 바이트를 전송 (선언한 size 만큼)
+    - 업로드 후 file_url 을 게시글/채팅 메시지에 그대로 사용
+    """
+    if data.size <= 0:
+        raise HTTPException(status_code=400, detail="파일 크기(size)를 입력해주세요.")
+    file_ext = validate_upload_file(data.filename, data.size)
+    key = f"{uuid.uuid4()}.{file_ext}"
+
+    upload = get_storage().create_upload_url(key, data.size, data.content_type)
+    upload.update({
+        "filename": data.filename,
+        "size": data.size,
+        "type": data.content_type,
+    })
+    return upload
+
+
+@router.put("/upload/direct/{key}")
+async def upload_direct(key: str, size: int, expires: int, signature: str, request: Request):
+    """
+    로컬 저장소용 직접 업로드 엔드포인트 (/upload/presign 에서 발급한 서명 URL)
+    - 서명이 곧 권한이므로 별도 JWT 불필요
+    - 요청 본문을 청크 단위로 받아 서명된 크기(size)를 넘으면 즉시 중단
+    """
+    if not _UPLOAD_KEY_PATTERN.match(key) or not verify_upload_signature(key, size, expires, signature):
+        raise HTTPException(status_code=403, detail="유효하지 않거나 만료된 업로드 URL입니다.")
+
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        raise HTTPException(status_code=400, detail="현재 저장소는 직접 업로드 URL을 사용합니다.")
+
+    received = 0
+    with SpooledTemporaryFile(max_size=CHUNK_SIZE) as spool:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > size or received > MAX_FILE_SIZE:
+                raise HTTPException(status_code=413, detail="선언한 파일 크기를 초과했습니다.")
+            spool.write(chunk)
+        if received != size:
+            raise HTTPException(status_code=400, detail="선언한 파일 크기와 다릅니다.")
+        spool.seek(0)
+
+        content_type = request.headers.get("content-type")
+        file_url = await run_in_threadpool(storage.save, key, spool, content_type)
+
+    return {"success": True, "file_url": file_url, "size": size}
+
+
 # 🏫 학교 이름 자동완성 검색 API (NEIS OpenAPI 사용 + 캐싱)
 @router.get("/common/search/schools", response_model=List[str])
 async def search_schools(keyword: str):
@@ -1,17 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
 from sqlmodel import Session, select, func, desc, or_
+from sqlalchemy import exists, delete
 # 🔥 [수정] List가 추가되었습니다.
 from typing import List, Optional 
-import shutil
+from starlette.concurrency import run_in_threadpool
 import uuid
-import os
 
-from ..db import engine
 from ..models import (
     User, Post, PostLike, Comment, CommentLike, 
-    PostReport, CommentReport, Notification, UserBlock, UserReport
+    PostReport, CommentReport, Notification, UserBlock, UserReport, PostHotScore, get_kst_now
 )
-from ..dependencies import get_current_user
+from ..dependencies import get_current_user, get_batch_ids, db_session
+from ..storage import get_storage
+from .common import resolve_uploaded_file_url
+from ..likes import toggle_like, set_like, unset_like, count_likes
+from ..ranking import hot_ranker, WEIGHT_LIKE
+from ..etag import bump_version
 from ..schemas import PostRead, PostCreate, PostReportRead, PostReportCreate
 
 router = APIRouter(tags=["posts"])
@@ -23,175 +27,172 @@ router = APIRouter(tags=["posts"])
 async def create_post(
     content: str = Form(...),                    # 텍스트 내용 (Form)
     file: Optional[UploadFile] = File(None),     # 이미지 파일 (File)
-    current_user: User = Depends(get_current_user)
+    image_url: Optional[str] = Form(None),       # /upload/presign 으로 직접 업로드한 이미지 URL
+    current_user: User = Depends(get_current_user),
+    session: Session = db_session
 ):
-    image_url = None
-
-    # 1. 이미지 파일이 있으면 서버(uploads 폴더)에 저장
+    # 1. 이미지 파일이 있으면 업로드 저장소(local/azure)에 저장
     if file:
-        # 폴더 없으면 생성
-        UPLOAD_DIR = "uploads"
-        if not os.path.exists(UPLOAD_DIR):
-            os.makedirs(UPLOAD_DIR)
-
         # 파일명 중복 방지를 위한 UUID 사용
         ext = file.filename.split(".")[-1] if "." in file.filename else "jpg"
         filename = f"{uuid.uuid4()}.{ext}"
-        file_path = os.path.join(UPLOAD_DIR, filename)
 
-        # 파일 쓰기
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # DB에 저장될 접근 URL (/static/...)
-        # main.py에서 app.mount("/static", StaticFiles(directory="uploads")) 설정 필수
-        image_url = f"/static/{filename}"
-
-    # 2. 게시글 정보 DB 저장
-    with Session(engine) as session:
-        post = Post(
-            author_id=current_user.id, 
-            content=content, 
-            image_url=image_url
-        )
-        session.add(post)
-        session.commit()
-        session.refresh(post)
-
-        return PostRead(
-            id=post.id, 
-            author_id=post.author_id, 
-            content=post.content, 
-            image_url=post.image_url,
-            created_at=post.created_at.isoformat(),
-            author_name=current_user.name,
-            author_nickname=current_user.nickname,
-            author_profile_image=current_user.profile_image,
-            author_school=current_user.school_name,
-            author_region=current_user.region,
-            like_count=0,
-            comment_count=0,
-            is_liked=False
+        # 저장소로 스트리밍 저장 후 접근 URL 반환
+        # (local: /static/..., azure: Blob URL)
+        image_url = await run_in_threadpool(
+            get_storage().save, filename, file.file, file.content_type
         )
+    elif image_url:
+        # 직접 업로드한 URL 은 이 저장소에 실제로 올라간 파일만 허용 (외부 URL 저장 방지)
+        image_url = await run_in_threadpool(resolve_uploaded_file_url, image_url)
+
+    # 2. 게시글 정보 DB 저장 (요청 Session 으로 스레드 풀에서)
+    post = await run_in_threadpool(_insert_post, session, current_user, content, image_url)
+
+    return PostRead(
+        id=post.id, 
+        author_id=post.author_id, 
+        content=post.content, 
+        image_url=post.image_url,
+        created_at=post.created_at.isoformat(),
+        author_name=current_user.name,
+        author_nickname=current_user.nickname,
+        author_profile_image=current_user.profile_image,
+        author_school=current_user.school_name,
+        author_region=current_user.region,
+        like_count=0,
+        comment_count=0,
+        is_liked=False
+    )
+
+
+def _insert_post(session: Session, author: User, content: str, image_url: Optional[str]) -> Post:
+    post = Post(
+        author_id=author.id, 
+        content=content, 
+        image_url=image_url
+    )
+    session.add(post)
+    session.commit()
+    session.refresh(post)
+
+    # 🔥 인기 피드에 등록
+    hot_ranker.add_post(post.id, author.community_id)
+    return post
 
 # -------------------------------------------------------
 # 📋 게시글 목록 조회 (검색 + 필터링 + 차단)
 # -------------------------------------------------------
+# 인기순 조회 시 랭커에서 한 번에 꺼내 볼 게시글 수
+HOT_FETCH_BATCH = 100
+# 랭커에서 확인할 최대 배치 수 (넘으면 DB 정렬로 전환)
+HOT_MAX_BATCHES = 10
+
+
+def _rank_hot_posts(session, statement, filter_type, current_user, skip, limit):
+    """
+    인기순 페이지 조회
+    - 랭커(메모리)의 점수 순 ID 를 배치로 꺼내서 검색/차단 필터가 걸린 statement 로 확인
+    - 필요한 개수(skip + limit)가 채워질 때까지만 조회
+    - 드문 검색어 / 깊은 페이지라 HOT_MAX_BATCHES 안에 못 채우면 PostHotScore 정렬 쿼리로 조회
+    """
+    community_id = None
+    if filter_type == "school" and current_user:
+        community_id = current_user.community_id
+        if not community_id:
+            return []  # 커뮤니티 없는 경우 빈 결과
+
+    needed = skip + limit
+    ranked = []
+    position = 0
+    for _ in range(HOT_MAX_BATCHES):
+        if len(ranked) >= needed:
+            return ranked[skip:needed]
+        batch_ids = hot_ranker.top(community_id, position, HOT_FETCH_BATCH)
+        if not batch_ids:
+            return ranked[skip:needed]
+        position += len(batch_ids)
+
+        rows = session.exec(statement.where(Post.id.in_(batch_ids))).all()
+        by_id = {post.id: (post, user) for post, user in rows}
+        ranked.extend(by_id[post_id] for post_id in batch_ids if post_id in by_id)
+
+    if len(ranked) >= needed:
+        return ranked[skip:needed]
+
+    # 저장된 점수 순 (아직 저장 전인 새 글은 뒤로, 동점은 랭커와 같이 ID 오름차순)
+    statement = (
+        statement.outerjoin(PostHotScore, PostHotScore.post_id == Post.id)
+        .order_by(PostHotScore.score.is_(None), PostHotScore.score.desc(), Post.id)
+        .offset(skip)
+        .limit(limit)
+    )
+    return session.exec(statement).all()
+
+
 @router.get("/posts/", response_model=List[PostRead])
 def list_posts(
     skip: int = 0,    
     limit: int = 10,  
     keyword: Optional[str] = None,
     filter_type: str = "all",  # "all"(전체), "school"(내 커뮤니티만)
-    current_user: Optional[User] = Depends(get_current_user)
+    sort: str = "latest",      # "latest"(최신순), "hot"(인기순)
+    current_user: Optional[User] = Depends(get_current_user),
+    session: Session = db_session
 ):
-    with Session(engine) as session:
-        statement = select(Post, User).join(User, Post.author_id == User.id)
-
-        # 🔍 1. 검색 기능 (키워드가 있을 때만 작동)
-        if keyword:
-            statement = statement.where(
-                or_(
-                    Post.content.contains(keyword),      # 내용 검색
-                    User.name.contains(keyword),         # 작성자 이름 검색
-                    User.nickname.contains(keyword)      # 닉네임 검색
-                )
+    statement = select(Post, User).join(User, Post.author_id == User.id)
+
+    # 🔍 1. 검색 기능 (키워드가 있을 때만 작동)
+    if keyword:
+        statement = statement.where(
+            or_(
+                Post.content.contains(keyword),      # 내용 검색
+                User.name.contains(keyword),         # 작성자 이름 검색
+                User.nickname.contains(keyword)      # 닉네임 검색
             )
+        )
 
-        # 🏫 2. 게시판 분리 (필터링)
-        if filter_type == "school" and current_user:
-            if current_user.community_id:
-                statement = statement.where(User.community_id == current_user.community_id)
-            else:
-                statement = statement.where(User.id == -1) # 커뮤니티 없는 경우 빈 결과
+    # 🏫 2. 게시판 분리 (필터링)
+    if filter_type == "school" and current_user:
+        if current_user.community_id:
+            statement = statement.where(User.community_id == current_user.community_id)
+        else:
+            statement = statement.where(User.id == -1) # 커뮤니티 없는 경우 빈 결과
 
-        # 🚫 3. 차단 및 신고 필터링
-        if current_user:
-            # 차단 관계 (내가 차단함 OR 나를 차단함)
-            blocking_stmt = select(UserBlock.blocked_user_id).where(UserBlock.user_id == current_user.id)
-            blocking_ids = session.exec(blocking_stmt).all()
+    # 🚫 3. 차단 및 신고 필터링
+    if current_user:
+        # 차단 관계 (내가 차단함 OR 나를 차단함)
+        blocking_stmt = select(UserBlock.blocked_user_id).where(UserBlock.user_id == current_user.id)
+        blocking_ids = session.exec(blocking_stmt).all()
             
-            blocked_by_stmt = select(UserBlock.user_id).where(UserBlock.blocked_user_id == current_user.id)
-            blocked_by_ids = session.exec(blocked_by_stmt).all()
+        blocked_by_stmt = select(UserBlock.user_id).where(UserBlock.blocked_user_id == current_user.id)
+        blocked_by_ids = session.exec(blocked_by_stmt).all()
             
-            # 신고 관계 (내가 신고한 사람 - pending 상태)
-            reported_stmt = select(UserReport.reported_user_id).where(
-                UserReport.reporter_id == current_user.id,
-                UserReport.status == "pending"
-            )
-            reported_ids = session.exec(reported_stmt).all()
+        # 신고 관계 (내가 신고한 사람 - pending 상태)
+        reported_stmt = select(UserReport.reported_user_id).where(
+            UserReport.reporter_id == current_user.id,
+            UserReport.status == "pending"
+        )
+        reported_ids = session.exec(reported_stmt).all()
             
-            excluded_ids = list(set(blocking_ids + blocked_by_ids + reported_ids))
+        excluded_ids = list(set(blocking_ids + blocked_by_ids + reported_ids))
             
-            if excluded_ids:
-                statement = statement.where(Post.author_id.notin_(excluded_ids))
+        if excluded_ids:
+            statement = statement.where(Post.author_id.notin_(excluded_ids))
 
-        # 정렬 및 페이징
+    # 정렬 및 페이징
+    if sort == "hot":
+        results = _rank_hot_posts(session, statement, filter_type, current_user, skip, limit)
+    else:
         statement = statement.order_by(Post.created_at.desc()).offset(skip).limit(limit)
         results = session.exec(statement).all()
         
-        post_reads = []
-        for post, user in results:
-            # ❤️ 좋아요 수 계산
-            like_count = session.exec(select(func.count(PostLike.id)).where(PostLike.post_id == post.id)).one()
-            
-            # 💬 댓글 수 계산
-            comment_count = session.exec(select(func.count(Comment.id)).where(Comment.post_id == post.id)).one()
-
-            # ❤️ 내가 좋아요 눌렀는지 확인
-            is_liked = False
-            if current_user:
-                liked_check = session.exec(
-                    select(PostLike).where(PostLike.post_id == post.id, PostLike.user_id == current_user.id)
-                ).first()
-                if liked_check:
-                    is_liked = True
-
-            post_reads.append(PostRead(
-                id=post.id,
-                author_id=post.author_id,
-                content=post.content,
-                image_url=post.image_url,
-                created_at=post.created_at.isoformat(),
-                author_name=user.name,
-                author_nickname=user.nickname,
-                author_profile_image=user.profile_image,
-                author_school=user.school_name,
-                author_region=user.region,
-                like_count=like_count,
-                comment_count=comment_count,
-                is_liked=is_liked
-            ))
-        return post_reads
-
-# -------------------------------------------------------
-# 📄 게시글 상세 조회
-# -------------------------------------------------------
-@router.get("/posts/{post_id}", response_model=PostRead)
-def get_post(post_id: int, current_user: Optional[User] = Depends(get_current_user)):
-    with Session(engine) as session:
-        statement = select(Post, User).where(Post.id == post_id).join(User, Post.author_id == User.id)
-        result = session.exec(statement).first()
-        
-        if not result:
-            raise HTTPException(status_code=404, detail="Post not found")
-            
-        post, user = result
-        
-        # 차단 체크
-        if current_user:
-            block_check = session.exec(
-                select(UserBlock).where(
-                    (UserBlock.user_id == current_user.id) & (UserBlock.blocked_user_id == user.id) |
-                    (UserBlock.user_id == user.id) & (UserBlock.blocked_user_id == current_user.id)
-                )
-            ).first()
-            if block_check:
-                raise HTTPException(status_code=403, detail="Blocked user's post")
-
+    post_reads = []
+    for post, user in results:
+        # ❤️ 좋아요 수 계산
         like_count = session.exec(select(func.count(PostLike.id)).where(PostLike.post_id == post.id)).one()
-        comment_count = session.exec(select(func.count(Comment.id)).where(Comment.post_id == post.id)).one()
-        
+            
+        # ❤️ 내가 좋아요 눌렀는지 확인
         is_liked = False
         if current_user:
             liked_check = session.exec(
@@ -199,8 +200,8 @@ def get_post(post_id: int, current_user: Optional[User] = Depends(get_current_us
             ).first()
             if liked_check:
                 is_liked = True
-        
-        return PostRead(
+
+        post_reads.append(PostRead(
             id=post.id,
             author_id=post.author_id,
             content=post.content,
@@ -212,147 +213,276 @@ def get_post(post_id: int, current_user: Optional[User] = Depends(get_current_us
             author_school=user.school_name,
             author_region=user.region,
             like_count=like_count,
-            comment_count=comment_count,
+            comment_count=post.comment_count,
             is_liked=is_liked
+        ))
+    return post_reads
+
+# -------------------------------------------------------
+# 📦 게시글 여러 개 한 번에 조회 (알림/채팅 링크 미리보기용)
+# - /posts/{post_id} 보다 먼저 선언해야 "batch" 가 post_id 로 잡히지 않음
+# -------------------------------------------------------
+@router.get("/posts/batch", response_model=List[PostRead])
+def get_posts_batch(
+    ids: List[int] = Depends(get_batch_ids),
+    current_user: User = Depends(get_current_user),
+    session: Session = db_session
+):
+    """
+    ?ids=1,2,3 → 요청 순서대로 PostRead 목록
+    - 없는 게시글 / 차단 관계(양방향) 작성자의 게시글은 결과에서 빠짐 (에러 X)
+    - 좋아요 수, 내 좋아요 여부까지 쿼리 1번으로 조회 (댓글 수는 Post.comment_count)
+    """
+    like_count = (
+        select(func.count(PostLike.id))
+        .where(PostLike.post_id == Post.id)
+        .correlate(Post)
+        .scalar_subquery()
+    )
+    is_liked = exists().where(
+        PostLike.post_id == Post.id,
+        PostLike.user_id == current_user.id,
+    )
+
+    statement = (
+        select(Post, User, like_count, is_liked)
+        .join(User, Post.author_id == User.id)
+        .where(
+            Post.id.in_(ids),
+            Post.author_id.notin_(
+                select(UserBlock.blocked_user_id).where(UserBlock.user_id == current_user.id)
+            ),
+            Post.author_id.notin_(
+                select(UserBlock.user_id).where(UserBlock.blocked_user_id == current_user.id)
+            ),
         )
+    )
+
+    rows = {row[0].id: row for row in session.exec(statement).all()}
+
+    post_reads = []
+    for post_id in ids:
+        if post_id not in rows:
+            continue
+        post, user, likes, liked = rows[post_id]
+        post_reads.append(PostRead(
+            id=post.id,
+            author_id=post.author_id,
+            content=post.content,
+            image_url=post.image_url,
+            created_at=post.created_at.isoformat(),
+            author_name=user.name,
+            author_nickname=user.nickname,
+            author_profile_image=user.profile_image,
+            author_school=user.school_name,
+            author_region=user.region,
+            like_count=likes,
+            comment_count=post.comment_count,
+            is_liked=bool(liked)
+        ))
+    return post_reads
 
 # -------------------------------------------------------
-# ✏️ 게시글 수정
+# 📄 게시글 상세 조회
 # -------------------------------------------------------
-@router.put("/posts/{post_id}", response_model=PostRead)
-def update_post(post_id: int, payload: PostCreate, current_user: User = Depends(get_current_user)):
-    with Session(engine) as session:
-        post = session.get(Post, post_id)
+@router.get("/posts/{post_id}", response_model=PostRead)
+def get_post(post_id: int, current_user: Optional[User] = Depends(get_current_user), session: Session = db_session):
+    statement = select(Post, User).where(Post.id == post_id).join(User, Post.author_id == User.id)
+    result = session.exec(statement).first()
         
-        if not post:
-            raise HTTPException(status_code=404, detail="Post not found")
-        if post.author_id != current_user.id:
-            raise HTTPException(status_code=403, detail="Not post author")
+    if not result:
+        raise HTTPException(status_code=404, detail="Post not found")
             
-        post.content = payload.content
-        post.image_url = payload.image_url
-        
-        session.add(post)
-        session.commit()
-        session.refresh(post)
+    post, user = result
         
-        like_count = session.exec(select(func.count(PostLike.id)).where(PostLike.post_id == post.id)).one()
-        comment_count = session.exec(select(func.count(Comment.id)).where(Comment.post_id == post.id)).one()
+    # 차단 체크
+    if current_user:
+        block_check = session.exec(
+            select(UserBlock).where(
+                (UserBlock.user_id == current_user.id) & (UserBlock.blocked_user_id == user.id) |
+                (UserBlock.user_id == user.id) & (UserBlock.blocked_user_id == current_user.id)
+            )
+        ).first()
+        if block_check:
+            raise HTTPException(status_code=403, detail="Blocked user's post")
+
+    like_count = session.exec(select(func.count(PostLike.id)).where(PostLike.post_id == post.id)).one()
         
+    is_liked = False
+    if current_user:
         liked_check = session.exec(
             select(PostLike).where(PostLike.post_id == post.id, PostLike.user_id == current_user.id)
         ).first()
-        is_liked = bool(liked_check)
+        if liked_check:
+            is_liked = True
+        
+    return PostRead(
+        id=post.id,
+        author_id=post.author_id,
+        content=post.content,
+        image_url=post.image_url,
+        created_at=post.created_at.isoformat(),
+        author_name=user.name,
+        author_nickname=user.nickname,
+        author_profile_image=user.profile_image,
+        author_school=user.school_name,
+        author_region=user.region,
+        like_count=like_count,
+        comment_count=post.comment_count,
+        is_liked=is_liked
+    )
 
-        return PostRead(
-            id=post.id, 
-            author_id=post.author_id, 
-            content=post.content, 
-            image_url=post.image_url, 
-            created_at=post.created_at.isoformat(),
-            author_name=current_user.name,
-            author_nickname=current_user.nickname,
-            author_profile_image=current_user.profile_image,
-            author_school=current_user.school_name,
-            author_region=current_user.region,
-            like_count=like_count,
-            comment_count=comment_count,
-            is_liked=is_liked
-        )
+# -------------------------------------------------------
+# ✏️ 게시글 수정
+# -------------------------------------------------------
+@router.put("/posts/{post_id}", response_model=PostRead)
+def update_post(post_id: int, payload: PostCreate, current_user: User = Depends(get_current_user), session: Session = db_session):
+    post = session.get(Post, post_id)
+        
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+    if post.author_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not post author")
+            
+    post.content = payload.content
+    post.image_url = payload.image_url
+    post.updated_at = get_kst_now()
+        
+    session.add(post)
+    session.commit()
+    session.refresh(post)
+        
+    like_count = session.exec(select(func.count(PostLike.id)).where(PostLike.post_id == post.id)).one()
+        
+    liked_check = session.exec(
+        select(PostLike).where(PostLike.post_id == post.id, PostLike.user_id == current_user.id)
+    ).first()
+    is_liked = bool(liked_check)
+
+    return PostRead(
+        id=post.id, 
+        author_id=post.author_id, 
+        content=post.content, 
+        image_url=post.image_url, 
+        created_at=post.created_at.isoformat(),
+        author_name=current_user.name,
+        author_nickname=current_user.nickname,
+        author_profile_image=current_user.profile_image,
+        author_school=current_user.school_name,
+        author_region=current_user.region,
+        like_count=like_count,
+        comment_count=post.comment_count,
+        is_liked=is_liked
+    )
 
 # -------------------------------------------------------
 # 🗑️ 게시글 삭제
 # -------------------------------------------------------
 @router.delete("/posts/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_post(post_id: int, current_user: User = Depends(get_current_user)):
-    with Session(engine) as session:
-        post = session.get(Post, post_id)
+def delete_post(post_id: int, current_user: User = Depends(get_current_user), session: Session = db_session):
+    post = session.get(Post, post_id)
         
-        if not post:
-            raise HTTPException(status_code=404, detail="Post not found")
-        if post.author_id != current_user.id:
-            raise HTTPException(status_code=403, detail="Not post author")
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+    if post.author_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not post author")
             
-        # 1. 댓글 및 댓글의 하위 데이터 삭제
-        comments = session.exec(select(Comment).where(Comment.post_id == post_id)).all()
-        for comment in comments:
-            # 댓글 좋아요
-            c_likes = session.exec(select(CommentLike).where(CommentLike.comment_id == comment.id)).all()
-            for cl in c_likes: session.delete(cl)
-            # 댓글 신고
-            c_reports = session.exec(select(CommentReport).where(CommentReport.reported_comment_id == comment.id)).all()
-            for cr in c_reports: session.delete(cr)
-            # 댓글 자체
-            session.delete(comment)
-
-        # 2. 게시글 좋아요 삭제
-        p_likes = session.exec(select(PostLike).where(PostLike.post_id == post_id)).all()
-        for pl in p_likes: session.delete(pl)
-
-        # 3. 게시글 신고 삭제
-        p_reports = session.exec(select(PostReport).where(PostReport.reported_post_id == post_id)).all()
-        for pr in p_reports: session.delete(pr)
-
-        # 4. 관련 알림 삭제
-        notifs = session.exec(select(Notification).where(Notification.related_post_id == post_id)).all()
-        for n in notifs: session.delete(n)
+    # 1. 댓글 및 댓글의 하위 데이터 일괄 삭제
+    comment_ids = select(Comment.id).where(Comment.post_id == post_id)
+    session.exec(delete(CommentLike).where(CommentLike.comment_id.in_(comment_ids)))
+    session.exec(delete(CommentReport).where(CommentReport.reported_comment_id.in_(comment_ids)))
+    session.exec(delete(Comment).where(Comment.post_id == post_id))
+
+    # 2. 게시글 좋아요 삭제
+    session.exec(delete(PostLike).where(PostLike.post_id == post_id))
+
+    # 3. 게시글 신고 삭제
+    session.exec(delete(PostReport).where(PostReport.reported_post_id == post_id))
+
+    # 4. 관련 알림 삭제
+    session.exec(delete(Notification).where(Notification.related_post_id == post_id))
             
-        # 5. 게시글 최종 삭제
-        session.delete(post)
-        session.commit()
-        return None
+    # 5. 게시글 최종 삭제
+    session.delete(post)
+    bump_version(session, "feed")
+    session.commit()
+
+    hot_ranker.remove_post(post_id)
+    return None
 
 # -------------------------------------------------------
 # ❤️ 게시글 좋아요
+# - toggle(POST) / 설정(PUT) / 해제(DELETE)
+# - (user_id, post_id) 유니크 제약 + ON CONFLICT 로 중복 없이 처리, commit 1회
 # -------------------------------------------------------
-@router.post("/posts/{post_id}/like")
-def like_post(post_id: int, current_user: User = Depends(get_current_user)):
-    with Session(engine) as session:
-        post = session.get(Post, post_id)
-        if not post:
-            raise HTTPException(status_code=404, detail="Post not found")
-
-        existing_like = session.exec(
-            select(PostLike).where(PostLike.post_id == post_id, PostLike.user_id == current_user.id)
+def _apply_post_like(session: Session, post_id: int, current_user: User, action: str) -> dict:
+    post = session.get(Post, post_id)
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    if action == "toggle":
+        liked, liked_at, removed_at = toggle_like(session, PostLike, "post_id", current_user.id, post_id)
+    elif action == "set":
+        liked_at = set_like(session, PostLike, "post_id", current_user.id, post_id)
+        liked, removed_at = True, None
+    else:
+        removed_at = unset_like(session, PostLike, "post_id", current_user.id, post_id)
+        liked, liked_at = False, None
+
+    # 🔔 알림 생성 (새로 좋아요를 누른 경우에만)
+    if liked_at is not None and post.author_id != current_user.id:
+        existing_notif = session.exec(
+            select(Notification.id).where(
+                Notification.receiver_id == post.author_id,
+                Notification.sender_id == current_user.id,
+                Notification.type == "like",
+                Notification.related_post_id == post.id
+            )
         ).first()
 
-        liked = False
-        if existing_like:
-            session.delete(existing_like)
-            session.commit()
-            liked = False
-        else:
-            new_like = PostLike(user_id=current_user.id, post_id=post_id)
-            session.add(new_like)
-            session.commit()
-            liked = True
-            
-            # 🔔 알림 생성
-            if post.author_id != current_user.id:
-                existing_notif = session.exec(
-                    select(Notification).where(
-                        Notification.receiver_id == post.author_id,
-                        Notification.sender_id == current_user.id,
-                        Notification.type == "like",
-                        Notification.related_post_id == post.id
-                    )
-                ).first()
-                
-                if not existing_notif:
-                    sender_name = current_user.nickname or current_user.name or "알 수 없음"
-                    notif = Notification(
-                        receiver_id=post.author_id,
-                        sender_id=current_user.id,
-                        type="like",
-                        message=f"{sender_name}님이 회원님의 게시글을 좋아합니다.",
-                        related_post_id=post.id
-                    )
-                    session.add(notif)
-                    session.commit()
-            
-        like_count = session.exec(select(func.count(PostLike.id)).where(PostLike.post_id == post.id)).one()
-        
-        return {"ok": True, "is_liked": liked, "like_count": like_count}
+        if not existing_notif:
+            sender_name = current_user.nickname or current_user.name or "알 수 없음"
+            session.add(Notification(
+                receiver_id=post.author_id,
+                sender_id=current_user.id,
+                type="like",
+                message=f"{sender_name}님이 회원님의 게시글을 좋아합니다.",
+                related_post_id=post.id
+            ))
+
+    # 좋아요 취소는 피드 ETag 의 최대 id 로 잡히지 않으므로 카운터로 표시
+    if removed_at is not None:
+        bump_version(session, "feed")
+
+    session.commit()
+
+    # 🔥 인기 점수 반영
+    if liked_at is not None:
+        hot_ranker.record(session, post, WEIGHT_LIKE, liked_at)
+    elif removed_at is not None:
+        # 좋아요를 누른 시점의 가중치만큼 빼기 (지금 시각으로 빼면 오래된 좋아요가 과하게 차감됨)
+        hot_ranker.retract(session, post, WEIGHT_LIKE, removed_at)
+
+    like_count = count_likes(session, PostLike, "post_id", post_id)
+    return {"ok": True, "is_liked": liked, "like_count": like_count}
+
+
+@router.post("/posts/{post_id}/like")
+def like_post(post_id: int, current_user: User = Depends(get_current_user), session: Session = db_session):
+    """좋아요 토글"""
+    return _apply_post_like(session, post_id, current_user, "toggle")
+
+
+@router.put("/posts/{post_id}/like")
+def set_post_like(post_id: int, current_user: User = Depends(get_current_user), session: Session = db_session):
+    """좋아요 설정 (여러 번 호출해도 결과 동일)"""
+    return _apply_post_like(session, post_id, current_user, "set")
+
+
+@router.delete("/posts/{post_id}/like")
+def unset_post_like(post_id: int, current_user: User = Depends(get_current_user), session: Session = db_session):
+    """좋아요 해제 (여러 번 호출해도 결과 동일)"""
+    return _apply_post_like(session, post_id, current_user, "unset")
 
 # -------------------------------------------------------
 # 🚨 게시글 신고
@@ -361,29 +491,29 @@ def like_post(post_id: int, current_user: User = Depends(get_current_user)):
 def report_post(
     post_id: int, 
     report_data: PostReportCreate, 
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    session: Session = db_session
 ):
-    with Session(engine) as session:
-        post = session.get(Post, post_id)
-        if not post:
-            raise HTTPException(status_code=404, detail="Post not found")
+    post = session.get(Post, post_id)
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
             
-        if post.author_id == current_user.id:
-            raise HTTPException(status_code=400, detail="Cannot report your own post")
-
-        new_report = PostReport(
-            reporter_id=current_user.id,
-            reported_post_id=post_id,
-            reason=report_data.reason,
-            status="pending"
-        )
-        session.add(new_report)
-        session.commit()
-        session.refresh(new_report)
+    if post.author_id == current_user.id:
+        raise HTTPException(status_code=400, detail="Cannot report your own post")
+
+    new_report = PostReport(
+        reporter_id=current_user.id,
+        reported_post_id=post_id,
+        reason=report_data.reason,
+        status="pending"
+    )
+    session.add(new_report)
+    session.commit()
+    session.refresh(new_report)
         
-        return PostReportRead(
-            id=new_report.id,
-            reason=new_report.reason,
-            status=new_report.status,
-            created_at=new_report.created_at.isoformat()
-        )
\ No newline at end of file
+    return PostReportRead(
+        id=new_report.id,
+        reason=new_report.reason,
+        status=new_report.status,
+        created_at=new_report.created_at.isoformat()
+    )
\ No newline at end of file
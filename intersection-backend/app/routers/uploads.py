@@ -0,0 +1,310 @@
+from datetime import timedelta
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlmodel import Session, select
+from sqlalchemy import update, delete
+from starlette.concurrency import run_in_threadpool
+
+from ..config import settings
+from ..models import UploadSession, get_kst_now
+from ..schemas import UploadSessionCreate, UploadSessionRead
+from ..storage import get_storage
+from .common import get_current_user_id, validate_upload_file
+from ..dependencies import db_session
+
+router = APIRouter(prefix="/upload/sessions", tags=["common"])
+
+# 한 번에 정리할 만료 세션 수 (세션 생성 시 조금씩 정리)
+_PURGE_BATCH_SIZE = 100
+
+
+# ======================================================
+# 내부 헬퍼
+# ======================================================
+
+def _to_read(upload: UploadSession) -> UploadSessionRead:
+    return UploadSessionRead(
+        upload_id=upload.id,
+        offset=upload.received_bytes,
+        size=upload.file_size,
+        chunk_size=settings.UPLOAD_CHUNK_SIZE,
+        status=upload.status,
+        expires_at=upload.expires_at.isoformat(),
+        file_url=upload.file_url,
+    )
+
+
+def _get_owned_session(
+    session: Session, upload_id: str, user_id: int, for_update: bool = False
+) -> UploadSession:
+    """만료되지 않은 내 업로드 세션 조회 (for_update: commit 까지 행 잠금)"""
+    statement = select(UploadSession).where(
+        UploadSession.id == upload_id,
+        UploadSession.user_id == user_id,
+        UploadSession.expires_at > get_kst_now(),
+    )
+    if for_update:
+        statement = statement.with_for_update()
+    upload = session.exec(statement).first()
+    if not upload:
+        raise HTTPException(status_code=404, detail="업로드 세션을 찾을 수 없거나 만료되었습니다.")
+    return upload
+
+
+def _next_expiry():
+    return get_kst_now() + timedelta(hours=settings.UPLOAD_SESSION_EXPIRE_HOURS)
+
+
+def purge_expired_upload_sessions(session: Session, limit: int = _PURGE_BATCH_SIZE) -> int:
+    """
+    만료된 세션 정리
+    - 진행 중(uploading)이던 세션은 저장소의 임시 청크까지 삭제
+    - 완료된 세션은 행만 삭제 (최종 파일은 메시지에서 계속 사용)
+    """
+    expired = session.exec(
+        select(UploadSession)
+        .where(UploadSession.expires_at <= get_kst_now())
+        .limit(limit)
+    ).all()
+    if not expired:
+        return 0
+
+    storage = get_storage()
+    for upload in expired:
+        if upload.status != "completed":
+            storage.discard_chunks(upload.id, upload.key)
+
+    session.exec(
+        delete(UploadSession).where(UploadSession.id.in_([u.id for u in expired]))
+    )
+    session.commit()
+    return len(expired)
+
+
+def delete_user_upload_sessions(session: Session, user_id: int) -> int:
+    """
+    회원탈퇴 시 내 업로드 세션 정리 (UploadSession.user_id 는 user.id FK)
+    - 진행 중인 세션의 임시 청크도 삭제, 완료된 파일은 메시지에서 쓰던 것이라 그대로 둠
+    - commit 은 호출한 쪽에서
+    """
+    uploads = session.exec(select(UploadSession).where(UploadSession.user_id == user_id)).all()
+    if not uploads:
+        return 0
+
+    storage = get_storage()
+    for upload in uploads:
+        if upload.status != "completed":
+            storage.discard_chunks(upload.id, upload.key)
+
+    session.exec(delete(UploadSession).where(UploadSession.user_id == user_id))
+    return len(uploads)
+
+
+def get_completed_upload(session: Session, upload_id: str, user_id: int) -> UploadSession:
+    """send_chat_message 등에서 완료된 업로드를 file_url 로 사용하기 위한 조회"""
+    upload = _get_owned_session(session, upload_id, user_id)
+    if upload.status != "completed":
+        raise HTTPException(status_code=400, detail="아직 업로드가 완료되지 않았습니다.")
+    return upload
+
+
+def _chunk_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"청크 크기가 너무 큽니다. 최대 {settings.UPLOAD_CHUNK_SIZE} bytes",
+    )
+
+
+# ======================================================
+# 실제 API 엔드포인트들
+# ======================================================
+
+@router.post("", response_model=UploadSessionRead)
+def create_upload_session(
+    data: UploadSessionCreate,
+    current_user_id: int = Depends(get_current_user_id),
+    session: Session = db_session
+):
+    """
+    청크 업로드 세션 생성
+    - 이후 PUT /upload/sessions/{upload_id}?offset=N 으로 청크 전송
+    - 끊기면 GET 으로 offset 확인 후 이어서 전송
+    """
+    file_ext = validate_upload_file(data.filename, data.size)
+
+    # 방치된 세션 정리 (요청마다 조금씩)
+    purge_expired_upload_sessions(session)
+
+    upload = UploadSession(
+        id=uuid.uuid4().hex,
+        user_id=current_user_id,
+        key=f"{uuid.uuid4()}.{file_ext}",
+        file_name=data.filename,
+        file_size=data.size,
+        file_type=data.content_type,
+        expires_at=_next_expiry(),
+    )
+    session.add(upload)
+    session.commit()
+    session.refresh(upload)
+
+    return _to_read(upload)
+
+
+@router.get("/{upload_id}", response_model=UploadSessionRead)
+def get_upload_session(
+    upload_id: str,
+    current_user_id: int = Depends(get_current_user_id),
+    session: Session = db_session
+):
+    """업로드 진행 상태 조회 (재개 시 offset 확인용)"""
+    return _to_read(_get_owned_session(session, upload_id, current_user_id))
+
+
+def _apply_chunk(session: Session, upload_id: str, user_id: int, offset: int, data: bytes) -> UploadSessionRead:
+    upload = _get_owned_session(session, upload_id, user_id)
+
+    if upload.status != "uploading":
+        raise HTTPException(status_code=409, detail="이미 완료된 업로드입니다.")
+
+    # 클라이언트가 알고 있는 offset 과 서버 상태가 다르면 현재 offset 을 알려줌
+    if offset != upload.received_bytes:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "offset 이 일치하지 않습니다.", "offset": upload.received_bytes},
+        )
+
+    if upload.received_bytes + len(data) > upload.file_size:
+        raise HTTPException(status_code=400, detail="선언한 파일 크기를 초과했습니다.")
+
+    index = upload.chunk_count
+
+    # 1) 같은 offset 으로 동시에 들어온 요청은 하나만 통과 (조건부 UPDATE 로 offset 선점)
+    #    → 진 요청은 청크를 저장하지 않으므로 같은 블록을 덮어쓰지 않음
+    result = session.exec(
+        update(UploadSession)
+        .where(
+            UploadSession.id == upload.id,
+            UploadSession.received_bytes == offset,
+        )
+        .values(
+            received_bytes=offset + len(data),
+            chunk_count=index + 1,
+            expires_at=_next_expiry(),
+        )
+    )
+    if result.rowcount == 0:
+        session.rollback()
+        raise HTTPException(status_code=409, detail="다른 요청이 같은 청크를 처리 중입니다.")
+    session.commit()
+
+    # 2) 선점한 뒤에 저장, 실패하면 선점을 되돌려 같은 offset 으로 다시 보낼 수 있게 함
+    try:
+        get_storage().stage_chunk(upload.id, upload.key, index, data)
+    except Exception:
+        session.exec(
+            update(UploadSession)
+            .where(
+                UploadSession.id == upload.id,
+                UploadSession.received_bytes == offset + len(data),
+                UploadSession.chunk_count == index + 1,
+            )
+            .values(received_bytes=offset, chunk_count=index)
+        )
+        session.commit()
+        raise
+
+    session.refresh(upload)
+    return _to_read(upload)
+
+
+@router.put("/{upload_id}", response_model=UploadSessionRead)
+async def upload_chunk(
+    upload_id: str,
+    offset: int,
+    request: Request,
+    current_user_id: int = Depends(get_current_user_id),
+    session: Session = db_session
+):
+    """
+    청크 전송 (본문 = 파일 바이트 그대로)
+    - offset 은 서버가 지금까지 받은 바이트 수와 같아야 함
+    - 본문은 UPLOAD_CHUNK_SIZE 까지만 읽음 (Content-Length 로 먼저 거르고, 없거나 틀려도 읽으면서 확인)
+    """
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > settings.UPLOAD_CHUNK_SIZE:
+        raise _chunk_too_large()
+
+    data = bytearray()
+    async for part in request.stream():
+        data.extend(part)
+        if len(data) > settings.UPLOAD_CHUNK_SIZE:
+            raise _chunk_too_large()
+    if not data:
+        raise HTTPException(status_code=400, detail="빈 청크입니다.")
+
+    return await run_in_threadpool(_apply_chunk, session, upload_id, current_user_id, offset, bytes(data))
+
+
+def _complete(session: Session, upload_id: str, user_id: int) -> dict:
+    # 동시에 들어온 완료 요청은 행 잠금으로 순서대로 처리 → 나중 요청은 completed 상태를 보고 그대로 반환
+    upload = _get_owned_session(session, upload_id, user_id, for_update=True)
+
+    if upload.status != "completed":
+        if upload.received_bytes != upload.file_size:
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "아직 모든 청크를 받지 못했습니다.", "offset": upload.received_bytes},
+            )
+
+        storage = get_storage()
+        try:
+            file_url = storage.commit_chunks(upload.id, upload.key, upload.chunk_count, upload.file_type)
+        except FileNotFoundError:
+            if not storage.exists(upload.key):
+                # offset 을 선점한 뒤 청크를 저장하기 전에 서버가 죽은 경우 등 → 처음부터 다시 받도록 초기화
+                storage.discard_chunks(upload.id, upload.key)
+                session.exec(
+                    update(UploadSession)
+                    .where(
+                        UploadSession.id == upload.id,
+                        UploadSession.status == "uploading",
+                        UploadSession.received_bytes == upload.received_bytes,
+                    )
+                    .values(received_bytes=0, chunk_count=0, expires_at=_next_expiry())
+                )
+                session.commit()
+                raise HTTPException(
+                    status_code=409,
+                    detail={"message": "받은 청크 일부가 없어 처음부터 다시 업로드해야 합니다.", "offset": 0},
+                )
+            # 행 잠금이 없는 DB(SQLite)에서 다른 완료 요청이 먼저 조립을 끝낸 경우
+            file_url = storage.url_for(upload.key)
+
+        upload.file_url = file_url
+        upload.status = "completed"
+        upload.expires_at = _next_expiry()
+        session.add(upload)
+        session.commit()
+        session.refresh(upload)
+
+    # /upload 응답과 같은 형태 + upload_id
+    return {
+        "success": True,
+        "upload_id": upload.id,
+        "file_url": upload.file_url,
+        "filename": upload.file_name,
+        "size": upload.file_size,
+        "type": upload.file_type,
+    }
+
+
+@router.post("/{upload_id}/complete")
+async def complete_upload_session(
+    upload_id: str,
+    current_user_id: int = Depends(get_current_user_id),
+    session: Session = db_session
+):
+    """모든 청크 수신 후 최종 파일로 조립 (재호출해도 같은 결과)"""
+    return await run_in_threadpool(_complete, session, upload_id, current_user_id)
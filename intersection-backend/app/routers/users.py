@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import Optional, List
+import math
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from typing import Optional, List, Tuple
 from pydantic import BaseModel
-from sqlmodel import Session, select, desc
-from sqlalchemy import or_
+from sqlmodel import Session, select, desc, func
+from sqlalchemy import or_, update
+from starlette.concurrency import run_in_threadpool
 
 # 🔥 스키마 및 모델 임포트
 from ..schemas import UserCreate, UserRead, UserUpdate, Token, NotificationRead
@@ -11,13 +13,22 @@ from ..models import (
     UserBlock, UserReport, PostLike, CommentLike, PostReport,
     CommentReport, Notification
 )
-from ..db import engine
-from ..auth import get_password_hash, verify_password, create_access_token, decode_access_token
+from ..auth import password_hasher, create_access_token, decode_access_token
 from fastapi.security import OAuth2PasswordBearer
-from ..services import assign_community, get_recommended_friends
+from ..services import assign_community
+from ..ranking import hot_ranker
+from ..etag import bump_version
+from ..profile_index import profile_index
+from ..social_graph import social_graph
+from ..recommendation_store import recommendation_store
+from ..embeddings import embedding_index, schedule_embedding_refresh, delete_user_embedding
+from ..ai_precompute import delete_user_texts
+from ..rate_limit import check_login_attempt, client_ip_from
+from .comments import adjust_comment_count
+from .uploads import delete_user_upload_sessions
 
 # 🔥 [핵심 수정] 순환 참조 해결을 위해 dependencies에서 가져옴
-from ..dependencies import get_current_user
+from ..dependencies import get_current_user, get_batch_ids, invalidate_cached_user, db_session
 
 router = APIRouter(tags=["users"])
 
@@ -29,72 +40,211 @@ class LoginRequest(BaseModel):
     password: str
 
 
-@router.post("/token", response_model=Token, tags=["auth"])
-def login_for_token(login_data: LoginRequest):
-    with Session(engine) as session:
-        statement = select(User).where(
+def _find_login_user(session: Session, login: str) -> Optional[Tuple[int, Optional[str]]]:
+    """로그인 ID 또는 이메일로 (user_id, password_hash) 조회"""
+    row = session.exec(
+        select(User.id, User.password_hash).where(
             or_(
-                User.email == login_data.email,
-                User.login_id == login_data.email
+                User.email == login,
+                User.login_id == login
             )
         )
-        user = session.exec(statement).first()
+    ).first()
+    # 해시 검증을 기다리는 동안 커넥션을 잡고 있지 않도록 트랜잭션 종료
+    session.commit()
+    return tuple(row) if row else None
 
-        if not user or not verify_password(login_data.password, user.password_hash):
-            raise HTTPException(status_code=401, detail="Incorrect email or password")
 
-        token = create_access_token({"user_id": user.id})
-        return {"access_token": token, "token_type": "bearer"}
+def _save_rehashed_password(session: Session, user_id: int, old_hash: str, new_hash: str) -> None:
+    """해시 방식/비용이 바뀐 경우 새 해시 저장 (그 사이 비밀번호가 바뀌었으면 건드리지 않음)"""
+    session.exec(
+        update(User)
+        .where(User.id == user_id, User.password_hash == old_hash)
+        .values(password_hash=new_hash)
+    )
+    session.commit()
+    invalidate_cached_user(user_id)
 
 
-@router.post("/users/", response_model=UserRead)
-def create_user(data: UserCreate):
-    with Session(engine) as session:
-        statement = select(User).where(User.login_id == data.login_id)
-        exists = session.exec(statement).first()
-        if exists:
-            raise HTTPException(status_code=400, detail="login_id already exists")
-
-        # 여러 학교 정보를 JSON 형식으로 저장
-        schools_json = None
-        if data.schools:
-            # ✅ Pydantic 객체 → dict 로 변환해서 JSONB 컬럼에 저장
-            schools_json = [s.dict() for s in data.schools]
-        elif data.school_name:  # 하위 호환성: 기존 단일 학교 정보를 JSON으로 변환
-            schools_json = [{
-                "name": data.school_name,
-                "school_type": data.school_type,
-                "admission_year": data.admission_year
-            }]
-
-        user = User(
-            login_id=data.login_id,
-            name=data.name,
-            nickname=data.nickname,
-            birth_year=data.birth_year,
-            gender=data.gender,
-            region=data.region,
-            school_name=data.school_name,          # 하위 호환성
-            school_type=data.school_type,          # 하위 호환성
-            admission_year=data.admission_year,    # 하위 호환성
-            schools=schools_json,                  # 여러 학교 정보 (JSON)
-            email=data.login_id,
-            phone=data.phone,
-            profile_image=data.profile_image,
-            background_image=data.background_image
+@router.post("/token", response_model=Token, tags=["auth"])
+async def login_for_token(login_data: LoginRequest, request: Request, session: Session = db_session):
+    """
+    로그인 (async)
+    - DB 조회는 요청 Session 으로 스레드 풀에서, Argon2 는 전용 해시 풀에서 실행하고 결과만 기다림
+      → 해시 대기 중인 요청이 FastAPI 스레드 풀을 차지하지 않음
+    """
+    # 🚦 로그인 ID / IP 별 시도 제한 (DB 조회·비밀번호 검증 전에 거절)
+    client_ip = client_ip_from(
+        request.client.host if request.client else None,
+        request.headers.get("x-forwarded-for"),
+    )
+    retry_after = await run_in_threadpool(check_login_attempt, login_data.email, client_ip)
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=429,
+            detail="로그인 시도가 너무 많습니다. 잠시 후 다시 시도해주세요.",
+            headers={"Retry-After": str(math.ceil(retry_after))},
         )
-        user.password_hash = get_password_hash(data.password)
-        session.add(user)
-        session.commit()
-        session.refresh(user)
-
-        # 커뮤니티 자동 배정
-        assign_community(session, user)
-        session.add(user)
-        session.commit()
-        session.refresh(user)
-
-        return UserRead(
+
+    found = await run_in_threadpool(_find_login_user, session, login_data.email)
+    if not found:
+        raise HTTPException(status_code=401, detail="Incorrect email or password")
+    user_id, password_hash = found
+
+    # Argon2 는 전용 스레드 풀에서 (대기열이 가득 차면 503)
+    verified, new_hash = await password_hasher.verify_and_update_async(login_data.password, password_hash)
+    if not verified:
+        raise HTTPException(status_code=401, detail="Incorrect email or password")
+
+    # 해시 방식/비용이 바뀐 경우 새 설정으로 다시 저장
+    if new_hash:
+        await run_in_threadpool(_save_rehashed_password, session, user_id, password_hash, new_hash)
+
+    token = create_access_token({"user_id": user_id})
+    return {"access_token": token, "token_type": "bearer"}
+
+
+def _login_id_exists(session: Session, login_id: str) -> bool:
+    exists_ = session.exec(select(User.id).where(User.login_id == login_id)).first() is not None
+    # 해시를 기다리는 동안 커넥션을 잡고 있지 않도록 트랜잭션 종료
+    session.commit()
+    return exists_
+
+
+def _create_user(session: Session, data: UserCreate, password_hash: str) -> UserRead:
+    # 여러 학교 정보를 JSON 형식으로 저장
+    schools_json = None
+    if data.schools:
+        # ✅ Pydantic 객체 → dict 로 변환해서 JSONB 컬럼에 저장
+        schools_json = [s.dict() for s in data.schools]
+    elif data.school_name:  # 하위 호환성: 기존 단일 학교 정보를 JSON으로 변환
+        schools_json = [{
+            "name": data.school_name,
+            "school_type": data.school_type,
+            "admission_year": data.admission_year
+        }]
+
+    user = User(
+        login_id=data.login_id,
+        name=data.name,
+        nickname=data.nickname,
+        birth_year=data.birth_year,
+        gender=data.gender,
+        region=data.region,
+        school_name=data.school_name,          # 하위 호환성
+        school_type=data.school_type,          # 하위 호환성
+        admission_year=data.admission_year,    # 하위 호환성
+        schools=schools_json,                  # 여러 학교 정보 (JSON)
+        email=data.login_id,
+        phone=data.phone,
+        profile_image=data.profile_image,
+        background_image=data.background_image
+    )
+    user.password_hash = password_hash
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+
+    # 커뮤니티 자동 배정
+    assign_community(session, user)
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+
+    # 추천 친구 프로필 인덱스에 반영
+    profile_index.upsert(user)
+    schedule_embedding_refresh(user.id)
+
+    return UserRead(
+        id=user.id,
+        name=user.name,
+        nickname=user.nickname,
+        birth_year=user.birth_year,
+        gender=user.gender,
+        region=user.region,
+        school_name=user.school_name,          # 하위 호환성
+        school_type=user.school_type,          # 하위 호환성
+        admission_year=user.admission_year,    # 하위 호환성
+        # DB에는 list[dict] 로 들어있고, Pydantic 이 알아서 SchoolRead 리스트로 파싱해줌
+        schools=user.schools if isinstance(user.schools, list)
+        else (list(user.schools.values()) if user.schools else None),
+        phone=user.phone,
+        profile_image=user.profile_image,
+        background_image=user.background_image,
+        feed_images=[]
+    )
+
+
+@router.post("/users/", response_model=UserRead)
+async def create_user(data: UserCreate, session: Session = db_session):
+    """
+    회원가입 (async)
+    - 중복 확인 → 비밀번호 해시(전용 해시 풀) → 저장 순서, DB 작업은 요청 Session 으로 스레드 풀에서
+    """
+    if await run_in_threadpool(_login_id_exists, session, data.login_id):
+        raise HTTPException(status_code=400, detail="login_id already exists")
+
+    password_hash = await password_hasher.hash_async(data.password)
+    return await run_in_threadpool(_create_user, session, data, password_hash)
+
+
+@router.get("/users/me", response_model=UserRead)
+def get_my_info(current_user: User = Depends(get_current_user), session: Session = db_session):
+    # 내 게시글 이미지들 (피드용)
+    statement = (
+        select(Post)
+        .where(Post.author_id == current_user.id)
+        .where(Post.image_url != None)
+        .order_by(desc(Post.created_at))
+    )
+    my_posts = session.exec(statement).all()
+    feed_images_list = [post.image_url for post in my_posts if post.image_url]
+
+    return UserRead(
+        id=current_user.id,
+        name=current_user.name,
+        nickname=current_user.nickname,
+        birth_year=current_user.birth_year,
+        gender=current_user.gender,
+        region=current_user.region,
+        school_name=current_user.school_name,          # 하위 호환성
+        school_type=current_user.school_type,          # 하위 호환성
+        admission_year=current_user.admission_year,    # 하위 호환성
+        schools=current_user.schools if isinstance(current_user.schools, list)
+        else (list(current_user.schools.values()) if current_user.schools else None),
+        phone=current_user.phone,
+        profile_image=current_user.profile_image,
+        background_image=current_user.background_image,
+        feed_images=feed_images_list
+    )
+
+
+@router.get("/users/batch", response_model=List[UserRead])
+def get_users_batch(
+    ids: List[int] = Depends(get_batch_ids),
+    current_user: User = Depends(get_current_user),
+    session: Session = db_session
+):
+    """
+    여러 사용자 정보 한 번에 조회 (알림/채팅 목록 프로필 표시용)
+    - /users/{user_id} 보다 먼저 선언해야 "batch" 가 user_id 로 잡히지 않음
+    - 요청 순서대로 반환, 없는 사용자 / 차단 관계(양방향)는 결과에서 빠짐
+    - 쿼리 1번으로 처리하기 위해 feed_images 는 비워서 반환 (필요하면 /users/{user_id})
+    """
+    statement = select(User).where(
+        User.id.in_(ids),
+        User.id.notin_(
+            select(UserBlock.blocked_user_id).where(UserBlock.user_id == current_user.id)
+        ),
+        User.id.notin_(
+            select(UserBlock.user_id).where(UserBlock.blocked_user_id == current_user.id)
+        ),
+    )
+
+    users = {user.id: user for user in session.exec(statement).all()}
+
+    return [
+        UserRead(
             id=user.id,
             name=user.name,
             nickname=user.nickname,
@@ -104,7 +254,6 @@ def create_user(data: UserCreate):
             school_name=user.school_name,          # 하위 호환성
             school_type=user.school_type,          # 하위 호환성
             admission_year=user.admission_year,    # 하위 호환성
-            # DB에는 list[dict] 로 들어있고, Pydantic 이 알아서 SchoolRead 리스트로 파싱해줌
             schools=user.schools if isinstance(user.schools, list)
             else (list(user.schools.values()) if user.schools else None),
             phone=user.phone,
@@ -112,107 +261,77 @@ def create_user(data: UserCreate):
             background_image=user.background_image,
             feed_images=[]
         )
-
-
-@router.get("/users/me", response_model=UserRead)
-def get_my_info(current_user: User = Depends(get_current_user)):
-    with Session(engine) as session:
-        # 내 게시글 이미지들 (피드용)
-        statement = (
-            select(Post)
-            .where(Post.author_id == current_user.id)
-            .where(Post.image_url != None)
-            .order_by(desc(Post.created_at))
-        )
-        my_posts = session.exec(statement).all()
-        feed_images_list = [post.image_url for post in my_posts if post.image_url]
-
-        return UserRead(
-            id=current_user.id,
-            name=current_user.name,
-            nickname=current_user.nickname,
-            birth_year=current_user.birth_year,
-            gender=current_user.gender,
-            region=current_user.region,
-            school_name=current_user.school_name,          # 하위 호환성
-            school_type=current_user.school_type,          # 하위 호환성
-            admission_year=current_user.admission_year,    # 하위 호환성
-            schools=current_user.schools if isinstance(current_user.schools, list)
-            else (list(current_user.schools.values()) if current_user.schools else None),
-            phone=current_user.phone,
-            profile_image=current_user.profile_image,
-            background_image=current_user.background_image,
-            feed_images=feed_images_list
-        )
+        for user in (users[user_id] for user_id in ids if user_id in users)
+    ]
 
 
 @router.get("/users/{user_id}", response_model=UserRead)
 def get_user_by_id_api(
     user_id: int,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    session: Session = db_session
 ):
     """
     특정 사용자 정보 조회 API (피드 이미지 포함)
     """
-    with Session(engine) as session:
-        user = get_user_by_id(session, user_id)
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        # 해당 사용자의 게시글 이미지들 (피드용)
-        statement = (
-            select(Post)
-            .where(Post.author_id == user_id)
-            .where(Post.image_url != None)
-            .order_by(desc(Post.created_at))
-        )
-        user_posts = session.exec(statement).all()
-        feed_images_list = [post.image_url for post in user_posts if post.image_url]
-
-        return UserRead(
-            id=user.id,
-            name=user.name,
-            nickname=user.nickname,
-            birth_year=user.birth_year,
-            gender=user.gender,
-            region=user.region,
-            school_name=user.school_name,          # 하위 호환성
-            school_type=user.school_type,          # 하위 호환성
-            admission_year=user.admission_year,    # 하위 호환성
-            schools=user.schools if isinstance(user.schools, list)
-            else (list(user.schools.values()) if user.schools else None),
-            phone=user.phone,
-            profile_image=user.profile_image,
-            background_image=user.background_image,
-            feed_images=feed_images_list
-        )
+    user = get_user_by_id(session, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # 해당 사용자의 게시글 이미지들 (피드용)
+    statement = (
+        select(Post)
+        .where(Post.author_id == user_id)
+        .where(Post.image_url != None)
+        .order_by(desc(Post.created_at))
+    )
+    user_posts = session.exec(statement).all()
+    feed_images_list = [post.image_url for post in user_posts if post.image_url]
+
+    return UserRead(
+        id=user.id,
+        name=user.name,
+        nickname=user.nickname,
+        birth_year=user.birth_year,
+        gender=user.gender,
+        region=user.region,
+        school_name=user.school_name,          # 하위 호환성
+        school_type=user.school_type,          # 하위 호환성
+        admission_year=user.admission_year,    # 하위 호환성
+        schools=user.schools if isinstance(user.schools, list)
+        else (list(user.schools.values()) if user.schools else None),
+        phone=user.phone,
+        profile_image=user.profile_image,
+        background_image=user.background_image,
+        feed_images=feed_images_list
+    )
 
 
 @router.get("/users/me/recommended", response_model=list[UserRead])
-def recommended(current_user: User = Depends(get_current_user)):
+def recommended(current_user: User = Depends(get_current_user), session: Session = db_session):
     """
     추천 친구 목록 조회
     - 차단/신고 필터링은 services.py 내부에서 이미 처리되어 나옵니다.
     - 여기서는 그냥 받아서 넘겨주기만 하면 됩니다. (중복 제거됨)
     """
-    with Session(engine) as session:
-        friends = get_recommended_friends(session, current_user)
-
-        return [
-            UserRead(
-                id=u.id,
-                name=u.name,
-                birth_year=u.birth_year,
-                region=u.region,
-                school_name=u.school_name,
-                profile_image=u.profile_image,
-                background_image=u.background_image
-            ) for u in friends
-        ]
+    # 저장된 추천 목록 (없거나 오래됐으면 services.get_recommended_friends 로 계산)
+    friends = recommendation_store.get(session, current_user, "content")
+
+    return [
+        UserRead(
+            id=u.id,
+            name=u.name,
+            birth_year=u.birth_year,
+            region=u.region,
+            school_name=u.school_name,
+            profile_image=u.profile_image,
+            background_image=u.background_image
+        ) for u in friends
+    ]
 
 
 @router.put("/users/me", response_model=UserRead)
-def update_my_info(data: UserUpdate, token: str = Depends(oauth2_scheme)):
+def update_my_info(data: UserUpdate, token: str = Depends(oauth2_scheme), session: Session = db_session):
     payload = decode_access_token(token)
     if payload is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication token")
@@ -221,109 +340,114 @@ def update_my_info(data: UserUpdate, token: str = Depends(oauth2_scheme)):
     if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication token")
 
-    with Session(engine) as session:
-        user = session.get(User, int(user_id))
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        # 필드 업데이트
-        if data.name is not None:
-            user.name = data.name
-        if data.nickname is not None:
-            user.nickname = data.nickname
-        if data.birth_year is not None:
-            user.birth_year = data.birth_year
-        if data.gender is not None:
-            user.gender = data.gender
-        if data.region is not None:
-            user.region = data.region
-        if data.school_name is not None:
-            user.school_name = data.school_name      # 하위 호환성
-        if data.school_type is not None:
-            user.school_type = data.school_type      # 하위 호환성
-        if data.admission_year is not None:
-            user.admission_year = data.admission_year  # 하위 호환성
-
-        if data.schools is not None:
-            # ✅ 여기서도 list[SchoolCreate] → list[dict]
-            user.schools = [s.dict() for s in data.schools]
-
-        if data.profile_image is not None:
-            user.profile_image = data.profile_image
-        if data.background_image is not None:
-            user.background_image = data.background_image
-
-        session.add(user)
-        session.commit()
-        session.refresh(user)
-
-        # 정보 변경에 따른 커뮤니티 재배정
-        assign_community(session, user)
-        session.add(user)
-        session.commit()
-        session.refresh(user)
-
-        # 피드 이미지 재조회
-        statement = (
-            select(Post)
-            .where(Post.author_id == user.id)
-            .where(Post.image_url != None)
-            .order_by(desc(Post.created_at))
-        )
-        my_posts = session.exec(statement).all()
-        feed_images_list = [post.image_url for post in my_posts if post.image_url]
-
-        return UserRead(
-            id=user.id,
-            name=user.name,
-            nickname=user.nickname,
-            birth_year=user.birth_year,
-            gender=user.gender,
-            region=user.region,
-            school_name=user.school_name,          # 하위 호환성
-            school_type=user.school_type,          # 하위 호환성
-            admission_year=user.admission_year,    # 하위 호환성
-            schools=user.schools if isinstance(user.schools, list)
-            else (list(user.schools.values()) if user.schools else None),
-            phone=user.phone,
-            profile_image=user.profile_image,
-            background_image=user.background_image,
-            feed_images=feed_images_list
-        )
+    user = session.get(User, int(user_id))
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # 필드 업데이트
+    if data.name is not None:
+        user.name = data.name
+    if data.nickname is not None:
+        user.nickname = data.nickname
+    if data.birth_year is not None:
+        user.birth_year = data.birth_year
+    if data.gender is not None:
+        user.gender = data.gender
+    if data.region is not None:
+        user.region = data.region
+    if data.school_name is not None:
+        user.school_name = data.school_name      # 하위 호환성
+    if data.school_type is not None:
+        user.school_type = data.school_type      # 하위 호환성
+    if data.admission_year is not None:
+        user.admission_year = data.admission_year  # 하위 호환성
+
+    if data.schools is not None:
+        # ✅ 여기서도 list[SchoolCreate] → list[dict]
+        user.schools = [s.dict() for s in data.schools]
+
+    if data.profile_image is not None:
+        user.profile_image = data.profile_image
+    if data.background_image is not None:
+        user.background_image = data.background_image
+
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+
+    # 정보 변경에 따른 커뮤니티 재배정
+    assign_community(session, user)
+    session.add(user)
+    # 프로필이 바뀌었으므로 저장된 내 추천 목록 다시 계산
+    recommendation_store.invalidate(session, user.id)
+    session.commit()
+    session.refresh(user)
+    invalidate_cached_user(user.id)
+
+    # 추천 친구 프로필 인덱스 갱신 (해당 사용자 행만)
+    profile_index.upsert(user)
+    schedule_embedding_refresh(user.id)
+
+    # 피드 이미지 재조회
+    statement = (
+        select(Post)
+        .where(Post.author_id == user.id)
+        .where(Post.image_url != None)
+        .order_by(desc(Post.created_at))
+    )
+    my_posts = session.exec(statement).all()
+    feed_images_list = [post.image_url for post in my_posts if post.image_url]
+
+    return UserRead(
+        id=user.id,
+        name=user.name,
+        nickname=user.nickname,
+        birth_year=user.birth_year,
+        gender=user.gender,
+        region=user.region,
+        school_name=user.school_name,          # 하위 호환성
+        school_type=user.school_type,          # 하위 호환성
+        admission_year=user.admission_year,    # 하위 호환성
+        schools=user.schools if isinstance(user.schools, list)
+        else (list(user.schools.values()) if user.schools else None),
+        phone=user.phone,
+        profile_image=user.profile_image,
+        background_image=user.background_image,
+        feed_images=feed_images_list
+    )
 
 
 # ------------------------------------------------------
 # 🔔 내 알림 목록 조회 API
 # ------------------------------------------------------
 @router.get("/users/me/notifications", response_model=List[NotificationRead])
-def get_my_notifications(current_user: User = Depends(get_current_user)):
+def get_my_notifications(current_user: User = Depends(get_current_user), session: Session = db_session):
     """내 알림 목록 조회 (최신순)"""
-    with Session(engine) as session:
-        statement = (
-            select(Notification, User)
-            .join(User, Notification.sender_id == User.id)
-            .where(Notification.receiver_id == current_user.id)
-            .order_by(Notification.created_at.desc())
-        )
-        results = session.exec(statement).all()
-
-        notif_list = []
-        for notif, sender in results:
-            sender_name = sender.name or sender.nickname or "알 수 없음"
-
-            notif_list.append(NotificationRead(
-                id=notif.id,
-                sender_id=notif.sender_id,
-                sender_name=sender_name,
-                sender_profile_image=sender.profile_image,
-                type=notif.type,
-                message=notif.message,
-                related_post_id=notif.related_post_id,
-                is_read=notif.is_read,
-                created_at=notif.created_at.isoformat()
-            ))
-
-        return notif_list
+    statement = (
+        select(Notification, User)
+        .join(User, Notification.sender_id == User.id)
+        .where(Notification.receiver_id == current_user.id)
+        .order_by(Notification.created_at.desc())
+    )
+    results = session.exec(statement).all()
+
+    notif_list = []
+    for notif, sender in results:
+        sender_name = sender.name or sender.nickname or "알 수 없음"
+
+        notif_list.append(NotificationRead(
+            id=notif.id,
+            sender_id=notif.sender_id,
+            sender_name=sender_name,
+            sender_profile_image=sender.profile_image,
+            type=notif.type,
+            message=notif.message,
+            related_post_id=notif.related_post_id,
+            is_read=notif.is_read,
+            created_at=notif.created_at.isoformat()
+        ))
+
+    return notif_list
 
 
 # ------------------------------------------------------
@@ -332,7 +456,8 @@ def get_my_notifications(current_user: User = Depends(get_current_user)):
 @router.get("/users/search", response_model=List[UserRead])
 def search_users(
     keyword: str,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    session: Session = db_session
 ):
     """
     🔍 유저 검색 API (이름 또는 닉네임)
@@ -340,120 +465,150 @@ def search_users(
     if not keyword:
         return []
 
-    with Session(engine) as session:
-        statement = select(User).where(
-            or_(
-                User.name.contains(keyword),
-                User.nickname.contains(keyword)
-            )
-        ).where(User.id != current_user.id)  # 나 자신은 검색 제외
+    statement = select(User).where(
+        or_(
+            User.name.contains(keyword),
+            User.nickname.contains(keyword)
+        )
+    ).where(User.id != current_user.id)  # 나 자신은 검색 제외
 
-        results = session.exec(statement).limit(20).all()  # 최대 20명만
+    results = session.exec(statement).limit(20).all()  # 최대 20명만
 
-        return [
-            UserRead(
-                id=u.id,
-                name=u.name,
-                nickname=u.nickname,
-                birth_year=u.birth_year,
-                region=u.region,
-                school_name=u.school_name,
-                profile_image=u.profile_image,
-                background_image=u.background_image
-            ) for u in results
-        ]
+    return [
+        UserRead(
+            id=u.id,
+            name=u.name,
+            nickname=u.nickname,
+            birth_year=u.birth_year,
+            region=u.region,
+            school_name=u.school_name,
+            profile_image=u.profile_image,
+            background_image=u.background_image
+        ) for u in results
+    ]
 
 
 @router.delete("/users/me", status_code=status.HTTP_204_NO_CONTENT)
-def withdraw_account(current_user: User = Depends(get_current_user)):
+def withdraw_account(current_user: User = Depends(get_current_user), session: Session = db_session):
     """
     🗑️ 회원탈퇴 (계정 삭제)
     """
-    with Session(engine) as session:
-        user_in_db = session.get(User, current_user.id)
-        if not user_in_db:
-            return  # 이미 삭제된 경우
+    user_in_db = session.get(User, current_user.id)
+    if not user_in_db:
+        return  # 이미 삭제된 경우
 
-        user_id = user_in_db.id
+    user_id = user_in_db.id
 
-        # 1. 💬 채팅 관련 데이터 삭제
-        chat_rooms = session.exec(
-            select(ChatRoom).where(
-                or_(ChatRoom.user1_id == user_id, ChatRoom.user2_id == user_id)
-            )
-        ).all()
-
-        for room in chat_rooms:
-            messages = session.exec(select(ChatMessage).where(ChatMessage.room_id == room.id)).all()
-            for msg in messages:
-                session.delete(msg)
-            session.delete(room)
-
-        # 2. 📝 내 게시글과 그 하위 데이터 삭제
-        my_posts = session.exec(select(Post).where(Post.author_id == user_id)).all()
-        for post in my_posts:
-            comments = session.exec(select(Comment).where(Comment.post_id == post.id)).all()
-            for comment in comments:
-                for cl in session.exec(select(CommentLike).where(CommentLike.comment_id == comment.id)).all():
-                    session.delete(cl)
-                for cr in session.exec(select(CommentReport).where(CommentReport.reported_comment_id == comment.id)).all():
-                    session.delete(cr)
-                session.delete(comment)
-
-            for pl in session.exec(select(PostLike).where(PostLike.post_id == post.id)).all():
-                session.delete(pl)
-            for pr in session.exec(select(PostReport).where(PostReport.reported_post_id == post.id)).all():
-                session.delete(pr)
-            for n in session.exec(select(Notification).where(Notification.related_post_id == post.id)).all():
-                session.delete(n)
-
-            session.delete(post)
-
-        # 3. ✍️ 내가 쓴 댓글 삭제
-        my_comments = session.exec(select(Comment).where(Comment.user_id == user_id)).all()
-        for comment in my_comments:
+    # 1. 💬 채팅 관련 데이터 삭제
+    chat_rooms = session.exec(
+        select(ChatRoom).where(
+            or_(ChatRoom.user1_id == user_id, ChatRoom.user2_id == user_id)
+        )
+    ).all()
+
+    for room in chat_rooms:
+        messages = session.exec(select(ChatMessage).where(ChatMessage.room_id == room.id)).all()
+        for msg in messages:
+            session.delete(msg)
+        session.delete(room)
+
+    # 2. 📝 내 게시글과 그 하위 데이터 삭제
+    my_posts = session.exec(select(Post).where(Post.author_id == user_id)).all()
+    my_post_ids = [post.id for post in my_posts]
+    for post in my_posts:
+        comments = session.exec(select(Comment).where(Comment.post_id == post.id)).all()
+        for comment in comments:
             for cl in session.exec(select(CommentLike).where(CommentLike.comment_id == comment.id)).all():
                 session.delete(cl)
             for cr in session.exec(select(CommentReport).where(CommentReport.reported_comment_id == comment.id)).all():
                 session.delete(cr)
             session.delete(comment)
 
-        # 4. ❤️ 기타 활동 내역 삭제 (좋아요, 신고, 차단)
-        for pl in session.exec(select(PostLike).where(PostLike.user_id == user_id)).all():
+        for pl in session.exec(select(PostLike).where(PostLike.post_id == post.id)).all():
             session.delete(pl)
-        for cl in session.exec(select(CommentLike).where(CommentLike.user_id == user_id)).all():
-            session.delete(cl)
-
-        for pr in session.exec(select(PostReport).where(PostReport.reporter_id == user_id)).all():
+        for pr in session.exec(select(PostReport).where(PostReport.reported_post_id == post.id)).all():
             session.delete(pr)
-        for cr in session.exec(select(CommentReport).where(CommentReport.reporter_id == user_id)).all():
-            session.delete(cr)
-
-        user_reports = session.exec(select(UserReport).where(
-            or_(UserReport.reporter_id == user_id, UserReport.reported_user_id == user_id)
-        )).all()
-        for ur in user_reports:
-            session.delete(ur)
-
-        user_blocks = session.exec(select(UserBlock).where(
-            or_(UserBlock.user_id == user_id, UserBlock.blocked_user_id == user_id)
-        )).all()
-        for ub in user_blocks:
-            session.delete(ub)
-
-        # 5. 🤝 친구 관계 및 알림 삭제
-        friendships = session.exec(select(UserFriendship).where(
-            or_(UserFriendship.user_id == user_id, UserFriendship.friend_user_id == user_id)
-        )).all()
-        for f in friendships:
-            session.delete(f)
-
-        notifications = session.exec(select(Notification).where(
-            or_(Notification.receiver_id == user_id, Notification.sender_id == user_id)
-        )).all()
-        for n in notifications:
+        for n in session.exec(select(Notification).where(Notification.related_post_id == post.id)).all():
             session.delete(n)
 
-        # 6. 👤 [최종] 사용자 정보 삭제
-        session.delete(user_in_db)
-        session.commit()
+        session.delete(post)
+
+    # 3. ✍️ 내가 쓴 댓글 삭제 (다른 사람 게시글의 댓글 수도 함께 감소)
+    my_comment_counts = session.exec(
+        select(Comment.post_id, func.count(Comment.id))
+        .where(Comment.user_id == user_id)
+        .group_by(Comment.post_id)
+    ).all()
+    for post_id, count in my_comment_counts:
+        adjust_comment_count(session, post_id, -count)
+
+    my_comments = session.exec(select(Comment).where(Comment.user_id == user_id)).all()
+    for comment in my_comments:
+        for cl in session.exec(select(CommentLike).where(CommentLike.comment_id == comment.id)).all():
+            session.delete(cl)
+        for cr in session.exec(select(CommentReport).where(CommentReport.reported_comment_id == comment.id)).all():
+            session.delete(cr)
+        session.delete(comment)
+
+    # 4. ❤️ 기타 활동 내역 삭제 (좋아요, 신고, 차단)
+    for pl in session.exec(select(PostLike).where(PostLike.user_id == user_id)).all():
+        session.delete(pl)
+    for cl in session.exec(select(CommentLike).where(CommentLike.user_id == user_id)).all():
+        session.delete(cl)
+
+    for pr in session.exec(select(PostReport).where(PostReport.reporter_id == user_id)).all():
+        session.delete(pr)
+    for cr in session.exec(select(CommentReport).where(CommentReport.reporter_id == user_id)).all():
+        session.delete(cr)
+
+    user_reports = session.exec(select(UserReport).where(
+        or_(UserReport.reporter_id == user_id, UserReport.reported_user_id == user_id)
+    )).all()
+    for ur in user_reports:
+        session.delete(ur)
+
+    user_blocks = session.exec(select(UserBlock).where(
+        or_(UserBlock.user_id == user_id, UserBlock.blocked_user_id == user_id)
+    )).all()
+    for ub in user_blocks:
+        session.delete(ub)
+
+    # 5. 🤝 친구 관계 및 알림 삭제
+    friendships = session.exec(select(UserFriendship).where(
+        or_(UserFriendship.user_id == user_id, UserFriendship.friend_user_id == user_id)
+    )).all()
+    for f in friendships:
+        session.delete(f)
+
+    notifications = session.exec(select(Notification).where(
+        or_(Notification.receiver_id == user_id, Notification.sender_id == user_id)
+    )).all()
+    for n in notifications:
+        session.delete(n)
+
+    # 6. 📎 청크 업로드 세션 삭제 (진행 중이던 임시 청크 포함)
+    delete_user_upload_sessions(session, user_id)
+
+    # 친구/차단 관계가 있던 사용자의 추천 목록은 다시 계산
+    recommendation_store.invalidate(
+        session,
+        *{f.user_id for f in friendships}, *{f.friend_user_id for f in friendships},
+        *{b.user_id for b in user_blocks}, *{b.blocked_user_id for b in user_blocks},
+    )
+    recommendation_store.delete_user(session, user_id)
+    delete_user_embedding(session, user_id)
+    delete_user_texts(session, user_id)
+
+    # 7. 👤 [최종] 사용자 정보 삭제
+    session.delete(user_in_db)
+    bump_version(session, "feed")
+    session.commit()
+    invalidate_cached_user(user_id)
+
+    # 🔥 인기 피드에서 내 게시글 제거
+    for post_id in my_post_ids:
+        hot_ranker.remove_post(post_id)
+
+    profile_index.remove(user_id)
+    social_graph.remove_user(user_id)
+    embedding_index.remove(user_id)
@@ -213,6 +213,8 @@ class ChatMessageCreate(BaseModel):
     file_name: Optional[str] = None
     file_size: Optional[int] = None
     file_type: Optional[str] = None
+    # 청크 업로드(/upload/sessions)로 올린 파일 → file_* 필드를 서버가 채움
+    upload_id: Optional[str] = None
 
 
 class ChatMessageRead(BaseModel):
@@ -283,3 +285,30 @@ class FriendRecommendationAI(BaseModel):
     user: UserRead
     reason: str
     first_messages: List[str] = []
+
+
+# ------------------------------------------------------
+# 📎 파일 업로드
+# ------------------------------------------------------
+class UploadPresignRequest(BaseModel):
+    """저장소 직접 업로드 URL 발급 요청"""
+    filename: str
+    content_type: Optional[str] = None
+    size: int  # 업로드할 파일 크기 (bytes) - 이 크기로만 업로드 가능
+
+
+class UploadSessionCreate(BaseModel):
+    """청크 업로드 세션 생성 요청"""
+    filename: str
+    size: int
+    content_type: Optional[str] = None
+
+
+class UploadSessionRead(BaseModel):
+    upload_id: str
+    offset: int                       # 서버가 받은 바이트 수 (다음 청크 시작 위치)
+    size: int
+    chunk_size: int
+    status: str
+    expires_at: str
+    file_url: Optional[str] = None
@@ -1,9 +1,9 @@
-import pandas as pd
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sqlmodel import Session, select
-from .models import User, UserFriendship, UserBlock, UserReport
+from sqlmodel import Session, select, func
+from sqlalchemy.orm import aliased
+from .models import User, UserFriendship
+from .profile_index import profile_index
+from .social_graph import social_graph
+from .recommendation_store import recommender
 
 # 기존 커뮤니티 배정 함수 (유지)
 def assign_community(session: Session, user: User) -> User:
@@ -49,103 +49,46 @@ def get_content_based_scores(users: list[User], target_user: User) -> dict:
     - 코사인 유사도(Cosine Similarity)를 계산하여 유사도 점수 반환
     
     🔥 [개선됨] '글자(char)' 단위 분석 적용 (예: '남정' <-> '남정초등학교' 매칭)
+    🔥 [개선됨] 요청마다 fit 하지 않고 미리 학습된 profile_index 의 희소 행렬 내적으로 계산
     """
     if not users:
         return {}
 
-    # 1. 사용자 프로필을 '문서'로 변환 (공백 제거하여 매칭 확률 높임)
-    # None 값 처리 및 문자열 변환
-    user_docs = [
-        f"{str(u.school_name or '').replace(' ', '')} {str(u.region or '').replace(' ', '')} {u.admission_year or ''}" 
-        for u in users
-    ]
-    
-    # 타겟 유저의 프로필
-    target_doc = f"{str(target_user.school_name or '').replace(' ', '')} {str(target_user.region or '').replace(' ', '')} {target_user.admission_year or ''}"
-    
-    # 2. TF-IDF 벡터화 (단어의 중요도 반영)
-    # analyzer='char': 단어 대신 '글자' 단위로 분석
-    # ngram_range=(2, 3): 2~3글자씩 쪼개서 비교
-    vectorizer = TfidfVectorizer(analyzer='char', ngram_range=(2, 3))
-    
-    try:
-        # 데이터가 너무 적거나(1명 이하) 단어가 하나도 없으면 에러 날 수 있음
-        tfidf_matrix = vectorizer.fit_transform(user_docs + [target_doc])
-    except ValueError:
-        # 벡터화 실패 시(데이터 부족 등) 빈 딕셔너리 반환
-        return {}
-    
-    # 3. 코사인 유사도 계산
-    # 마지막 행(타겟 유저)과 나머지 모든 행(후보 유저들) 간의 유사도 계산
-    cosine_sim = cosine_similarity(tfidf_matrix[-1], tfidf_matrix[:-1])
-    
-    # {user_id: similarity_score} 형태로 변환
-    scores = {users[i].id: cosine_sim[0][i] for i in range(len(users))}
-    return scores
+    profile_index.ensure_loaded()
+    return profile_index.similarities(target_user, users)
 
 
-def get_recommended_friends(session: Session, user: User, limit: int = 20) -> list[User]:
+def get_mutual_friend_counts(session: Session, user_id: int) -> dict:
     """
-    🚀 AI 추천 친구 알고리즘 (콘텐츠 기반 + 교집합 가산점)
-    
-    [로직 순서]
-    1. 필터링: 친구/차단/신고 유저 제외
-    2. AI 분석: 프로필(학교/지역) 유사도 계산 (scikit-learn)
-    3. 소셜 분석: 함께 아는 친구 가산점
-    4. 최종 정렬 후 반환
+    {다른 사용자 id: 함께 아는 친구 수} 를 쿼리 1번으로 계산
+    - 나 → 친구(f) → f 의 친구(후보) 로 UserFriendship 을 self-join 후 후보별 GROUP BY
+    - 친구 관계는 양방향 2행으로 저장되므로 (user_id, friend_user_id) 인덱스만으로 처리
+    - 서버 시작 시 친구 그래프가 로드됐으면 DB 조회 없이 그래프에서 계산
     """
+    if social_graph.ready:
+        return social_graph.mutual_counts(user_id)
 
-    # 1. 제외 대상 필터링 (기존 로직)
-    friend_subquery = select(UserFriendship.friend_user_id).where(UserFriendship.user_id == user.id)
-    blocked_subquery = select(UserBlock.blocked_user_id).where(UserBlock.user_id == user.id)
-    reported_subquery = select(UserReport.reported_user_id).where(
-        UserReport.reporter_id == user.id, UserReport.status == "pending"
-    )
+    mine = aliased(UserFriendship)
+    theirs = aliased(UserFriendship)
+    rows = session.exec(
+        select(theirs.friend_user_id, func.count(theirs.id))
+        .join(mine, mine.friend_user_id == theirs.user_id)
+        .where(mine.user_id == user_id, theirs.friend_user_id != user_id)
+        .group_by(theirs.friend_user_id)
+    ).all()
+    return {other_id: count for other_id, count in rows}
 
-    # 2. 후보군 전체 조회
-    # (AI 분석을 위해 일단 최대한 가져옵니다. 너무 많으면 limit으로 조절 가능)
-    candidate_stmt = (
-        select(User)
-        .where(User.id != user.id)
-        .where(User.name.isnot(None))
-        .where(User.id.notin_(friend_subquery))
-        .where(User.id.notin_(blocked_subquery))
-        .where(User.id.notin_(reported_subquery))
-    )
-    candidates = session.exec(candidate_stmt).all()
-    
-    if not candidates:
-        return []
 
-    # 3. AI 유사도 점수 계산 (0.0 ~ 1.0)
-    ai_scores = get_content_based_scores(candidates, user)
-    
-    # 함께 아는 친구 계산을 위한 내 친구 목록 Set
-    my_friends_list = session.exec(friend_subquery).all()
-    my_friend_ids = set(my_friends_list)
+@recommender("content")
+def get_recommended_friends(session: Session, user: User, limit: int = 20) -> list[User]:
+    """
+    🚀 AI 추천 친구 알고리즘 (콘텐츠 기반 + 교집합 가산점)
 
-    final_results = []
-    
-    for candidate in candidates:
-        # [A] AI 프로필 유사도 점수 (기본 점수)
-        # 예: 0.8 * 5점 = 4점 만점 기준 환산
-        profile_score = ai_scores.get(candidate.id, 0.0) * 5.0
-        
-        # [B] 함께 아는 친구 점수 (가산점)
-        candidate_friends = session.exec(
-            select(UserFriendship.friend_user_id).where(UserFriendship.user_id == candidate.id)
-        ).all()
-        mutual_count = len(my_friend_ids & set(candidate_friends))
-        mutual_score = mutual_count * 1.5  # 친구 1명당 1.5점
-        
-        # 최종 점수
-        total_score = profile_score + mutual_score
-        
-        if total_score > 0:
-            final_results.append((candidate, total_score))
-            
-    # 4. 점수 높은 순 정렬
-    final_results.sort(key=lambda x: x[1], reverse=True)
-    
-    # 유저 객체만 추출하여 반환
-    return [item[0] for item in final_results[:limit]]
\ No newline at end of file
+    [로직 순서] recommendation_pipeline 의 content 파이프라인
+    1. 필터링: 친구/차단/신고 유저 제외
+    2. 후보군: 학교/지역/입학년도/친구의 친구/프로필 유사 버킷 (전체 조회 없음)
+    3. 점수: 프로필 유사도 × 5 + 함께 아는 친구 수 × 1.5 (RECOMMENDATION_CONTENT_WEIGHTS)
+    4. 최종 정렬 후 반환
+    """
+    from .recommendation_pipeline import content_pipeline  # 순환 참조 방지
+    return content_pipeline.run(session, user, limit)
@@ -0,0 +1,215 @@
+# 파일 경로: intersection-backend/app/social_graph.py
+
+from __future__ import annotations
+
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlmodel import Session, select
+
+from .models import UserFriendship
+
+# =====================================================
+# 🕸️ 인메모리 친구 그래프 (CSR 인접 배열)
+#
+# UserFriendship 전체를 CSR(Compressed Sparse Row) 로 올려 두고
+# 함께 아는 친구 수 / 친구의 친구 / 친구 수 를 DB 조회 없이 계산한다.
+#
+#   indptr[u] ~ indptr[u + 1]  : indices 안에서 사용자 u 의 친구 구간
+#   indices                    : 친구 user_id (int32, 구간마다 정렬)
+#
+# 서버 실행 중 추가/삭제는 델타(_added / _removed / _dropped)에 모았다가
+# COMPACT_THRESHOLD 를 넘으면 CSR 을 다시 만든다.
+#
+# 💾 메모리 예산 (친구 관계 1M 행 = UserFriendship 1M 행, 양방향이면 50만 쌍)
+#   - indices : 1,000,000 × 4 byte (int32)          ≈ 4 MB
+#   - indptr  : (최대 user_id + 2) × 8 byte (int64) ≈ 8 MB (사용자 100만 명 기준)
+#   - 델타    : 변경 1건당 set 원소 ≈ 70 byte, 최대 COMPACT_THRESHOLD 건 ≈ 3.5 MB
+#   → 합계 약 16 MB. (같은 데이터를 dict[int, set[int]] 로 두면 100 MB 이상)
+# =====================================================
+
+# 델타에 쌓인 변경 건수가 이 값을 넘으면 CSR 재구성
+COMPACT_THRESHOLD = 50_000
+
+_EMPTY = np.empty(0, dtype=np.int32)
+
+
+class SocialGraph:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = _EMPTY
+        self._added: Dict[int, Set[int]] = {}
+        self._removed: Dict[int, Set[int]] = {}
+        self._dropped: Set[int] = set()   # 탈퇴한 사용자
+        self._delta_size = 0
+        self.ready = False
+
+    # ----- 구축 -----
+    @staticmethod
+    def _build(pairs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(user_id, friend_user_id) 배열 → (indptr, indices)"""
+        if pairs.size == 0:
+            return np.zeros(1, dtype=np.int64), _EMPTY
+        # (user_id, friend_id) 순 정렬 후 중복 제거 (np.unique(axis=0) 보다 훨씬 빠름)
+        pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+        distinct = np.ones(len(pairs), dtype=bool)
+        distinct[1:] = np.any(pairs[1:] != pairs[:-1], axis=1)
+        pairs = pairs[distinct]
+        sources = pairs[:, 0]
+        counts = np.bincount(sources, minlength=int(sources.max()) + 1)
+        indptr = np.zeros(counts.size + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        return indptr, pairs[:, 1].astype(np.int32)
+
+    def load(self, session: Session) -> int:
+        """UserFriendship 전체 로드 (서버 시작 시)"""
+        rows = session.exec(select(UserFriendship.user_id, UserFriendship.friend_user_id)).all()
+        pairs = np.array(rows, dtype=np.int64).reshape(-1, 2)
+        indptr, indices = self._build(pairs)
+        with self._lock:
+            self._indptr, self._indices = indptr, indices
+            self._added.clear()
+            self._removed.clear()
+            self._dropped.clear()
+            self._delta_size = 0
+            self.ready = True
+        return int(indices.size)
+
+    def _compact(self) -> None:
+        """델타를 CSR 에 합침 (lock 보유 상태에서 호출)"""
+        users = np.repeat(np.arange(self._indptr.size - 1), np.diff(self._indptr))
+        pairs = np.column_stack([users, self._indices]).astype(np.int64)
+
+        if self._removed or self._dropped:
+            gone = {(u, v) for u, friends in self._removed.items() for v in friends}
+            keep = np.fromiter(
+                (
+                    (u not in self._dropped and v not in self._dropped and (u, v) not in gone)
+                    for u, v in pairs.tolist()
+                ),
+                dtype=bool,
+                count=len(pairs),
+            )
+            pairs = pairs[keep]
+
+        added = [(u, v) for u, friends in self._added.items() for v in friends]
+        if added:
+            pairs = np.vstack([pairs, np.array(added, dtype=np.int64)])
+
+        self._indptr, self._indices = self._build(pairs)
+        self._added.clear()
+        self._removed.clear()
+        self._dropped.clear()
+        self._delta_size = 0
+
+    # ----- 변경 반영 -----
+    def add_friendship(self, user_id: int, friend_user_id: int) -> None:
+        """친구 추가 (양방향)"""
+        with self._lock:
+            for u, v in ((user_id, friend_user_id), (friend_user_id, user_id)):
+                self._dropped.discard(u)
+                self._removed.get(u, set()).discard(v)
+                self._added.setdefault(u, set()).add(v)
+            self._delta_size += 2
+            if self._delta_size >= COMPACT_THRESHOLD:
+                self._compact()
+
+    def remove_user(self, user_id: int) -> None:
+        """탈퇴 (해당 사용자와 연결된 모든 관계 제거)"""
+        with self._lock:
+            for friend_id in self._neighbors(user_id).tolist():
+                self._removed.setdefault(friend_id, set()).add(user_id)
+                self._added.get(friend_id, set()).discard(user_id)
+            self._added.pop(user_id, None)
+            self._removed.pop(user_id, None)
+            self._dropped.add(user_id)
+            self._delta_size += 1
+            if self._delta_size >= COMPACT_THRESHOLD:
+                self._compact()
+
+    # ----- 조회 -----
+    def _neighbors(self, user_id: int) -> np.ndarray:
+        """친구 id 배열 (lock 보유 상태에서 호출)"""
+        if user_id in self._dropped:
+            base = _EMPTY
+        elif 0 <= user_id < self._indptr.size - 1:
+            base = self._indices[self._indptr[user_id]:self._indptr[user_id + 1]]
+        else:
+            base = _EMPTY
+
+        removed = self._removed.get(user_id)
+        if removed:
+            base = base[~np.isin(base, np.fromiter(removed, dtype=np.int32))]
+        added = self._added.get(user_id)
+        if added:
+            base = np.union1d(base, np.fromiter(added, dtype=np.int32))
+        return base
+
+    def friends(self, user_id: int) -> np.ndarray:
+        with self._lock:
+            return self._neighbors(user_id).copy()
+
+    def degree(self, user_id: int) -> int:
+        with self._lock:
+            return int(self._neighbors(user_id).size)
+
+    def mutual_count(self, user_id: int, other_id: int) -> int:
+        with self._lock:
+            return int(np.intersect1d(
+                self._neighbors(user_id), self._neighbors(other_id), assume_unique=True
+            ).size)
+
+    def mutual_counts(self, user_id: int) -> Dict[int, int]:
+        """{다른 사용자 id: 함께 아는 친구 수} (친구의 친구 전체)"""
+        others, counts = self._friends_of_friends(user_id)
+        return dict(zip(others.tolist(), counts.tolist()))
+
+    def _friends_of_friends(self, user_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        with self._lock:
+            friends = self._neighbors(user_id)
+            if friends.size == 0:
+                return _EMPTY, _EMPTY
+            reach = np.concatenate([self._neighbors(int(f)) for f in friends])
+        others, counts = np.unique(reach, return_counts=True)
+        keep = others != user_id
+        return others[keep], counts[keep]
+
+    def friends_of_friends_top_k(
+        self,
+        user_id: int,
+        k: int = 20,
+        exclude: Optional[Iterable[int]] = None,
+    ) -> List[Tuple[int, int]]:
+        """
+        아직 친구가 아닌 친구의 친구 중 함께 아는 친구가 많은 k명 [(user_id, 함께 아는 친구 수)]
+        동점이면 user_id 오름차순
+        """
+        others, counts = self._friends_of_friends(user_id)
+        if others.size == 0 or k <= 0:
+            return []
+
+        excluded = self.friends(user_id)
+        if exclude:
+            excluded = np.union1d(excluded, np.fromiter(exclude, dtype=np.int32))
+        keep = ~np.isin(others, excluded)
+        others, counts = others[keep], counts[keep]
+        if others.size == 0:
+            return []
+
+        # others 는 오름차순 → 위치를 동점 정렬 키로 사용
+        order_keys = counts.astype(np.int64) * (others.size + 1) - np.arange(others.size)
+        if others.size > k:
+            top = np.argpartition(-order_keys, k - 1)[:k]
+        else:
+            top = np.arange(others.size)
+        top = top[np.argsort(-order_keys[top])]
+        return list(zip(others[top].tolist(), counts[top].tolist()))
+
+    def __len__(self) -> int:
+        """저장된 관계(방향 있는 행) 수 (델타 제외)"""
+        return int(self._indices.size)
+
+
+social_graph = SocialGraph()
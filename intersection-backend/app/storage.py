@@ -0,0 +1,394 @@
+# 파일 경로: intersection-backend/app/storage.py
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import os
+import shutil
+import time
+from typing import BinaryIO, Dict, Any, Optional
+from urllib.parse import quote, urlsplit
+
+from .config import settings
+
+# 스트리밍 복사 단위 (1MB) - 파일 전체를 메모리에 올리지 않음
+CHUNK_SIZE = 1024 * 1024
+
+
+# =====================================================
+# 1. 공통 인터페이스
+# =====================================================
+class StorageBackend:
+    """
+    업로드 파일 저장소 공통 인터페이스.
+    - save: 파일 객체를 스트리밍으로 저장하고 접근 URL 반환
+    - delete: 저장된 파일 삭제
+    - url_for: key 에 대한 공개 URL
+    - key_from_url / exists / size: 클라이언트가 보낸 URL 이 이 저장소에 실제로 올라간 파일인지 확인
+    - create_upload_url: 클라이언트가 저장소로 직접 올릴 수 있는 pre-signed URL 발급
+    """
+
+    name = "base"
+
+    def save(self, key: str, stream: BinaryIO, content_type: Optional[str] = None) -> str:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def url_for(self, key: str) -> str:
+        raise NotImplementedError
+
+    def public_base(self) -> str:
+        """공개 URL 앞부분 (url_for(key) == f"{public_base()}/{key}")"""
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def size(self, key: str) -> Optional[int]:
+        """저장된 파일 크기 (없으면 None)"""
+        raise NotImplementedError
+
+    def key_from_url(self, url: str) -> Optional[str]:
+        """이 저장소의 공개 URL 이면 key, 아니면 None (하위 경로 / 쿼리스트링이 붙은 URL 도 None)"""
+        prefix = f"{self.public_base()}/"
+        if not url.startswith(prefix):
+            return None
+        key = url[len(prefix):]
+        if not key or any(c in key for c in "/?#"):
+            return None
+        return key
+
+    def create_upload_url(
+        self,
+        key: str,
+        size: int,
+        content_type: Optional[str] = None,
+        expires_in: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """size: 클라이언트가 선언한 파일 크기 (이 크기로만 업로드할 수 있는 URL)"""
+        raise NotImplementedError
+
+    # ----- 재개 가능한(청크) 업로드 -----
+    def stage_chunk(self, upload_id: str, key: str, index: int, data: bytes) -> None:
+        """index 번째 청크를 임시 저장 (같은 index 재전송 시 덮어씀)"""
+        raise NotImplementedError
+
+    def commit_chunks(
+        self,
+        upload_id: str,
+        key: str,
+        chunk_count: int,
+        content_type: Optional[str] = None,
+    ) -> str:
+        """
+        0..chunk_count-1 청크를 순서대로 이어 붙여 key 로 저장하고 URL 반환
+        (저장된 청크가 없으면 FileNotFoundError)
+        """
+        raise NotImplementedError
+
+    def discard_chunks(self, upload_id: str, key: str) -> None:
+        """완료되지 않은 세션의 임시 청크 정리"""
+        raise NotImplementedError
+
+
+# =====================================================
+# 2. 로컬 디스크 저장소 (개발 / 단일 인스턴스용)
+# =====================================================
+class LocalStorage(StorageBackend):
+    """
+    앱 서버 디스크(UPLOAD_DIR)에 저장하고 /static 으로 서빙.
+    직접 업로드는 서명된 /upload/direct/{key} URL 로 대체한다.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str, public_prefix: str = "/static"):
+        self.root = root
+        self.public_prefix = public_prefix.rstrip("/")
+        # 청크 임시 파일은 /static 으로 노출되지 않도록 별도 디렉토리에 보관
+        self.partial_root = f"{root.rstrip('/')}_partial"
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        # key 에 경로 구분자가 섞여 들어와도 UPLOAD_DIR 밖으로 나가지 않게 방지
+        return os.path.join(self.root, os.path.basename(key))
+
+    def save(self, key: str, stream: BinaryIO, content_type: Optional[str] = None) -> str:
+        with open(self._path(key), "wb") as buffer:
+            shutil.copyfileobj(stream, buffer, CHUNK_SIZE)
+        return self.url_for(key)
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def url_for(self, key: str) -> str:
+        return f"{self.public_base()}/{key}"
+
+    def public_base(self) -> str:
+        return settings.STORAGE_PUBLIC_BASE_URL.rstrip("/") or self.public_prefix
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self._path(key))
+
+    def size(self, key: str) -> Optional[int]:
+        try:
+            return os.path.getsize(self._path(key))
+        except OSError:
+            return None
+
+    def create_upload_url(
+        self,
+        key: str,
+        size: int,
+        content_type: Optional[str] = None,
+        expires_in: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        expires_at = int(time.time()) + (expires_in or settings.UPLOAD_URL_EXPIRE_SECONDS)
+        # 선언한 크기도 서명에 포함 → /upload/direct 에서 정확히 이 크기만 받음
+        signature = sign_upload_key(key, size, expires_at)
+        headers = {"Content-Type": content_type} if content_type else {}
+        return {
+            "upload_url": f"/upload/direct/{quote(key)}?size={size}&expires={expires_at}&signature={signature}",
+            "method": "PUT",
+            "headers": headers,
+            "file_url": self.url_for(key),
+            "key": key,
+            "expires_at": expires_at,
+        }
+
+    def _partial_dir(self, upload_id: str) -> str:
+        return os.path.join(self.partial_root, os.path.basename(upload_id))
+
+    def stage_chunk(self, upload_id: str, key: str, index: int, data: bytes) -> None:
+        part_dir = self._partial_dir(upload_id)
+        os.makedirs(part_dir, exist_ok=True)
+        with open(os.path.join(part_dir, f"{index:06d}"), "wb") as part:
+            part.write(data)
+
+    def commit_chunks(
+        self,
+        upload_id: str,
+        key: str,
+        chunk_count: int,
+        content_type: Optional[str] = None,
+    ) -> str:
+        part_dir = self._partial_dir(upload_id)
+        # 임시 파일에 모은 뒤 교체 → key 파일이 있으면 항상 끝까지 조립된 상태
+        tmp_path = f"{self._path(key)}.{os.path.basename(upload_id)}.tmp"
+        try:
+            with open(tmp_path, "wb") as buffer:
+                for index in range(chunk_count):
+                    with open(os.path.join(part_dir, f"{index:06d}"), "rb") as part:
+                        shutil.copyfileobj(part, buffer, CHUNK_SIZE)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, self._path(key))
+        self.discard_chunks(upload_id, key)
+        return self.url_for(key)
+
+    def discard_chunks(self, upload_id: str, key: str) -> None:
+        shutil.rmtree(self._partial_dir(upload_id), ignore_errors=True)
+
+
+def sign_upload_key(key: str, size: int, expires_at: int) -> str:
+    """로컬 직접 업로드용 서명 (JWT_SECRET 기반 HMAC)"""
+    message = f"{key}:{size}:{expires_at}".encode("utf-8")
+    return hmac.new(settings.JWT_SECRET.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def verify_upload_signature(key: str, size: int, expires_at: int, signature: str) -> bool:
+    """서명 및 만료 시간 확인"""
+    if expires_at < int(time.time()):
+        return False
+    return hmac.compare_digest(sign_upload_key(key, size, expires_at), signature)
+
+
+# =====================================================
+# 3. Azure Blob Storage (운영 / 다중 인스턴스용)
+# =====================================================
+class AzureBlobStorage(StorageBackend):
+    """
+    Azure Blob Storage 에 저장.
+    - 연결 문자열만 바꾸면 Azurite(로컬 에뮬레이터)로도 동작
+    - 직접 업로드는 쓰기 전용 SAS URL 을 발급 → API 서버는 파일 바이트를 중계하지 않음
+    - 읽기는 컨테이너 공개 읽기 권한 또는 STORAGE_PUBLIC_BASE_URL(CDN) 기준
+    """
+
+    name = "azure"
+
+    def __init__(self, connection_string: str, container: str):
+        try:
+            from azure.storage.blob import BlobServiceClient  # pip 패키지: azure-storage-blob
+        except ImportError as exc:
+            raise RuntimeError(
+                "STORAGE_BACKEND=azure 인데 azure-storage-blob 패키지가 설치되지 않았습니다."
+            ) from exc
+
+        if not connection_string:
+            raise RuntimeError("AZURE_STORAGE_CONNECTION_STRING 이 설정되지 않았습니다.")
+
+        self.service = BlobServiceClient.from_connection_string(connection_string)
+        self.container = self.service.get_container_client(container)
+        self.container_name = container
+
+        # 직접 업로드 SAS 서명용 계정 키 (SharedAccessSignature 만 있는 연결 문자열이면 None)
+        self.account_key: Optional[str] = getattr(self.service.credential, "account_key", None)
+        if not self.account_key:
+            print("[storage] AccountKey 가 없는 연결 문자열 → /upload/presign 은 사용할 수 없음 (/upload, /upload/sessions 는 사용 가능)")
+
+        # 새 Azurite 인스턴스 등 컨테이너가 없으면 생성
+        if not self.container.exists():
+            self.container.create_container()
+
+    def save(self, key: str, stream: BinaryIO, content_type: Optional[str] = None) -> str:
+        from azure.storage.blob import ContentSettings
+
+        self.container.upload_blob(
+            name=key,
+            data=stream,
+            overwrite=True,
+            content_settings=ContentSettings(content_type=content_type) if content_type else None,
+            max_concurrency=2,
+        )
+        return self.url_for(key)
+
+    def delete(self, key: str) -> None:
+        from azure.core.exceptions import ResourceNotFoundError
+
+        try:
+            self.container.delete_blob(key)
+        except ResourceNotFoundError:
+            pass
+
+    def url_for(self, key: str) -> str:
+        return f"{self.public_base()}/{quote(key)}"
+
+    def public_base(self) -> str:
+        if settings.STORAGE_PUBLIC_BASE_URL:
+            return settings.STORAGE_PUBLIC_BASE_URL.rstrip("/")
+        # SAS 연결 문자열이면 container.url 에 토큰이 붙어 있으므로 쿼리스트링은 제외
+        return urlsplit(self.container.url)._replace(query="", fragment="").geturl().rstrip("/")
+
+    def exists(self, key: str) -> bool:
+        return self.container.get_blob_client(key).exists()
+
+    def size(self, key: str) -> Optional[int]:
+        from azure.core.exceptions import ResourceNotFoundError
+
+        try:
+            return self.container.get_blob_client(key).get_blob_properties().size
+        except ResourceNotFoundError:
+            return None
+
+    def create_upload_url(
+        self,
+        key: str,
+        size: int,
+        content_type: Optional[str] = None,
+        expires_in: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        from datetime import datetime, timedelta, timezone
+        from azure.storage.blob import BlobSasPermissions, generate_blob_sas
+
+        if not self.account_key:
+            raise RuntimeError(
+                "직접 업로드 URL(SAS) 발급에는 AccountKey 가 포함된 AZURE_STORAGE_CONNECTION_STRING 이 필요합니다."
+            )
+
+        seconds = expires_in or settings.UPLOAD_URL_EXPIRE_SECONDS
+        expiry = datetime.now(timezone.utc) + timedelta(seconds=seconds)
+        sas = generate_blob_sas(
+            account_name=self.service.account_name,
+            container_name=self.container_name,
+            blob_name=key,
+            account_key=self.account_key,
+            permission=BlobSasPermissions(create=True, write=True),
+            expiry=expiry,
+            content_type=content_type,
+        )
+        # SAS 는 본문 크기를 제한할 수 없으므로 크기는 resolve_uploaded_file_url 에서 확인
+        headers = {"x-ms-blob-type": "BlockBlob", "Content-Length": str(size)}
+        if content_type:
+            headers["Content-Type"] = content_type
+
+        return {
+            "upload_url": f"{self.container.get_blob_client(key).url}?{sas}",
+            "method": "PUT",
+            "headers": headers,
+            "file_url": self.url_for(key),
+            "key": key,
+            "expires_at": int(expiry.timestamp()),
+        }
+
+    # Blob 블록 API 를 그대로 사용 (stage_block → commit_block_list)
+    # 커밋되지 않은 블록은 Azure 가 7일 후 자동 정리하므로 discard 는 할 일이 없음
+    @staticmethod
+    def _block_id(index: int) -> str:
+        return base64.b64encode(f"{index:08d}".encode("ascii")).decode("ascii")
+
+    def stage_chunk(self, upload_id: str, key: str, index: int, data: bytes) -> None:
+        self.container.get_blob_client(key).stage_block(self._block_id(index), data)
+
+    def commit_chunks(
+        self,
+        upload_id: str,
+        key: str,
+        chunk_count: int,
+        content_type: Optional[str] = None,
+    ) -> str:
+        from azure.core.exceptions import HttpResponseError
+        from azure.storage.blob import BlobBlock, ContentSettings
+
+        try:
+            self.container.get_blob_client(key).commit_block_list(
+                [BlobBlock(block_id=self._block_id(i)) for i in range(chunk_count)],
+                content_settings=ContentSettings(content_type=content_type) if content_type else None,
+            )
+        except HttpResponseError as e:
+            # 스테이징되지 않은 블록이 있으면 로컬 저장소와 같이 FileNotFoundError
+            if getattr(e, "error_code", None) == "InvalidBlockList":
+                raise FileNotFoundError(f"missing staged blocks for {key}") from e
+            raise
+        return self.url_for(key)
+
+    def discard_chunks(self, upload_id: str, key: str) -> None:
+        pass
+
+
+# =====================================================
+# 4. 싱글톤 팩토리
+# =====================================================
+_storage: StorageBackend | None = None
+
+
+def get_storage() -> StorageBackend:
+    """
+    설정(STORAGE_BACKEND)에 맞는 저장소 싱글톤 반환.
+    azure 설정이 잘못된 경우 RuntimeError 발생.
+    """
+    global _storage
+
+    if _storage is not None:
+        return _storage
+
+    backend = settings.STORAGE_BACKEND.lower()
+    if backend == "azure":
+        _storage = AzureBlobStorage(
+            settings.AZURE_STORAGE_CONNECTION_STRING,
+            settings.AZURE_STORAGE_CONTAINER,
+        )
+    elif backend == "local":
+        _storage = LocalStorage(settings.UPLOAD_DIR)
+    else:
+        raise RuntimeError(f"알 수 없는 STORAGE_BACKEND 입니다: {settings.STORAGE_BACKEND}")
+
+    return _storage
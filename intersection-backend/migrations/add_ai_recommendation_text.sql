@@ -0,0 +1,17 @@
+-- 미리 생성한 AI 추천 이유 저장 (app/ai_precompute.py)
+-- PostgreSQL에서 실행: psql -U postgres -d intersection -f migrations/add_ai_recommendation_text.sql
+
+ALTER TABLE friendrecommendation
+ADD COLUMN IF NOT EXISTS ai_generated_at TIMESTAMP;
+
+CREATE TABLE IF NOT EXISTS airecommendationtext (
+    user_id INTEGER NOT NULL,
+    candidate_id INTEGER NOT NULL,
+    cache_key VARCHAR NOT NULL,
+    reason VARCHAR NOT NULL,
+    first_messages JSON,
+    created_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (user_id, candidate_id)
+);
+
+CREATE INDEX IF NOT EXISTS ix_airecommendationtext_candidate_id ON airecommendationtext (candidate_id);
@@ -0,0 +1,5 @@
+-- 댓글 목록 keyset 페이지네이션용 인덱스
+-- PostgreSQL에서 실행: psql -U postgres -d intersection -f migrations/add_comment_pagination_index.sql
+
+CREATE INDEX IF NOT EXISTS ix_comment_post_created_id
+ON comment (post_id, created_at, id);
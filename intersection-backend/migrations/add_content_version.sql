@@ -0,0 +1,7 @@
+-- ETag 버전 스탬프용 삭제 카운터 (app/etag.py bump_version)
+-- PostgreSQL에서 실행: psql -U postgres -d intersection -f migrations/add_content_version.sql
+
+CREATE TABLE IF NOT EXISTS contentversion (
+    name VARCHAR NOT NULL PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
@@ -0,0 +1,14 @@
+-- 미리 계산한 추천 친구 저장 테이블 (app/recommendation_store.py)
+-- PostgreSQL에서 실행: psql -U postgres -d intersection -f migrations/add_friend_recommendation.sql
+
+CREATE TABLE IF NOT EXISTS friendrecommendation (
+    user_id INTEGER NOT NULL,
+    kind VARCHAR NOT NULL,
+    candidate_ids JSON,
+    is_stale BOOLEAN NOT NULL DEFAULT FALSE,
+    computed_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (user_id, kind)
+);
+
+CREATE INDEX IF NOT EXISTS ix_friendrecommendation_is_stale ON friendrecommendation (is_stale);
+CREATE INDEX IF NOT EXISTS ix_friendrecommendation_computed_at ON friendrecommendation (computed_at);
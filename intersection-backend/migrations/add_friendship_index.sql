@@ -0,0 +1,5 @@
+-- 친구 목록 / 함께 아는 친구 계산(self-join)용 인덱스
+-- PostgreSQL에서 실행: psql -U postgres -d intersection -f migrations/add_friendship_index.sql
+
+CREATE INDEX IF NOT EXISTS ix_userfriendship_user_friend
+ON userfriendship (user_id, friend_user_id);
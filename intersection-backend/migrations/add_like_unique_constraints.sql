@@ -0,0 +1,22 @@
+-- 좋아요 중복 방지를 위한 유니크 제약 추가
+-- PostgreSQL에서 실행: psql -U postgres -d intersection -f migrations/add_like_unique_constraints.sql
+
+-- 1. 기존 중복 좋아요 정리 (가장 먼저 생성된 행만 유지)
+DELETE FROM postlike a
+USING postlike b
+WHERE a.user_id = b.user_id
+  AND a.post_id = b.post_id
+  AND a.id > b.id;
+
+DELETE FROM commentlike a
+USING commentlike b
+WHERE a.user_id = b.user_id
+  AND a.comment_id = b.comment_id
+  AND a.id > b.id;
+
+-- 2. 유니크 제약 추가 (ON CONFLICT DO NOTHING 의 기준)
+ALTER TABLE postlike
+ADD CONSTRAINT uq_postlike_user_post UNIQUE (user_id, post_id);
+
+ALTER TABLE commentlike
+ADD CONSTRAINT uq_commentlike_user_comment UNIQUE (user_id, comment_id);
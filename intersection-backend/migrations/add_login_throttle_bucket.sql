@@ -0,0 +1,10 @@
+-- 로그인 시도 제한 버킷 (app/rate_limit.py, LOGIN_THROTTLE_BACKEND=database 일 때만 사용)
+-- PostgreSQL에서 실행: psql -U postgres -d intersection -f migrations/add_login_throttle_bucket.sql
+
+CREATE TABLE IF NOT EXISTS loginthrottlebucket (
+    key VARCHAR NOT NULL PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    updated_at DOUBLE PRECISION NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_loginthrottlebucket_updated_at ON loginthrottlebucket (updated_at);
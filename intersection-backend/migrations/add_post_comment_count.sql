@@ -0,0 +1,15 @@
+-- 게시글 댓글 수 컬럼 추가 (목록 조회 시 COUNT 제거)
+-- PostgreSQL에서 실행: psql -U postgres -d intersection -f migrations/add_post_comment_count.sql
+
+ALTER TABLE post
+ADD COLUMN IF NOT EXISTS comment_count INTEGER NOT NULL DEFAULT 0;
+
+-- 기존 댓글 수로 초기화 (이후 어긋나면 scripts/reconcile_comment_counts.py)
+UPDATE post
+SET comment_count = counts.cnt
+FROM (
+    SELECT post_id, COUNT(*) AS cnt
+    FROM comment
+    GROUP BY post_id
+) AS counts
+WHERE post.id = counts.post_id;
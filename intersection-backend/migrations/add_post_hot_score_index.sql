@@ -0,0 +1,5 @@
+-- 인기순 피드 DB 정렬(랭커에서 못 채운 깊은 페이지)용 인덱스
+-- PostgreSQL에서 실행: psql -U postgres -d intersection -f migrations/add_post_hot_score_index.sql
+
+CREATE INDEX IF NOT EXISTS ix_posthotscore_score
+ON posthotscore (score);
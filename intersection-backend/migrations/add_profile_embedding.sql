@@ -0,0 +1,10 @@
+-- 사용자 프로필 임베딩 저장 테이블 (app/embeddings.py, float32 바이트열)
+-- PostgreSQL에서 실행: psql -U postgres -d intersection -f migrations/add_profile_embedding.sql
+
+CREATE TABLE IF NOT EXISTS profileembedding (
+    user_id INTEGER PRIMARY KEY,
+    model VARCHAR NOT NULL,
+    doc_hash VARCHAR NOT NULL,
+    vector BYTEA NOT NULL,
+    updated_at TIMESTAMP NOT NULL
+);
@@ -0,0 +1,10 @@
+-- 추천 친구 후보군(같은 학교 / 지역 / 입학년도 ±3) 조회용 인덱스
+-- PostgreSQL에서 실행: psql -U postgres -d intersection -f migrations/add_user_recommendation_indexes.sql
+
+CREATE INDEX IF NOT EXISTS ix_user_school_name ON "user" (school_name);
+CREATE INDEX IF NOT EXISTS ix_user_region ON "user" (region);
+CREATE INDEX IF NOT EXISTS ix_user_admission_year ON "user" (admission_year);
+
+-- schools @> '[{"name": "..."}]' 검색용 GIN 인덱스
+-- (add_schools_jsonb_column.sql 을 이미 실행했다면 건너뜀)
+CREATE INDEX IF NOT EXISTS idx_user_schools ON "user" USING GIN (schools);
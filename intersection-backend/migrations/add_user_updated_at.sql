@@ -0,0 +1,12 @@
+-- 사용자 프로필 변경 시각 컬럼 추가 (ETag 버전 스탬프용)
+-- PostgreSQL에서 실행: psql -U postgres -d intersection -f migrations/add_user_updated_at.sql
+
+ALTER TABLE "user"
+ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+
+-- 기존 사용자는 가입 시각으로 채움
+UPDATE "user" SET updated_at = created_at WHERE updated_at IS NULL;
+
+-- 스탬프 계산 시 MAX(updated_at) 를 인덱스로 처리
+CREATE INDEX IF NOT EXISTS ix_user_updated_at ON "user" (updated_at);
+CREATE INDEX IF NOT EXISTS ix_post_updated_at ON post (updated_at);
@@ -0,0 +1,143 @@
+"""
+추천 친구 점수 계산 벤치마크 (Python 루프 vs NumPy 벡터화)
+
+사용자마다 점수를 매기는 Python 루프 + 전체 정렬과
+friend_scoring.score_candidates + argpartition top-k 를 같은 가상 사용자로 비교하고,
+두 방식의 상위 k명이 완전히 같은지도 확인합니다. (DB 불필요)
+
+사용 방법 (intersection-backend 폴더에서):
+  python scripts/bench_friend_scoring.py                 # 10,000 / 100,000 / 1,000,000명
+  python scripts/bench_friend_scoring.py 10000 50000     # 원하는 규모만
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+# 프로젝트 루트 경로 설정 (app 패키지 import 용)
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.friend_scoring import (  # noqa: E402
+    ADMISSION_POINTS,
+    BIRTH_POINTS,
+    GENDER_POINTS,
+    IMAGE_POINTS,
+    REGION_POINTS,
+    SCHOOL_NAME_POINTS,
+    SCHOOL_TYPE_POINTS,
+    CandidateArrays,
+    score_candidates,
+    top_k_indices,
+)
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+TOP_K = 20
+
+SCHOOLS = [f"{name}{kind}" for name in ("가람", "나래", "다솜", "라온", "마루", "바다", "새봄", "아라")
+           for kind in ("초등학교", "중학교", "고등학교")]
+SCHOOL_TYPES = ["초등학교", "중학교", "고등학교", "대학교"]
+REGIONS = ["서울", "부산", "대구", "인천", "광주", "대전", "울산", "세종", "경기", "강원"]
+GENDERS = ["M", "F"]
+
+
+class FakeUser:
+    """User 모델 대신 쓰는 가벼운 객체 (점수 계산에 필요한 속성만)"""
+
+    __slots__ = (
+        "id", "school_name", "school_type", "admission_year",
+        "region", "birth_year", "gender", "profile_image",
+    )
+
+    def __init__(self, user_id: int, rng: random.Random):
+        self.id = user_id
+        # 일부 값은 비워서 None 처리 경로도 함께 확인
+        self.school_name = rng.choice(SCHOOLS) if rng.random() > 0.1 else None
+        self.school_type = rng.choice(SCHOOL_TYPES) if rng.random() > 0.1 else None
+        self.admission_year = rng.randint(2000, 2024) if rng.random() > 0.1 else None
+        self.region = rng.choice(REGIONS) if rng.random() > 0.1 else None
+        self.birth_year = rng.randint(1985, 2015) if rng.random() > 0.1 else None
+        self.gender = rng.choice(GENDERS) if rng.random() > 0.1 else None
+        self.profile_image = "/static/p.jpg" if rng.random() > 0.5 else None
+
+
+def python_score(me, other) -> int:
+    """score_candidates 와 같은 규칙을 한 명씩 계산 (비교 기준)"""
+    score = 0
+    if me.school_name and me.school_name == other.school_name:
+        score += SCHOOL_NAME_POINTS
+    if me.school_type and me.school_type == other.school_type:
+        score += SCHOOL_TYPE_POINTS
+    if me.admission_year and other.admission_year:
+        diff = abs(me.admission_year - other.admission_year)
+        exact, near, window = ADMISSION_POINTS
+        if diff == 0:
+            score += exact
+        elif diff == 1:
+            score += near
+        elif diff <= 3:
+            score += window
+    if me.region and me.region == other.region:
+        score += REGION_POINTS
+    if me.birth_year and other.birth_year:
+        diff = abs(me.birth_year - other.birth_year)
+        exact, near = BIRTH_POINTS
+        if diff == 0:
+            score += exact
+        elif diff <= 2:
+            score += near
+    if me.gender and me.gender == other.gender:
+        score += GENDER_POINTS
+    if other.profile_image:
+        score += IMAGE_POINTS
+    return score
+
+
+def python_top_k(me, users, k):
+    scored = [(python_score(me, u), u) for u in users]
+    scored.sort(key=lambda x: x[0], reverse=True)
+    return [u.id for score, u in scored if score > 0][:k], [s for s, _ in scored]
+
+
+def numpy_top_k(me, arrays, users, k):
+    scores = score_candidates(me, arrays)
+    return [users[i].id for i in top_k_indices(scores, k)], scores
+
+
+def run(size: int) -> None:
+    rng = random.Random(size)
+    users = [FakeUser(i + 1, rng) for i in range(size)]
+    me = FakeUser(0, rng)
+
+    t0 = time.perf_counter()
+    expected, _ = python_top_k(me, users, TOP_K)
+    python_sec = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    arrays = CandidateArrays(users)
+    encode_sec = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    actual, _ = numpy_top_k(me, arrays, users, TOP_K)
+    numpy_sec = time.perf_counter() - t0
+
+    # 점수 배열 전체도 일치하는지 확인
+    python_scores = [python_score(me, u) for u in users[:10_000]]
+    numpy_scores = score_candidates(me, CandidateArrays(users[:10_000])).tolist()
+
+    same = expected == actual and python_scores == numpy_scores
+    print(
+        f"{size:>10,}명 | python {python_sec * 1000:9.1f} ms"
+        f" | numpy 인코딩 {encode_sec * 1000:9.1f} ms + 점수/top-k {numpy_sec * 1000:7.1f} ms"
+        f" | x{python_sec / max(numpy_sec, 1e-9):6.1f} | 결과 {'일치 ✅' if same else '불일치 ❌'}"
+    )
+    if not same:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print(f"상위 {TOP_K}명 추천 점수 계산 (인코딩은 후보 배열을 캐시하면 요청마다 반복되지 않음)")
+    for size in sizes:
+        run(size)
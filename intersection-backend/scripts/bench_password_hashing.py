@@ -0,0 +1,148 @@
+"""
+비밀번호 해시(Argon2) 벤치마크
+
+현재(또는 옵션으로 지정한) Argon2 비용으로
+- 해시 1번 / 검증 1번 소요 시간
+- 전용 해시 풀 스레드 수별 초당 로그인(검증) 처리량과 코어당 처리량
+- 대기열을 넘는 요청이 몰릴 때 거절(503) 수와 거절까지 걸리는 시간
+을 출력합니다. ARGON2_* 값을 정할 때 "코어당 초당 로그인 수"를 기준으로 비교하면 됩니다.
+
+사용 방법 (intersection-backend 폴더에서):
+  python scripts/bench_password_hashing.py
+  python scripts/bench_password_hashing.py --seconds 10 --workers 1 --workers 4
+  python scripts/bench_password_hashing.py --time-cost 2 --memory-cost 19456 --parallelism 1
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+# 프로젝트 루트 경로 설정 (app 패키지 import 용)
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="비밀번호 해시(Argon2) 벤치마크")
+    parser.add_argument("--seconds", type=float, default=5, help="스레드 수별 처리량 측정 시간(초)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        action="append",
+        default=[],
+        help="측정할 해시 풀 스레드 수 (여러 번 지정 가능, 기본: 1 과 CPU 코어 수)",
+    )
+    parser.add_argument("--time-cost", type=int, default=None, help="ARGON2_TIME_COST 대신 사용")
+    parser.add_argument("--memory-cost", type=int, default=None, help="ARGON2_MEMORY_COST(KiB) 대신 사용")
+    parser.add_argument("--parallelism", type=int, default=None, help="ARGON2_PARALLELISM 대신 사용")
+    return parser.parse_args()
+
+
+args = parse_args()
+
+# app 설정은 import 시점에 읽으므로 먼저 지정
+for env_name, value in [
+    ("ARGON2_TIME_COST", args.time_cost),
+    ("ARGON2_MEMORY_COST", args.memory_cost),
+    ("ARGON2_PARALLELISM", args.parallelism),
+]:
+    if value is not None:
+        os.environ[env_name] = str(value)
+
+from app.config import settings  # noqa: E402
+from app.auth import (  # noqa: E402
+    PasswordHasher,
+    PasswordHashingBusy,
+    get_password_hash,
+    verify_and_update_password,
+)
+
+PASSWORD = "bench-password-1234"
+
+
+def single_call_ms(fn, repeat: int = 5) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def logins_per_second(workers: int, hashed: str) -> float:
+    """workers 개 스레드 풀에 클라이언트 2배수로 계속 검증 요청 → 초당 완료 수"""
+    hasher = PasswordHasher(workers=workers, queue_size=workers * 2)
+    deadline = time.perf_counter() + args.seconds
+    done = [0]
+    lock = threading.Lock()
+
+    def client():
+        while time.perf_counter() < deadline:
+            verified, _ = hasher.submit(verify_and_update_password, PASSWORD, hashed).result()
+            assert verified
+            with lock:
+                done[0] += 1
+
+    started = time.perf_counter()
+    clients = [threading.Thread(target=client) for _ in range(workers * 2)]
+    for t in clients:
+        t.start()
+    for t in clients:
+        t.join()
+    elapsed = time.perf_counter() - started
+    hasher.shutdown()
+    return done[0] / elapsed
+
+
+def overload(hashed: str) -> None:
+    """설정된 스레드 수 / 대기열 크기에서 한꺼번에 몰린 요청 중 몇 개가 바로 거절되는지"""
+    workers, queue_size = settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE_SIZE
+    hasher = PasswordHasher(workers=workers, queue_size=queue_size)
+    burst = (workers + queue_size) * 2
+    futures, reject_ms = [], []
+    for _ in range(burst):
+        started = time.perf_counter()
+        try:
+            futures.append(hasher.submit(verify_and_update_password, PASSWORD, hashed))
+        except PasswordHashingBusy:
+            reject_ms.append((time.perf_counter() - started) * 1000)
+    started = time.perf_counter()
+    for f in futures:
+        f.result()
+    drain_sec = time.perf_counter() - started
+    hasher.shutdown()
+
+    print(
+        f"🚦 동시 요청 {burst}개 (스레드 {workers} / 대기열 {queue_size}): "
+        f"수락 {len(futures)}개 → {drain_sec:.2f}s 에 처리, 거절 {len(reject_ms)}개 "
+        f"(거절까지 최대 {max(reject_ms, default=0):.3f}ms)"
+    )
+
+
+def main() -> None:
+    cores = os.cpu_count() or 1
+    worker_counts = args.workers or sorted({1, cores})
+    print(
+        f"🔐 Argon2 time_cost={settings.ARGON2_TIME_COST} memory_cost={settings.ARGON2_MEMORY_COST}KiB "
+        f"parallelism={settings.ARGON2_PARALLELISM} / CPU 코어 {cores}개"
+    )
+
+    hashed = get_password_hash(PASSWORD)
+    print(f"⏱️  해시 1번 {single_call_ms(lambda: get_password_hash(PASSWORD)):.1f}ms / "
+          f"검증 1번 {single_call_ms(lambda: verify_and_update_password(PASSWORD, hashed)):.1f}ms\n")
+
+    print(f"{'스레드':>6}  {'로그인/초':>10}  {'코어당 로그인/초':>16}")
+    for workers in worker_counts:
+        rate = logins_per_second(workers, hashed)
+        print(f"{workers:>6}  {rate:>10.1f}  {rate / min(workers, cores):>16.1f}")
+    print()
+
+    overload(hashed)
+
+
+if __name__ == "__main__":
+    main()
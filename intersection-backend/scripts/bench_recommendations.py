@@ -0,0 +1,301 @@
+"""
+추천 친구 벤치마크 + 오프라인 평가
+
+가상 한국 사용자(학교 / 지역 / 입학년도 / 친구 관계)를 원하는 규모로 SQLite 에 만들고,
+친구 관계 일부(--holdout)를 숨긴 채 각 추천 경로를 실행해서
+- 요청당 전체 소요 시간 (p50 / p95) 과 파이프라인 단계별 평균 시간
+- 숨긴 친구 관계 기준 precision@k / recall@k
+를 출력합니다. 코드나 가중치를 바꾼 뒤 같은 --seed 로 다시 돌려 비교하면 됩니다.
+
+평가 경로
+  rule / content           : recommendation_pipeline (요청마다 후보군 캐시 비움)
+  rule+content             : 두 목록을 이어서 계산 (후보군 공유, 실제 저장소 갱신과 같음)
+  store.rule / store.content: 저장된 목록 조회 (recommendation_store hit)
+  content[가중치]          : --content-weights 로 준 가중치 조합 (여러 번 지정 가능)
+
+사용 방법 (intersection-backend 폴더에서):
+  python scripts/bench_recommendations.py
+  python scripts/bench_recommendations.py --users 20000 --queries 300 --k 20
+  python scripts/bench_recommendations.py --content-weights "tfidf:5,mutual_friends:1.5,embedding:2"
+
+※ 개발 DB 는 건드리지 않습니다. (--db 파일을 매번 새로 만듦, 임베딩은 local 제공자)
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+# 프로젝트 루트 경로 설정 (app 패키지 import 용)
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+SURNAMES = "김이박최정강조윤장임한오서신권황안송류홍"
+GIVEN = ["민준", "서연", "지호", "하은", "도윤", "서준", "지우", "수아", "예준", "지민", "현우", "유진", "준서", "채원"]
+REGION_SCHOOLS = {
+    "서울": ["한빛", "가람", "누리"],
+    "부산": ["해운", "바다", "동백"],
+    "대구": ["달구벌", "팔공"],
+    "인천": ["미추홀", "송도"],
+    "광주": ["무등", "빛고을"],
+    "대전": ["한밭", "유성"],
+    "경기": ["수원", "성남", "고양", "용인"],
+    "강원": ["춘천", "강릉"],
+}
+# 학교 유형 → (이름 접미사, 입학 나이)
+SCHOOL_KINDS = {"초등학교": ("초등학교", 7), "중학교": ("중학교", 13), "고등학교": ("고등학교", 16)}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="추천 친구 벤치마크 + 오프라인 평가")
+    parser.add_argument("--users", type=int, default=5000, help="가상 사용자 수")
+    parser.add_argument("--avg-friends", type=float, default=12, help="사용자당 평균 친구 수")
+    parser.add_argument("--holdout", type=float, default=0.2, help="평가용으로 숨길 친구 관계 비율")
+    parser.add_argument("--queries", type=int, default=200, help="평가할 사용자 수")
+    parser.add_argument("--k", type=int, default=20, help="추천 인원 (precision@k)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--db",
+        default=os.path.join(tempfile.gettempdir(), "bench_recommendations.db"),
+        help="SQLite 파일 경로 (매번 새로 생성)",
+    )
+    parser.add_argument(
+        "--content-weights",
+        action="append",
+        default=[],
+        help='추가로 평가할 content 가중치 (예: "tfidf:5,mutual_friends:1.5,embedding:2")',
+    )
+    return parser.parse_args()
+
+
+args = parse_args()
+
+# app 설정은 import 시점에 읽으므로 먼저 벤치마크용으로 지정
+if os.path.exists(args.db):
+    os.remove(args.db)
+os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+os.environ["PROFILE_INDEX_PATH"] = args.db + ".profile_index.pkl"
+os.environ["EMBEDDING_PROVIDER"] = "local"
+
+import numpy as np  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from sqlmodel import Session, select  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.db import engine, create_db_and_tables  # noqa: E402
+from app.models import User, UserFriendship  # noqa: E402
+from app.profile_index import profile_index  # noqa: E402
+from app.social_graph import social_graph  # noqa: E402
+from app.embeddings import embedding_index, backfill_embeddings  # noqa: E402
+from app.recommendation_pipeline import (  # noqa: E402
+    RecommendationPipeline, rule_pipeline, content_pipeline, clear_candidate_pool_cache,
+)
+from app.recommendation_store import recommendation_store  # noqa: E402
+import app.services  # noqa: E402,F401  (content 추천 등록)
+import app.routers.friends  # noqa: E402,F401  (rule 추천 등록)
+
+
+# -----------------------------------------------------
+# 가상 사용자 / 친구 관계
+# -----------------------------------------------------
+def make_users(rng: random.Random, n: int) -> list:
+    rows = []
+    for i in range(n):
+        region = rng.choice(list(REGION_SCHOOLS))
+        birth_year = rng.randint(1990, 2008)
+        school_type = rng.choice(list(SCHOOL_KINDS))
+        suffix, entry_age = SCHOOL_KINDS[school_type]
+        # 10% 는 다른 지역 학교 출신 (이사)
+        school_region = region if rng.random() > 0.1 else rng.choice(list(REGION_SCHOOLS))
+        rows.append({
+            "login_id": f"bench{i + 1}",
+            "name": rng.choice(SURNAMES) + rng.choice(GIVEN),
+            "birth_year": birth_year,
+            "gender": rng.choice(["M", "F"]),
+            "region": region,
+            "school_name": rng.choice(REGION_SCHOOLS[school_region]) + suffix,
+            "school_type": school_type,
+            "admission_year": birth_year + entry_age,
+            "profile_image": "/static/p.jpg" if rng.random() > 0.5 else None,
+        })
+    return rows
+
+
+def make_friendships(rng: random.Random, users: list, avg_friends: float) -> set:
+    """
+    같은 학교·입학년도(±1) 60% / 같은 지역 25% / 무작위 15% 로 친구 관계 생성.
+    반환: {(작은 id, 큰 id)}
+    """
+    cohort = defaultdict(list)
+    by_region = defaultdict(list)
+    for user_id, u in enumerate(users, start=1):
+        cohort[(u["school_name"], u["admission_year"])].append(user_id)
+        by_region[u["region"]].append(user_id)
+
+    n = len(users)
+    edges = set()
+    for user_id, u in enumerate(users, start=1):
+        for _ in range(max(1, int(rng.expovariate(1 / (avg_friends / 2))))):
+            roll = rng.random()
+            if roll < 0.6:
+                year = u["admission_year"] + rng.choice([0, 0, 0, -1, 1])
+                pool = cohort.get((u["school_name"], year)) or cohort[(u["school_name"], u["admission_year"])]
+            elif roll < 0.85:
+                pool = by_region[u["region"]]
+            else:
+                pool = None
+            other = rng.choice(pool) if pool else rng.randint(1, n)
+            if other != user_id:
+                edges.add((min(user_id, other), max(user_id, other)))
+    return edges
+
+
+def build_database(rng: random.Random):
+    """DB 생성 → (숨긴 친구 {user_id: {friend_id}}, 저장한 관계 수)"""
+    create_db_and_tables()
+    users = make_users(rng, args.users)
+    edges = sorted(make_friendships(rng, users, args.avg_friends))
+    rng.shuffle(edges)
+    n_holdout = int(len(edges) * args.holdout)
+    held, kept = edges[:n_holdout], edges[n_holdout:]
+
+    with Session(engine) as session:
+        session.execute(insert(User), users)
+        session.execute(insert(UserFriendship), [
+            {"user_id": a, "friend_user_id": b, "status": "accepted"}
+            for x, y in kept for a, b in ((x, y), (y, x))
+        ])
+        session.commit()
+
+    hidden = defaultdict(set)
+    for a, b in held:
+        hidden[a].add(b)
+        hidden[b].add(a)
+    return hidden, len(kept)
+
+
+# -----------------------------------------------------
+# 측정
+# -----------------------------------------------------
+class PathResult:
+    def __init__(self, name: str):
+        self.name = name
+        self.totals = []
+        self.stages = defaultdict(list)
+        self.precision = []
+        self.recall = []
+
+    def add(self, seconds: float, recommended: list, hidden: set, k: int, timings=None) -> None:
+        self.totals.append(seconds)
+        for stage, value in (timings or {}).items():
+            if stage != "total":
+                self.stages[stage].append(value)
+        if recommended is not None:
+            hits = len(set(recommended[:k]) & hidden)
+            self.precision.append(hits / k)
+            self.recall.append(hits / len(hidden))
+
+    def report(self) -> None:
+        ms = np.array(self.totals) * 1000
+        quality = (
+            f" | precision@{args.k} {statistics.mean(self.precision):.3f}"
+            f" | recall@{args.k} {statistics.mean(self.recall):.3f}"
+        ) if self.precision else ""
+        print(
+            f"{self.name:<34} | p50 {np.percentile(ms, 50):8.2f} ms | p95 {np.percentile(ms, 95):8.2f} ms"
+            f"{quality}"
+        )
+        if self.stages:
+            stages = ", ".join(
+                f"{stage} {statistics.mean(values) * 1000:.2f}" for stage, values in self.stages.items()
+            )
+            print(f"{'':<34}   단계별 평균(ms): {stages}")
+
+
+def run_pipeline(result: PathResult, pipeline: RecommendationPipeline, session, user, hidden) -> None:
+    clear_candidate_pool_cache()
+    started = time.perf_counter()
+    users, timings = pipeline.run_with_timings(session, user, args.k)
+    result.add(time.perf_counter() - started, [u.id for u in users], hidden, args.k, timings)
+
+
+def main() -> None:
+    rng = random.Random(args.seed)
+
+    t0 = time.perf_counter()
+    hidden, n_edges = build_database(rng)
+    print(f"🏗️  사용자 {args.users:,}명 / 친구 관계 {n_edges:,}쌍 (숨김 {sum(map(len, hidden.values())) // 2:,}쌍)"
+          f" 생성 {time.perf_counter() - t0:.1f}s → {args.db}")
+
+    # 서버 startup 과 같은 인메모리 인덱스 준비
+    with Session(engine) as session:
+        t0 = time.perf_counter()
+        social_graph.load(session)
+        graph_sec = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        profile_index.rebuild(session)
+        tfidf_sec = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        backfill_embeddings(list(session.exec(select(User.id)).all()))
+        embedding_index.load(session)
+        embed_sec = time.perf_counter() - t0
+    print(f"📦 준비: 친구 그래프 {graph_sec:.2f}s / TF-IDF {tfidf_sec:.2f}s / 임베딩 {embed_sec:.2f}s\n")
+
+    query_ids = sorted(hidden)
+    rng.shuffle(query_ids)
+    query_ids = query_ids[:args.queries]
+
+    variants = [(weights, RecommendationPipeline("content", require_name=True)) for weights in args.content_weights]
+    results = {name: PathResult(name) for name in (
+        "rule", "content", "rule+content (후보군 공유)", "store.rule (저장 목록 hit)", "store.content (저장 목록 hit)",
+    )}
+    for weights, _ in variants:
+        results[f"content[{weights}]"] = PathResult(f"content[{weights}]")
+
+    default_content_weights = settings.RECOMMENDATION_CONTENT_WEIGHTS
+    with Session(engine) as session:
+        for user_id in query_ids:
+            user = session.get(User, user_id)
+            truth = hidden[user_id]
+
+            run_pipeline(results["rule"], rule_pipeline, session, user, truth)
+            run_pipeline(results["content"], content_pipeline, session, user, truth)
+
+            clear_candidate_pool_cache()
+            started = time.perf_counter()
+            _, rule_timings = rule_pipeline.run_with_timings(session, user, args.k)
+            _, content_timings = content_pipeline.run_with_timings(session, user, args.k)
+            shared = {
+                f"{kind}.{stage}": value
+                for kind, timings in (("rule", rule_timings), ("content", content_timings))
+                for stage, value in timings.items() if stage in ("exclude", "candidates")
+            }
+            results["rule+content (후보군 공유)"].add(time.perf_counter() - started, None, truth, args.k, shared)
+
+            for kind in ("rule", "content"):
+                recommendation_store.get(session, user, kind)  # 저장 (miss)
+                started = time.perf_counter()
+                stored = recommendation_store.get(session, user, kind)
+                results[f"store.{kind} (저장 목록 hit)"].add(
+                    time.perf_counter() - started, [u.id for u in stored], truth, args.k
+                )
+
+            for weights, pipeline in variants:
+                settings.RECOMMENDATION_CONTENT_WEIGHTS = weights
+                try:
+                    run_pipeline(results[f"content[{weights}]"], pipeline, session, user, truth)
+                finally:
+                    settings.RECOMMENDATION_CONTENT_WEIGHTS = default_content_weights
+
+    print(f"🔎 평가 사용자 {len(query_ids)}명, k={args.k}")
+    for result in results.values():
+        result.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+로컬 테스트용 가짜 Azure OpenAI 서버
+
+실제 Azure 를 호출하지 않고 추천 이유/첫 메시지(chat completions)와
+임베딩(embeddings) 응답을 흉내 냅니다. stream=true 요청은 SSE 청크로 나눠 보냅니다.
+--delay 로 응답 지연을 줘서 AI_LATENCY_BUDGET_SECONDS 를 넘는 경우
+(규칙 기반 fallback + 백그라운드 완료)를 확인할 수 있습니다.
+
+사용 방법 (intersection-backend 폴더에서):
+  python scripts/fake_azure_openai.py --port 8765 --delay 3
+
+  # 다른 터미널에서 서버 실행
+  AZURE_OPENAI_ENDPOINT=http://127.0.0.1:8765 AZURE_OPENAI_API_KEY=fake \
+  AZURE_OPENAI_CHAT_DEPLOYMENT=fake-chat AZURE_OPENAI_EMBEDDING_DEPLOYMENT=fake-embed \
+  uvicorn app.main:app --reload
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+_CHAT_PATH = re.compile(r"^/openai/deployments/([^/]+)/chat/completions$")
+_EMBED_PATH = re.compile(r"^/openai/deployments/([^/]+)/embeddings$")
+# 스트리밍 응답 청크 하나에 담을 글자 수
+STREAM_CHUNK_CHARS = 16
+
+
+def _payload_from(messages) -> dict:
+    """user 프롬프트 안의 payload JSON 추출"""
+    for message in reversed(messages):
+        if message.get("role") != "user":
+            continue
+        start = message["content"].find("{")
+        if start < 0:
+            continue
+        try:
+            return json.loads(message["content"][start:])
+        except json.JSONDecodeError:
+            continue
+    return {}
+
+
+def fake_recommendations(messages) -> dict:
+    payload = _payload_from(messages)
+    if "requests" in payload:
+        # 여러 사용자 묶음 요청 (app/ai_precompute.py)
+        return {"results": [
+            {"me_id": request["me"]["id"], **_recommend(request.get("candidates", []))}
+            for request in payload["requests"]
+        ]}
+    return _recommend(payload.get("candidates", []))
+
+
+def _recommend(candidates: list) -> dict:
+    recommendations = []
+    for candidate in candidates:
+        name = candidate.get("name") or "친구"
+        school = candidate.get("school_name") or "같은 동네"
+        recommendations.append({
+            "user_id": candidate.get("id"),
+            "reason": f"{school} 출신이라 공통 관심사가 많을 것 같아요.",
+            "first_messages": [
+                f"{name}님 안녕하세요! 프로필 보고 반가워서 연락드려요.",
+                f"혹시 {school} 다니셨어요?",
+            ],
+        })
+    return {"recommendations": recommendations}
+
+
+def fake_embedding(text: str, dimensions: int) -> list:
+    # 같은 입력 → 같은 벡터
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).normal(size=dimensions)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class FakeAzureHandler(BaseHTTPRequestHandler):
+    delay = 0.0
+    chunk_delay = 0.0
+
+    def _send_json(self, status: int, body: dict) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, model: str, content: str) -> None:
+        """SSE 로 content 를 STREAM_CHUNK_CHARS 글자씩 나눠 전송 (청크 사이 chunk_delay)"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        created = int(time.time())
+
+        def _event(delta: dict, finish_reason=None, choices=True) -> None:
+            chunk = {
+                "id": f"chatcmpl-fake-{created}",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if choices else [],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        # Azure 처럼 choices 가 빈 청크(콘텐츠 필터 결과)를 먼저 보냄
+        _event({}, choices=False)
+        _event({"role": "assistant", "content": ""})
+        for i in range(0, len(content), STREAM_CHUNK_CHARS):
+            if self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            _event({"content": content[i:i + STREAM_CHUNK_CHARS]})
+        _event({}, finish_reason="stop")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0]
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.delay:
+            time.sleep(self.delay)
+
+        chat = _CHAT_PATH.match(path)
+        if chat:
+            content = json.dumps(fake_recommendations(body.get("messages", [])), ensure_ascii=False)
+            if body.get("stream"):
+                self._send_stream(chat.group(1), content)
+                return
+            self._send_json(200, {
+                "id": f"chatcmpl-fake-{int(time.time() * 1000)}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": chat.group(1),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+            return
+
+        embed = _EMBED_PATH.match(path)
+        if embed:
+            inputs = body.get("input", [])
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            dimensions = int(body.get("dimensions") or 256)
+            self._send_json(200, {
+                "object": "list",
+                "model": embed.group(1),
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": fake_embedding(text, dimensions)}
+                    for i, text in enumerate(inputs)
+                ],
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            })
+            return
+
+        self._send_json(404, {"error": {"code": "NotFound", "message": path}})
+
+    def log_message(self, fmt, *args):
+        print(f"[fake-azure] {self.address_string()} {fmt % args}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="가짜 Azure OpenAI 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="응답 지연(초)")
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="스트리밍 청크 간격(초)")
+    args = parser.parse_args()
+
+    FakeAzureHandler.delay = args.delay
+    FakeAzureHandler.chunk_delay = args.chunk_delay
+    server = ThreadingHTTPServer((args.host, args.port), FakeAzureHandler)
+    print(f"🤖 Fake Azure OpenAI: http://{args.host}:{args.port} (delay={args.delay}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
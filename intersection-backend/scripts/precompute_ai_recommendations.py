@@ -0,0 +1,45 @@
+"""
+AI 친구 추천 이유 배치 생성 스크립트
+
+저장된 규칙 기반 추천 목록이 바뀐 사용자들의 추천 이유 / 첫 메시지를
+여러 명씩 묶어 미리 생성해 AIRecommendationText 에 저장합니다.
+/friends/recommendations/ai 요청은 저장된 결과를 먼저 사용하므로
+피크 시간 전에 (예: 새벽 cron) 실행해 두면 모델 호출이 거의 없어집니다.
+
+동시 호출 수 / 분당 토큰 / 한 번에 묶을 후보 수는 .env 의
+AI_PRECOMPUTE_CONCURRENCY / AI_PRECOMPUTE_TOKENS_PER_MINUTE / AI_PRECOMPUTE_BATCH_CANDIDATES 로 조절합니다.
+
+사용 방법 (intersection-backend 폴더에서):
+  python scripts/precompute_ai_recommendations.py
+  python scripts/precompute_ai_recommendations.py --max-users 500
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# 프로젝트 루트 경로 설정 (app 패키지 import 용)
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.db import create_db_and_tables  # noqa: E402
+from app.ai_precompute import precompute_ai_recommendations  # noqa: E402
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AI 친구 추천 이유 배치 생성")
+    parser.add_argument("--max-users", type=int, default=None, help="이번 실행에서 처리할 최대 사용자 수")
+    args = parser.parse_args()
+
+    create_db_and_tables()
+    started = time.perf_counter()
+    stats = asyncio.run(precompute_ai_recommendations(max_users=args.max_users))
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"✅ 대상 {stats['users']}명 (변경 없음 {stats['up_to_date']}명) / "
+        f"호출 {stats['calls']}번 / 저장 {stats['stored']}건 / 실패 {stats['failed_users']}명 "
+        f"({elapsed:.1f}초)"
+    )
@@ -0,0 +1,30 @@
+"""
+인기(hot) 피드 점수 전체 재계산 스크립트
+
+저장 주기 사이에 서버가 비정상 종료되는 등으로 PostHotScore 와 원본 데이터 사이에
+오차가 생겼을 때, 게시글/좋아요/댓글 원본으로 점수를 다시 계산해 저장합니다.
+
+사용 방법 (intersection-backend 폴더에서):
+  python scripts/rebuild_hot_scores.py
+
+※ 실행 중인 서버는 다음 저장 주기(HOT_FLUSH_INTERVAL_SECONDS)에 새 점수를 읽어 갑니다.
+"""
+
+import sys
+from pathlib import Path
+
+# 프로젝트 루트 경로 설정 (app 패키지 import 용)
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from sqlmodel import Session  # noqa: E402
+
+from app.db import engine, create_db_and_tables  # noqa: E402
+from app.ranking import HotRanker  # noqa: E402
+
+
+if __name__ == "__main__":
+    create_db_and_tables()
+    with Session(engine) as session:
+        count = HotRanker().rebuild(session)
+    print(f"✅ {count}개 게시글의 인기 점수를 다시 계산했습니다.")
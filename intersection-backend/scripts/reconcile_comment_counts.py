@@ -0,0 +1,61 @@
+"""
+게시글 댓글 수(Post.comment_count) 재계산 스크립트
+
+댓글 작성/삭제 시 comment_count 를 함께 갱신하지만, DB 를 직접 수정했거나
+마이그레이션 이전 데이터가 있으면 실제 댓글 수와 어긋날 수 있습니다.
+이 스크립트는 Comment 테이블 기준으로 다시 세어 다른 값만 고칩니다.
+
+사용 방법 (intersection-backend 폴더에서):
+  python scripts/reconcile_comment_counts.py           # 수정
+  python scripts/reconcile_comment_counts.py --dry-run # 어긋난 게시글만 출력
+"""
+
+import sys
+from pathlib import Path
+
+# 프로젝트 루트 경로 설정 (app 패키지 import 용)
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from sqlalchemy import func, update  # noqa: E402
+from sqlmodel import Session, select  # noqa: E402
+
+from app.db import engine, create_db_and_tables  # noqa: E402
+from app.models import Post, Comment  # noqa: E402
+
+
+def reconcile_comment_counts(session: Session, dry_run: bool = False) -> int:
+    """실제 댓글 수와 다른 게시글을 찾아 고치고, 고친 게시글 수 반환"""
+    actual = (
+        select(func.count(Comment.id))
+        .where(Comment.post_id == Post.id)
+        .correlate(Post)
+        .scalar_subquery()
+    )
+    drifted = session.exec(
+        select(Post.id, Post.comment_count, actual).where(Post.comment_count != actual)
+    ).all()
+
+    for post_id, stored, real in drifted:
+        print(f"  - post {post_id}: {stored} → {real}")
+
+    if drifted and not dry_run:
+        session.exec(
+            update(Post)
+            .where(Post.id.in_([post_id for post_id, _, _ in drifted]))
+            .values(comment_count=actual)
+        )
+        session.commit()
+
+    return len(drifted)
+
+
+if __name__ == "__main__":
+    dry_run = "--dry-run" in sys.argv
+    create_db_and_tables()
+    with Session(engine) as session:
+        count = reconcile_comment_counts(session, dry_run=dry_run)
+    if dry_run:
+        print(f"🔍 댓글 수가 어긋난 게시글: {count}개")
+    else:
+        print(f"✅ {count}개 게시글의 댓글 수를 바로잡았습니다.")
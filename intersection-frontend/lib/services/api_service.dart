@@ -442,19 +442,34 @@ class ApiService {
     throw Exception("댓글 작성 실패: ${response.body}");
   }
 
+  // 서버는 댓글을 페이지 단위로 보내고, 다음 페이지가 있으면
+  // X-Next-Cursor 헤더를 붙여줌 → 헤더가 없을 때까지 이어서 조회
   static Future<List<Map<String, dynamic>>> listComments(int postId) async {
-    final url = Uri.parse("${ApiConfig.baseUrl}/posts/$postId/comments");
-    final response = await http.get(
-      url,
-      headers: _headers(json: false),
-    );
+    final comments = <Map<String, dynamic>>[];
+    String? cursor;
+
+    do {
+      final query = cursor == null
+          ? "limit=200"
+          : "limit=200&cursor=${Uri.encodeQueryComponent(cursor)}";
+      final url = Uri.parse(
+        "${ApiConfig.baseUrl}/posts/$postId/comments?$query",
+      );
+      final response = await http.get(
+        url,
+        headers: _headers(json: false),
+      );
+
+      if (response.statusCode != 200) {
+        throw Exception("댓글 목록 불러오기 실패: ${response.body}");
+      }
 
-    if (response.statusCode == 200) {
       final list = jsonDecode(response.body) as List;
-      return List<Map<String, dynamic>>.from(list);
-    }
+      comments.addAll(List<Map<String, dynamic>>.from(list));
+      cursor = response.headers["x-next-cursor"];
+    } while (cursor != null);
 
-    throw Exception("댓글 목록 불러오기 실패: ${response.body}");
+    return comments;
   }
 
   // ----------------------------------------------------